@@ -3,7 +3,13 @@ import argparse
 from scraper import RedditScraper
 from processor import Processor
 from database import Database
+from doc_cache import DocumentCache
+from trends import TrendAnalyzer
+from logs import configure_logging, add_logging_arguments
+from metrics import registry as metrics
+import profiling
 import json
+from collections.abc import Mapping
 
 def get_args():
     """Parse command line arguments"""
@@ -15,6 +21,15 @@ def get_args():
                         choices=['json', 'csv'], help='Output format (default: json)')
     parser.add_argument('--filename', '-f', type=str, help='Output filename (without extension)')
     parser.add_argument('--limit', '-l', type=int, default=25, help='Maximum number of results to return (default: 25)')
+    parser.add_argument('--trend', type=str, choices=['day', 'week', 'month'],
+                        help='Also print sentiment and term trends over all stored results, bucketed by day, week or month')
+    parser.add_argument('--no-prompt', action='store_true',
+                        help='Never ask for input (implied when stdin is not a terminal); see cli.py for NDJSON pipelines')
+    parser.add_argument('--metrics-file', type=str,
+                        help='Write counters and timings here when done (JSON for *.json, Prometheus text otherwise)')
+    parser.add_argument('--profile', nargs='?', const='profiles', metavar='DIR',
+                        help='Profile CPU and memory per stage into DIR (default: profiles)')
+    add_logging_arguments(parser)
     
     return parser.parse_args()
 
@@ -23,10 +38,19 @@ def run_cli():
     
     # Parse command line arguments
     args = get_args()
+    configure_logging(args.log_level, args.log_format)
+    if args.profile:
+        profiling.enable(args.profile)
+    
+    # Batch runs (cron, pipes) must never block waiting for input
+    interactive = not args.no_prompt and sys.stdin.isatty()
     
     # If keyword not provided, prompt user
     keyword = args.keyword
     if not keyword:
+        if not interactive:
+            print("Error: --keyword is required when not running interactively")
+            sys.exit(2)
         keyword = input("Enter search keyword: ")
     
     # If timeframe not provided, prompt user
@@ -48,7 +72,7 @@ def run_cli():
     
     # Initialize components
     reddit_scraper = RedditScraper()
-    processor = Processor()
+    processor = Processor(cache=DocumentCache())
     db = Database()
     
     # Perform search
@@ -79,6 +103,13 @@ def run_cli():
     print(processed_data["analysis"]["summary"])
     print("="*50)
     
+    # Display trends over the stored archive
+    if args.trend:
+        trend_analyzer = TrendAnalyzer(db, processor)
+        trend = trend_analyzer.trends(keyword, granularity=args.trend)
+        print()
+        print(trend_analyzer.generate_trend_report(trend, keyword, args.trend))
+    
     # Export results
     output_file = processor.export_results(
         processed_data["processed_data"], 
@@ -88,6 +119,14 @@ def run_cli():
     
     print(f"\nResults exported to: {output_file}")
     
+    if args.metrics_file:
+        metrics.write(args.metrics_file)
+    if args.profile:
+        print(f"Profile written to: {profiling.disable()}")
+    
+    if not interactive:
+        return processed_data
+    
     # Display comment details
     print("\nWould you like to see detailed comments for a specific post? (y/n)")
     choice = input().lower()
@@ -123,7 +162,7 @@ def run_cli():
             
             for i, comment in enumerate(selected_post['comments'], 1):
                 # Handle the new structured comment format
-                if isinstance(comment, dict) and 'author' in comment and 'body' in comment:
+                if isinstance(comment, Mapping) and 'author' in comment and 'body' in comment:
                     author = comment.get('author', 'Anonymous')
                     score = comment.get('score', 0)
                     body = comment.get('body', '')
@@ -134,7 +173,7 @@ def run_cli():
                     # Show replies if any
                     if 'replies' in comment and comment['replies']:
                         for j, reply in enumerate(comment['replies'], 1):
-                            if isinstance(reply, dict):
+                            if isinstance(reply, Mapping):
                                 reply_author = reply.get('author', 'Anonymous')
                                 reply_score = reply.get('score', 0)
                                 reply_body = reply.get('body', '')
@@ -0,0 +1 @@
+"""Benchmarks for the scraper; run a module with `python -m benchmarks.<name>`"""
@@ -0,0 +1,193 @@
+"""
+Synthetic corpus generator
+Builds reproducible Reddit-like posts and comment trees from a seed: titles and text
+drawn from a Zipf-distributed vocabulary mixed with sentiment words, and comment trees
+with a configurable number of top-level comments, reply depth and fanout. The same
+data is available as scraper result dicts (for the database and processor stages), as
+Reddit API listings and as old.reddit thread pages (served by benchmarks.fake_reddit).
+"""
+
+import random
+import itertools
+from html import escape
+from datetime import datetime
+
+from processor import POSITIVE_WORDS, NEGATIVE_WORDS
+
+SYLLABLES = ["ka", "lo", "mi", "ten", "ra", "vo", "shi", "del", "an", "pur", "ex", "qua", "zo", "ni", "bel", "tor"]
+COMMUNITIES = ["r/python", "r/programming", "r/technology", "r/learnpython", "r/datascience", "r/linux",
+               "r/webdev", "r/askreddit", "r/science", "r/gadgets"]
+
+# Fixed base time so generated dates do not depend on when the benchmark runs
+BASE_TIME = datetime(2024, 1, 1).timestamp()
+
+class CorpusGenerator:
+    """Seeded generator of posts, comment trees and the matching Reddit API JSON"""
+
+    def __init__(self, seed=0, vocabulary_size=2000, sentiment_rate=0.05, base_time=BASE_TIME):
+        self.rng = random.Random(seed)
+        self.base_time = base_time
+        self.sentiment_rate = sentiment_rate
+
+        # Pseudo-words made of syllables, ranked so low ranks are the common ones
+        words = set()
+        lengths = itertools.cycle([2, 3, 2, 4, 3])
+        while len(words) < vocabulary_size:
+            words.add("".join(self.rng.choice(SYLLABLES) for _ in range(next(lengths))))
+        self.vocabulary = sorted(words)
+        self.rng.shuffle(self.vocabulary)
+        self._weights = list(itertools.accumulate(1.0 / rank for rank in range(1, vocabulary_size + 1)))
+        self.sentiment_words = sorted(POSITIVE_WORDS) + sorted(NEGATIVE_WORDS)
+
+    def words(self, count):
+        picked = self.rng.choices(self.vocabulary, cum_weights=self._weights, k=count)
+        for index in range(count):
+            if self.rng.random() < self.sentiment_rate:
+                picked[index] = self.rng.choice(self.sentiment_words)
+        return picked
+
+    def sentence(self, min_words=6, max_words=18):
+        text = " ".join(self.words(self.rng.randint(min_words, max_words)))
+        return text[0].upper() + text[1:] + self.rng.choice([".", ".", ".", "!", "?"])
+
+    def text(self, min_sentences=1, max_sentences=5):
+        return " ".join(self.sentence() for _ in range(self.rng.randint(min_sentences, max_sentences)))
+
+    def comment_tree(self, top_level=10, depth=2, fanout=2):
+        """Scraper-format comments: top_level comments, each with fanout replies per level down to depth"""
+        def comment(level):
+            replies = []
+            if level < depth:
+                replies = [comment(level + 1) for _ in range(self.rng.randint(0, fanout))]
+            return {
+                "author": f"u/user{self.rng.randint(1, 5000)}",
+                "score": int(self.rng.paretovariate(1.2)),
+                "body": self.text(1, 3),
+                "replies": replies
+            }
+        return [comment(0) for _ in range(top_level)]
+
+    def post_data(self, index, keyword="benchmark"):
+        """Reddit API 'data' of one search result"""
+        community = self.rng.choice(COMMUNITIES)
+        post_id = f"b{index:06x}"
+        slug = "_".join(self.words(4))
+        return {
+            "id": post_id,
+            "title": f"{keyword} {self.sentence(4, 10)}",
+            "permalink": f"/{community}/comments/{post_id}/{slug}/",
+            "subreddit_name_prefixed": community,
+            # Spread over the week before base_time
+            "created_utc": self.base_time - self.rng.uniform(0, 7 * 86400),
+            "selftext": self.text() if self.rng.random() < 0.7 else "",
+            "url": f"https://example.com/{slug}",
+            # From the index rather than the generator, so corpora stay the same otherwise
+            "author": f"user{index * 7919 % 5000 + 1}",
+            "score": index * 31 % 500,
+            "num_comments": 0
+        }
+
+    def result(self, index, keyword="benchmark", top_level=10, depth=2, fanout=2):
+        """A scraper result dict, as RedditScraper.search returns it"""
+        data = self.post_data(index, keyword)
+        return {
+            "title": data["title"],
+            "url": f"https://www.reddit.com{data['permalink']}",
+            "source": "Reddit",
+            "community": data["subreddit_name_prefixed"],
+            "date": datetime.fromtimestamp(data["created_utc"]).isoformat(),
+            "content": data["selftext"] or f"Link: {data['url']}",
+            "comments": self.comment_tree(top_level, depth, fanout),
+            "author": f"u/{data['author']}",
+            "score": data["score"]
+        }
+
+    def results(self, count, keyword="benchmark", top_level=10, depth=2, fanout=2):
+        return [self.result(index, keyword, top_level, depth, fanout) for index in range(count)]
+
+def search_listing(posts, after=None):
+    """Reddit search.json body for a page of post data dicts"""
+    return {
+        "kind": "Listing",
+        "data": {
+            "after": after,
+            "children": [{"kind": "t3", "data": post} for post in posts]
+        }
+    }
+
+def thread_listing(post, comments):
+    """Reddit <permalink>.json body: the post listing followed by the comment listing"""
+    def comment_listing(tree):
+        return {
+            "kind": "Listing",
+            "data": {"children": [
+                {"kind": "t1", "data": {
+                    "author": comment["author"][2:],
+                    "score": comment["score"],
+                    "body": comment["body"],
+                    # Reddit sends an empty string, not an empty listing, when there are no replies
+                    "replies": comment_listing(comment["replies"]) if comment["replies"] else ""
+                }}
+                for comment in tree
+            ]}
+        }
+    return [search_listing([post]), comment_listing(comments)]
+
+def thread_html(post, comments):
+    """old.reddit.com thread page for a post and its comment tree, in the markup Reddit serves"""
+    def paragraphs(text):
+        return "".join(f"<p>{escape(paragraph)}</p>" for paragraph in text.split("\n\n"))
+
+    def comment_things(tree, parts):
+        for comment in tree:
+            author = escape(comment["author"][2:])
+            parts.append(
+                f'<div class=" thing comment noncollapsed" data-type="comment" data-author="{author}" '
+                f'data-subreddit="{escape(post["subreddit_name_prefixed"][2:])}">'
+                f'<p class="parent"></p><div class="midcol unvoted"></div>'
+                f'<div class="entry unvoted"><p class="tagline">'
+                f'<a class="expand" href="javascript:void(0)">[&ndash;]</a>'
+                f'<a href="https://old.reddit.com/user/{author}" class="author may-blank">{author}</a>'
+                f'<span class="userattrs"></span> '
+                f'<span class="score dislikes" title="{comment["score"] - 1}">{comment["score"] - 1} points</span>'
+                f'<span class="score unvoted" title="{comment["score"]}">{comment["score"]} points</span>'
+                f'<span class="score likes" title="{comment["score"] + 1}">{comment["score"] + 1} points</span>'
+                f'</p><form action="#" class="usertext warn-on-unload"><div class="usertext-body may-blank-within md-container">'
+                f'<div class="md">{paragraphs(comment["body"])}</div></div></form>'
+                f'<ul class="flat-list buttons"><li class="first"><a href="#" class="bylink">permalink</a></li></ul>'
+                f'</div><div class="child">'
+            )
+            if comment["replies"]:
+                parts.append('<div class="sitetable listing">')
+                comment_things(comment["replies"], parts)
+                parts.append('</div>')
+            parts.append('</div><div class="clearleft"></div></div><div class="clearleft"></div>')
+
+    name = f"t3_{post['id']}"
+    if post["selftext"]:
+        expando = (f'<div class="expando"><form action="#" class="usertext warn-on-unload">'
+                   f'<div class="usertext-body may-blank-within md-container"><div class="md">'
+                   f'{paragraphs(post["selftext"])}</div></div></form></div>')
+        data_url = post["permalink"]
+    else:
+        expando = '<div class="expando expando-uninitialized" style="display: none"></div>'
+        data_url = post["url"]
+
+    parts = [
+        '<!doctype html><html lang="en"><head><title>', escape(post["title"]), '</title></head><body class="listing-page">',
+        '<div id="header"><a id="header-img" href="https://old.reddit.com/">reddit</a></div>',
+        '<div class="side"><div class="spacer"><div class="titlebox"><h1 class="hover redditname">',
+        escape(post["subreddit_name_prefixed"][2:]), '</h1></div></div></div>',
+        '<div class="content" role="main"><div id="siteTable" class="sitetable linklisting">',
+        f'<div class=" thing id-{name} {"self" if post["selftext"] else ""} link" data-fullname="{name}" data-type="link" ',
+        f'data-author="user{post["id"]}" data-url="{escape(data_url)}" data-permalink="{escape(post["permalink"])}" ',
+        f'data-timestamp="{int(post["created_utc"] * 1000)}" data-comments-count="{post["num_comments"]}">',
+        '<div class="entry unvoted"><div class="top-matter"><p class="title">',
+        f'<a class="title may-blank" href="{escape(data_url)}">{escape(post["title"])}</a></p></div>',
+        expando, '</div><div class="child"></div><div class="clearleft"></div></div></div>',
+        f'<div class="commentarea"><div class="panestack-title"><span class="title">all {post["num_comments"]} comments</span></div>',
+        f'<div id="siteTable_{name}" class="sitetable nestedlisting">',
+    ]
+    comment_things(comments, parts)
+    parts.append('</div></div></div><div class="footer-parent"></div></body></html>')
+    return "".join(parts)
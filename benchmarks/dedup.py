@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection benchmark
+Stores a synthetic corpus in which a share of the posts are reposts of earlier ones
+(the same text under a new title, with a few words changed) and reports the time
+save_results takes with dedup off and flag, recall and precision of the flagged posts
+against the exact Jaccard similarity of each repost and its original, and the latency
+of a duplicate lookup through the LSH index next to a brute-force comparison with
+every stored signature, as the number of stored posts grows.
+
+Usage: python -m benchmarks.dedup [--posts 10000] [--reposts 0.1] [--output dedup.json]
+"""
+
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+from benchmarks.corpus import CorpusGenerator
+
+KEYWORD = "benchmark"
+
+def build_corpus(posts, repost_rate, edit_rate=0.05, seed=0):
+    """Results in storage order, and {index of a repost: index of its original}"""
+    from records import Post
+    rng = random.Random(seed)
+    generator = CorpusGenerator(seed)
+    results, originals = [], {}
+    for index in range(posts):
+        if index > 10 and rng.random() < repost_rate:
+            original = rng.randrange(index)
+            while original in originals:
+                original = originals[original]
+            source = results[original]
+            words = source["content"].split()
+            for _ in range(int(len(words) * edit_rate)):
+                words[rng.randrange(len(words))] = generator.words(1)[0]
+            results.append(Post(f"{source['title']} (x-post)", f"{source['url']}?repost={index}", "Reddit",
+                                "r/reposts", source["date"], " ".join(words), []))
+            originals[index] = original
+        else:
+            results.append(generator.result(index, KEYWORD, top_level=0, depth=0, fanout=0))
+    return results, originals
+
+def time_ingest(results, dedup, workdir):
+    from database import Database
+    db = Database(tempfile.mktemp(suffix=".db", dir=workdir), dedup=dedup)
+    started = time.perf_counter()
+    ids = db.save_results(results, KEYWORD)
+    return db, ids, time.perf_counter() - started
+
+def accuracy(db, results, ids, originals):
+    """Recall and precision of the flagged posts, judged by exact shingle Jaccard similarity"""
+    from dedup import post_text
+    hasher, threshold = db.duplicates.hasher, db.duplicates.threshold
+    with sqlite3.connect(db.db_path) as conn:
+        flagged = {row[0] for row in conn.execute("SELECT id FROM results WHERE duplicate_of IS NOT NULL")}
+
+    def jaccard(a, b):
+        a, b = hasher.shingles(post_text(a)), hasher.shingles(post_text(b))
+        return len(a & b) / len(a | b) if a | b else 0.0
+
+    expected = {ids[index] for index, original in originals.items()
+                if hasher.signature(post_text(results[index])) is not None
+                and jaccard(results[index], results[original]) >= threshold}
+    planted = {ids[index] for index in originals}
+    return {
+        "reposts": len(originals),
+        "expected": len(expected),
+        "flagged": len(flagged),
+        "recall": len(flagged & expected) / len(expected) if expected else None,
+        # A flagged post that is a repost, if one under the threshold, is still a repost
+        "precision": len(flagged & planted) / len(flagged) if flagged else None,
+    }
+
+def brute_force_find(db, signature):
+    """What a lookup costs without the index: every stored signature of the term compared"""
+    with sqlite3.connect(db.db_path) as conn:
+        rows = conn.execute('''
+        SELECT s.result_id, s.signature FROM minhash_signatures s JOIN results r ON r.id = s.result_id
+        WHERE r.search_term = ?
+        ''', (KEYWORD,)).fetchall()
+    if not rows:
+        return None
+    matrix = np.frombuffer(b"".join(data for _, data in rows), dtype=np.uint32).reshape(len(rows), -1)
+    similarity = (matrix == signature).mean(axis=1)
+    best = int(similarity.argmax())
+    return rows[best][0] if similarity[best] >= db.duplicates.threshold else None
+
+def time_lookups(results, probes, workdir, steps=4):
+    """Median LSH and brute-force lookup milliseconds at growing numbers of stored posts"""
+    from database import Database
+    from dedup import post_text
+    db = Database(tempfile.mktemp(suffix=".db", dir=workdir), dedup="flag")
+    hasher = db.duplicates.hasher
+    signatures = [signature for signature in (hasher.signature(post_text(probe)) for probe in probes)
+                  if signature is not None]
+
+    report = []
+    stored = 0
+    for step in range(1, steps + 1):
+        target = len(results) * step // steps
+        db.save_results(results[stored:target], KEYWORD)
+        stored = target
+
+        lsh, brute = [], []
+        with sqlite3.connect(db.db_path) as conn:
+            cursor = conn.cursor()
+            for signature in signatures:
+                started = time.perf_counter()
+                db.duplicates.find(cursor, KEYWORD, signature)
+                lsh.append(time.perf_counter() - started)
+        for signature in signatures[:20]:
+            started = time.perf_counter()
+            brute_force_find(db, signature)
+            brute.append(time.perf_counter() - started)
+        report.append({"stored": stored, "lsh_ms": statistics.median(lsh) * 1000,
+                       "brute_force_ms": statistics.median(brute) * 1000})
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark MinHash/LSH near-duplicate detection')
+    parser.add_argument('--posts', '-n', type=int, default=10000, help='Posts in the corpus (default: 10000)')
+    parser.add_argument('--reposts', type=float, default=0.1, help='Share of posts that are reposts (default: 0.1)')
+    parser.add_argument('--output', '-o', type=str, help='Write the report to this JSON file')
+    args = parser.parse_args()
+
+    from logs import configure_logging
+    configure_logging("warning")
+
+    results, originals = build_corpus(args.posts, args.reposts)
+    report = {"posts": args.posts, "ingest": {}}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for dedup in ("off", "flag"):
+            db, ids, seconds = time_ingest(results, dedup, workdir)
+            report["ingest"][dedup] = {"seconds": seconds, "posts_per_second": len(results) / seconds}
+        report["accuracy"] = accuracy(db, results, ids, originals)
+        probes = [results[index] for index in list(originals)[:200]]
+        report["lookups"] = time_lookups([result for index, result in enumerate(results) if index not in originals],
+                                         probes, workdir)
+
+    ingest, found = report["ingest"], report["accuracy"]
+    print(f"{args.posts} posts, {found['reposts']} reposts ({found['expected']} at or above the similarity threshold)")
+    print(f"Ingest: off {ingest['off']['posts_per_second']:8.0f} posts/s   flag {ingest['flag']['posts_per_second']:8.0f} posts/s")
+    print(f"Flagged {found['flagged']}: recall {found['recall'] or 0:.1%}, precision {found['precision'] or 0:.1%}")
+    print("Lookup of one post:")
+    for entry in report["lookups"]:
+        print(f"  {entry['stored']:7d} stored   lsh {entry['lsh_ms']:7.3f} ms   brute force {entry['brute_force_ms']:8.3f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
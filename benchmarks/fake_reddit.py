@@ -0,0 +1,177 @@
+"""
+Local Reddit stand-in
+Serves the Reddit JSON endpoints RedditScraper uses, search.json and the /r/<sub>/new
+and /top listings (paged with `after`), <permalink>.json (a thread with nested
+replies) and <permalink> (the same thread as an old.reddit HTML page), from a synthetic
+corpus on a background HTTP server. Latency, the number of posts, thread sizes and reply
+nesting are configurable, every Nth request can be answered with HTTP 429 to exercise
+the scraper's rate-limit handling, and thread JSON can be refused to exercise its HTML
+fallback. Point a scraper at it with
+RedditScraper(base_url=server.url, html_base_url=server.url).
+"""
+
+import re
+import json
+import time
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.corpus import CorpusGenerator, BASE_TIME, search_listing, thread_listing, thread_html
+
+LISTING_PATH = re.compile(r"^/r/([^/]+)/(new|top)\.json$")
+
+class FakeRedditConfig:
+    """What the fake server serves and how it behaves"""
+
+    def __init__(self, posts=50, top_level=10, depth=2, fanout=2, latency_ms=0.0,
+                 rate_limit_every=0, retry_after=0.05, seed=0, base_time=BASE_TIME, thread_json_status=200):
+        self.posts = posts
+        self.top_level = top_level
+        self.depth = depth
+        self.fanout = fanout
+        self.latency_ms = latency_ms
+        # Answer every Nth request with 429 (0 disables)
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        # Status of <permalink>.json requests; e.g. 403 leaves only the HTML pages
+        self.thread_json_status = thread_json_status
+        self.seed = seed
+        # Posts are dated over the week before base_time
+        self.base_time = base_time
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+class FakeRedditHandler(BaseHTTPRequestHandler):
+    """Routes a request to the search, listing, thread or thread page endpoint of the server's corpus"""
+
+    def do_GET(self):
+        server = self.server
+        if server.config.latency_ms:
+            time.sleep(server.config.latency_ms / 1000)
+
+        if server.should_rate_limit():
+            self.send_response(429)
+            self.send_header('Retry-After', str(server.config.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        parsed = urllib.parse.urlparse(self.path)
+        listing = LISTING_PATH.match(parsed.path)
+        content_type = 'application/json'
+        if parsed.path == '/search.json':
+            body = server.search_page(urllib.parse.parse_qs(parsed.query))
+        elif listing:
+            body = server.listing_page(listing.group(1), listing.group(2), urllib.parse.parse_qs(parsed.query))
+        elif parsed.path in server.pages:
+            body = server.pages[parsed.path]
+            content_type = 'text/html; charset=utf-8'
+        else:
+            body = server.threads.get(parsed.path)
+            if body is not None and server.config.thread_json_status != 200:
+                self.send_response(server.config.thread_json_status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeRedditServer(ThreadingHTTPServer):
+    """HTTP server holding the pre-serialized corpus; use as a context manager"""
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        super().__init__((host, port), FakeRedditHandler)
+        self.config = config or FakeRedditConfig()
+        self.requests = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # Everything is generated and serialized up front so serving costs little
+        generator = CorpusGenerator(self.config.seed, base_time=self.config.base_time)
+        self.posts = []
+        self.threads = {}
+        self.pages = {}
+        self.comments = 0
+        for index in range(self.config.posts):
+            post = generator.post_data(index)
+            tree = generator.comment_tree(self.config.top_level, self.config.depth, self.config.fanout)
+            post["num_comments"] = self._count(tree)
+            self.comments += post["num_comments"]
+            self.posts.append(post)
+            self.threads[post["permalink"] + ".json"] = json.dumps(thread_listing(post, tree)).encode('utf-8')
+            self.pages[post["permalink"]] = thread_html(post, tree).encode('utf-8')
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def should_rate_limit(self):
+        with self._lock:
+            self.requests += 1
+            every = self.config.rate_limit_every
+            if every and self.requests % every == 0:
+                self.rate_limited += 1
+                return True
+            return False
+
+    def search_page(self, query):
+        """One page of search results, starting after the post named in `after`"""
+        return self._page(self.posts, query)
+
+    def listing_page(self, subreddit, sort, query):
+        """One page of a subreddit's /new (newest first) or /top listing"""
+        posts = [post for post in self.posts if post["subreddit_name_prefixed"].lower() == f"r/{subreddit.lower()}"]
+        if sort == "new":
+            posts.sort(key=lambda post: -post["created_utc"])
+        return self._page(posts, query)
+
+    def _page(self, posts, query):
+        limit = min(int(query.get('limit', ['25'])[0]), 100)
+        start = 0
+        after = query.get('after', [None])[0]
+        if after:
+            ids = [post["id"] for post in posts]
+            name = after[3:] if after.startswith('t3_') else after
+            start = ids.index(name) + 1 if name in ids else len(ids)
+
+        page = posts[start:start + limit]
+        next_after = f"t3_{page[-1]['id']}" if page and start + limit < len(posts) else None
+        return json.dumps(search_listing(page, next_after)).encode('utf-8')
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    def _count(tree):
+        return sum(1 + FakeRedditServer._count(comment["replies"]) for comment in tree)
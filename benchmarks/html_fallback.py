@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+HTML fallback benchmark
+Times scraper.parse_thread_html, the lxml parser that reads comment trees from old.reddit
+thread pages, on the HTML files in benchmarks/fixtures, next to the JSON API path on
+the same threads. Generated fixtures are also checked against the comment trees they
+were rendered from. Then both comment sources scrape the local Reddit stand-in end to
+end. (The Safari WebDriver path this replaced started a browser per thread, seconds
+before the first byte was parsed, and ran on macOS only.)
+
+Usage: python -m benchmarks.html_fallback [--repeats 20] [--output html.json]
+       python -m benchmarks.html_fallback --write-fixtures
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+from benchmarks.corpus import CorpusGenerator, thread_html, thread_listing
+from benchmarks.fake_reddit import FakeRedditConfig, FakeRedditServer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Generated fixtures: seed, top-level comments, reply depth and fanout of each thread
+GENERATED = {
+    "thread_small.html": (1, 10, 2, 2),
+    "thread_medium.html": (2, 40, 3, 2),
+    "thread_large.html": (3, 80, 3, 2),
+}
+
+def generate_thread(seed, top_level, depth, fanout):
+    generator = CorpusGenerator(seed)
+    post = generator.post_data(0)
+    tree = generator.comment_tree(top_level, depth, fanout)
+    post["num_comments"] = count_comments(tree)
+    return post, tree
+
+def count_comments(tree):
+    return sum(1 + count_comments(comment["replies"]) for comment in tree)
+
+def write_fixtures():
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, shape in GENERATED.items():
+        post, tree = generate_thread(*shape)
+        path = os.path.join(FIXTURE_DIR, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(thread_html(post, tree))
+        print(f"Wrote {path} ({count_comments(tree)} comments)")
+
+def median_ms(run, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def parse_json_thread(scraper, body):
+    """What RedditScraper._get_post_comments does with a thread's JSON, minus the request"""
+    comments = []
+    scraper._process_comment_replies(json.loads(body)[1], comments)
+    return comments
+
+def bench_fixtures(repeats):
+    from scraper import RedditScraper, parse_thread_html
+    scraper = RedditScraper()
+
+    report = {}
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURE_DIR, name), 'rb') as f:
+            document = f.read()
+
+        thread = parse_thread_html(document)
+        entry = {
+            "bytes": len(document),
+            "comments": scraper._count_comments(thread["comments"]),
+            "html_ms": median_ms(lambda: parse_thread_html(document), repeats)
+        }
+
+        if name in GENERATED:
+            post, tree = generate_thread(*GENERATED[name])
+            if thread["comments"] != tree:
+                entry["error"] = "parsed comments differ from the generated thread; rerun with --write-fixtures?"
+            body = json.dumps(thread_listing(post, tree)).encode('utf-8')
+            entry["json_bytes"] = len(body)
+            entry["json_ms"] = median_ms(lambda: parse_json_thread(scraper, body), repeats)
+        report[name] = entry
+    return report
+
+def bench_scrape(repeats):
+    """Scrape the same corpus with comments from the API, from thread pages, and through the fallback"""
+    from scraper import RedditScraper
+
+    config = FakeRedditConfig(posts=50, top_level=20, depth=2, fanout=2, seed=5, base_time=time.time())
+    report = {}
+    for label, source, json_status in (("api", "api", 200), ("html", "html", 200), ("fallback", "api", 403)):
+        config.thread_json_status = json_status
+        with FakeRedditServer(config) as server:
+            scraper = RedditScraper(base_url=server.url, html_base_url=server.url)
+            results = []
+            seconds = median_ms(lambda: results.append(
+                scraper.search("benchmark", "week", max_posts=config.posts, comment_source=source)), repeats) / 1000
+            comments = sum(scraper._count_comments(result["comments"]) for result in results[-1])
+            report[label] = {"posts": len(results[-1]), "comments": comments, "seconds": seconds,
+                             "posts_per_second": len(results[-1]) / seconds if seconds else None,
+                             "expected_comments": server.comments}
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the old.reddit HTML comment parser')
+    parser.add_argument('--repeats', '-r', type=int, default=20, help='Timed parses per fixture (default: 20)')
+    parser.add_argument('--output', '-o', type=str, help='Write the report to this JSON file')
+    parser.add_argument('--write-fixtures', action='store_true', help='Regenerate the generated fixtures and exit')
+    args = parser.parse_args()
+
+    if args.write_fixtures:
+        write_fixtures()
+        return 0
+
+    # Fallback warnings for every thread would drown the results
+    from logs import configure_logging
+    configure_logging("error")
+
+    report = {"fixtures": bench_fixtures(args.repeats), "scrape": bench_scrape(max(1, args.repeats // 10))}
+
+    print("Parse time per thread:")
+    for name, entry in report["fixtures"].items():
+        line = (f"  {name:<24} {entry['bytes'] / 1024:8.1f} KiB  {entry['comments']:5d} comments  "
+                f"html {entry['html_ms']:7.2f} ms")
+        if "json_ms" in entry:
+            line += f"  json {entry['json_ms']:7.2f} ms"
+        if "error" in entry:
+            line += f"  ERROR: {entry['error']}"
+        print(line)
+
+    print("Scrape of the local stand-in:")
+    for label, entry in report["scrape"].items():
+        print(f"  {label:<10} {entry['posts']:4d} posts  {entry['comments']:5d}/{entry['expected_comments']} comments  "
+              f"{entry['seconds'] * 1000:8.1f} ms  {entry['posts_per_second'] or 0:7.1f} posts/s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Record memory benchmark
+Compares the memory retained by a scraped corpus (100k comments by default) held as
+the plain dicts the pipeline used to pass around with the slotted, string-interning
+Post and Comment records from records.py. Both are built the way the pipeline builds
+them: from Reddit thread JSON as the scraper parses it, and from the comment JSON the
+database stores. Memory is what tracemalloc still sees allocated once the corpus is
+built and the decoded JSON is dropped.
+
+Usage: python -m benchmarks.memory [--comments 100000] [--output memory.json]
+"""
+
+import gc
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+from benchmarks.corpus import CorpusGenerator, thread_listing
+
+def build_corpus(comments, seed=0):
+    """Thread JSON bodies (as Reddit serves them) and stored comment JSON for about `comments` comments"""
+    generator = CorpusGenerator(seed)
+    threads, stored = [], []
+    total = index = 0
+    while total < comments:
+        post = generator.post_data(index)
+        tree = generator.comment_tree(top_level=10, depth=2, fanout=3)
+        total += count_comments(tree)
+        threads.append((post, json.dumps(thread_listing(post, tree))))
+        stored.append(json.dumps(tree))
+        index += 1
+    return threads, stored, total
+
+def count_comments(tree):
+    return sum(1 + count_comments(comment["replies"]) for comment in tree)
+
+def dict_replies(listing, target):
+    """The scraper's comment parsing as it was before records: one dict per comment"""
+    for child in listing["data"]["children"]:
+        data = child["data"]
+        comment = {"author": f"u/{data['author']}", "score": data["score"], "body": data["body"], "replies": []}
+        if data.get("replies"):
+            dict_replies(data["replies"], comment["replies"])
+        target.append(comment)
+
+def scrape_dicts(threads):
+    results = []
+    for post, body in threads:
+        data = json.loads(body)
+        comments = []
+        dict_replies(data[1], comments)
+        post = data[0]["data"]["children"][0]["data"]
+        results.append({"title": post["title"], "url": f"https://www.reddit.com{post['permalink']}",
+                        "source": "Reddit", "community": post["subreddit_name_prefixed"],
+                        "date": str(post["created_utc"]), "content": post["selftext"], "comments": comments})
+    return results
+
+def scrape_records(threads, scraper):
+    from records import Post
+    results = []
+    for post, body in threads:
+        data = json.loads(body)
+        comments = []
+        scraper._process_comment_replies(data[1], comments)
+        post = data[0]["data"]["children"][0]["data"]
+        results.append(Post(post["title"], f"https://www.reddit.com{post['permalink']}", "Reddit",
+                            post["subreddit_name_prefixed"], str(post["created_utc"]), post["selftext"], comments))
+    return results
+
+def load_dicts(stored):
+    return [json.loads(text) for text in stored]
+
+def load_records(stored):
+    from records import load_comments
+    return [load_comments(text) for text in stored]
+
+def measure(build, source):
+    """(retained bytes, build seconds) of the structure build(source) returns"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        value = build(source)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del value
+    gc.collect()
+
+    started = time.perf_counter()
+    value = build(source)
+    seconds = time.perf_counter() - started
+    del value
+    return retained, seconds
+
+def object_sizes():
+    """Shallow size of one comment and one post, as dict and as record"""
+    from records import Post, Comment
+    comment = {"author": "u/someone", "score": 1, "body": "text", "replies": []}
+    post = {"title": "", "url": "", "source": "Reddit", "community": "r/python", "date": "", "content": "", "comments": []}
+    return {
+        "comment_dict": sys.getsizeof(comment),
+        "comment_record": sys.getsizeof(Comment(**comment)),
+        "post_dict": sys.getsizeof(post),
+        "post_record": sys.getsizeof(Post(**post)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory of the corpus as dicts vs. slotted records')
+    parser.add_argument('--comments', '-n', type=int, default=100000, help='Comments in the corpus (default: 100000)')
+    parser.add_argument('--output', '-o', type=str, help='Write the report to this JSON file')
+    args = parser.parse_args()
+
+    from logs import configure_logging
+    configure_logging("warning")
+
+    threads, stored, comments = build_corpus(args.comments)
+    report = {"comments": comments, "posts": len(threads), "sizes": object_sizes(), "paths": {}}
+
+    # Modules are imported and the scraper built before measuring, so their allocations
+    # do not count as record memory
+    from scraper import RedditScraper
+    scraper = RedditScraper()
+
+    def scrape(threads):
+        return scrape_records(threads, scraper)
+
+    for path, dicts, records, source in (("scrape", scrape_dicts, scrape, threads),
+                                         ("database load", load_dicts, load_records, stored)):
+        dict_bytes, dict_seconds = measure(dicts, source)
+        record_bytes, record_seconds = measure(records, source)
+        report["paths"][path] = {
+            "dict_bytes": dict_bytes, "record_bytes": record_bytes,
+            "dict_seconds": dict_seconds, "record_seconds": record_seconds,
+            "saved_bytes_per_comment": (dict_bytes - record_bytes) / comments,
+        }
+
+    sizes = report["sizes"]
+    print(f"{comments} comments in {len(threads)} posts")
+    print(f"Per object: comment {sizes['comment_dict']} -> {sizes['comment_record']} bytes, "
+          f"post {sizes['post_dict']} -> {sizes['post_record']} bytes (shallow)")
+    for path, entry in report["paths"].items():
+        print(f"{path:<14} dicts {entry['dict_bytes'] / 1e6:7.1f} MB  records {entry['record_bytes'] / 1e6:7.1f} MB  "
+              f"({entry['record_bytes'] / entry['dict_bytes']:.0%}, {entry['saved_bytes_per_comment']:.0f} bytes "
+              f"saved per comment)  build {entry['dict_seconds'] * 1000:.0f} ms -> {entry['record_seconds'] * 1000:.0f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmark suite
+Runs reproducible scenarios through the main stages of the scraper: scraping a local
+Reddit stand-in (benchmarks.fake_reddit) with RedditScraper.search, Database.save_results
+and get_results, and Processor.analyze_results and process_results on synthetic data.
+Each stage is timed over several runs (median reported) and run once more under
+tracemalloc for its peak memory. The report is written as JSON so runs on different
+commits can be compared with --compare.
+
+Usage: python -m benchmarks.run [--scenario medium] [--repeats 3] [--output bench.json] [--compare old.json]
+
+The scrape stage's peak memory includes the fake server, which runs in the same process.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime
+
+from benchmarks.fake_reddit import FakeRedditConfig, FakeRedditServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+KEYWORD = "benchmark"
+
+# Corpus and server settings of each scenario; every scenario is fully determined by its seed
+SCENARIOS = {
+    "small": FakeRedditConfig(posts=25, top_level=5, depth=1, fanout=2, seed=1),
+    "medium": FakeRedditConfig(posts=100, top_level=20, depth=2, fanout=2, seed=2),
+    "large": FakeRedditConfig(posts=200, top_level=40, depth=3, fanout=3, seed=3),
+    # Slow, rate-limited server: measures request handling rather than parsing
+    "throttled": FakeRedditConfig(posts=50, top_level=10, depth=2, fanout=2, latency_ms=20,
+                                  rate_limit_every=10, retry_after=0.1, seed=4),
+}
+
+def measure(run, setup=None, repeats=3):
+    """
+    Time run(setup()) `repeats` times, then once more under tracemalloc
+    Returns the timings, the peak traced memory and the last return value.
+    """
+    timings = []
+    value = None
+    for _ in range(repeats):
+        args = setup() if setup else ()
+        started = time.perf_counter()
+        value = run(*args)
+        timings.append(time.perf_counter() - started)
+
+    # Tracing slows everything down, so memory gets its own run
+    args = setup() if setup else ()
+    tracemalloc.start()
+    try:
+        run(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return timings, peak, value
+
+def stage_report(timings, peak, items):
+    median = statistics.median(timings)
+    return {
+        "items": items,
+        "runs": len(timings),
+        "median_seconds": median,
+        "min_seconds": min(timings),
+        "max_seconds": max(timings),
+        "items_per_second": items / median if median > 0 else None,
+        "peak_memory_bytes": peak
+    }
+
+def run_scenario(config, repeats=3, workdir=None):
+    """Run every stage on one scenario; a failing stage records its error and the rest still run"""
+    from scraper import RedditScraper
+    from database import Database
+    from processor import Processor
+
+    stages = {}
+    results = []
+
+    # Scrape the fake server
+    with FakeRedditServer(config) as server:
+        scraper = RedditScraper(base_url=server.url)
+        scrape_stats = []
+
+        def scrape():
+            def track(stats):
+                if not scrape_stats or scrape_stats[-1] is not stats:
+                    scrape_stats.append(stats)
+            # "all" because the corpus is dated relative to a fixed base time
+            return scraper.search(KEYWORD, "all", on_progress=track, max_posts=config.posts)
+
+        try:
+            timings, peak, results = measure(scrape, repeats=repeats)
+            stages["scrape"] = stage_report(timings, peak, len(results))
+            last = scrape_stats[-1]
+            stages["scrape"].update({
+                "requests": last.requests,
+                "rate_limited": last.rate_limited,
+                "comments": last.comments_parsed,
+                "bytes_received": last.bytes_received
+            })
+        except Exception as e:
+            stages["scrape"] = {"error": f"{type(e).__name__}: {e}"}
+        corpus = {"posts": config.posts, "comments": server.comments}
+
+    if not results:
+        # Nothing to feed the later stages; fall back to the same corpus generated directly
+        from benchmarks.corpus import CorpusGenerator
+        results = CorpusGenerator(config.seed).results(config.posts, KEYWORD, config.top_level,
+                                                       config.depth, config.fanout)
+
+    # Database writes and reads, each write into a fresh database
+    workdir = tempfile.mkdtemp(dir=workdir)
+    databases = []
+
+    def fresh_db():
+        path = os.path.join(workdir, f"bench_{len(databases)}.db")
+        databases.append(path)
+        return (Database(path),)
+
+    try:
+        timings, peak, _ = measure(lambda db: db.save_results(results, KEYWORD), fresh_db, repeats)
+        stages["save_results"] = stage_report(timings, peak, len(results))
+    except Exception as e:
+        stages["save_results"] = {"error": f"{type(e).__name__}: {e}"}
+
+    try:
+        db = Database(databases[-1]) if databases else None
+        timings, peak, rows = measure(lambda: db.get_results(KEYWORD, limit=len(results)), repeats=repeats)
+        stages["get_results"] = stage_report(timings, peak, len(rows))
+    except Exception as e:
+        stages["get_results"] = {"error": f"{type(e).__name__}: {e}"}
+
+    # Analysis without the document cache, so every run does the full work
+    processor = Processor(cache=None)
+    # Loading stopwords, models and pandas is startup cost, not analysis cost
+    processor.warm_up()
+    for name, run in (("analyze_results", lambda: processor.analyze_results(results)),
+                      ("process_results", lambda: processor.process_results(results, KEYWORD))):
+        try:
+            timings, peak, _ = measure(run, repeats=repeats)
+            stages[name] = stage_report(timings, peak, len(results))
+        except Exception as e:
+            stages[name] = {"error": f"{type(e).__name__}: {e}"}
+
+    return {"config": config.to_dict(), "corpus": corpus, "stages": stages}
+
+def git_revision():
+    """Current commit, with a -dirty suffix for uncommitted changes; None outside git"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(scenarios, repeats=3):
+    report = {
+        "commit": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(),
+        "repeats": repeats,
+        "scenarios": {}
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in scenarios:
+            # The scraper, database and processor report progress with print
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                report["scenarios"][name] = run_scenario(SCENARIOS[name], repeats, workdir)
+            print(format_scenario(name, report["scenarios"][name]), flush=True)
+    return report
+
+def format_scenario(name, scenario):
+    lines = [f"{name}: {scenario['corpus']['posts']} posts, {scenario['corpus']['comments']} comments"]
+    for stage, result in scenario["stages"].items():
+        if "error" in result:
+            lines.append(f"  {stage:<16} failed: {result['error']}")
+            continue
+        lines.append(f"  {stage:<16} {result['median_seconds'] * 1000:9.1f} ms  "
+                     f"{result['items_per_second'] or 0:9.1f} items/s  "
+                     f"peak {result['peak_memory_bytes'] / 1e6:8.2f} MB")
+    return "\n".join(lines)
+
+def format_comparison(old, new):
+    """Median time and peak memory of each stage in `new` relative to `old`"""
+    lines = [f"Compared with {old.get('commit')} ({old.get('timestamp')}); ratios below 1.00 are improvements"]
+    for name, scenario in new["scenarios"].items():
+        old_scenario = old.get("scenarios", {}).get(name)
+        if old_scenario is None:
+            continue
+        if old_scenario.get("config") != scenario["config"]:
+            lines.append(f"{name}: scenario settings differ, not compared")
+            continue
+        lines.append(f"{name}:")
+        for stage, result in scenario["stages"].items():
+            before = old_scenario["stages"].get(stage, {})
+            if "error" in result or "error" in before or not before:
+                continue
+            time_ratio = result["median_seconds"] / before["median_seconds"] if before["median_seconds"] else None
+            memory_ratio = (result["peak_memory_bytes"] / before["peak_memory_bytes"]
+                            if before["peak_memory_bytes"] else None)
+            lines.append(f"  {stage:<16} time x{time_ratio or 0:.2f}  memory x{memory_ratio or 0:.2f}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scraping, storage and analysis on synthetic data')
+    parser.add_argument('--scenario', '-s', action='append', choices=sorted(SCENARIOS),
+                        help='Scenario to run (repeatable; default: small, medium and throttled)')
+    parser.add_argument('--repeats', '-r', type=int, default=3, help='Timed runs per stage (default: 3)')
+    parser.add_argument('--output', '-o', type=str, help='Write the report to this JSON file')
+    parser.add_argument('--compare', '-c', type=str, help='Compare with a report from an earlier run')
+    args = parser.parse_args()
+
+    # Per-request log lines would drown the results
+    from logs import configure_logging
+    configure_logging("warning")
+
+    report = run_benchmark(args.scenario or ["small", "medium", "throttled"], args.repeats)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print("\n" + format_comparison(json.load(f), report))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
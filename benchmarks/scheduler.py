@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Scheduler benchmark
+Simulates a set of keywords with very different post rates and compares fixed-interval
+polling (what a cron job running app.py does) with the adaptive KeywordScheduler at
+the same request spend. Reports requests, posts found, posts missed and the mean delay
+between a post appearing and it being stored.
+
+Usage: python -m benchmarks.scheduler [--days 3] [--cron-minutes 60] [--output scheduler.json]
+"""
+
+import os
+import json
+import random
+import argparse
+import tempfile
+from datetime import datetime
+
+from scraper import ScrapeStats
+
+# Posts per hour of the simulated keywords: a few hot, some steady, many dormant
+DEFAULT_RATES = [20, 10, 6, 3, 2, 1, 1, 0.5] + [0.3, 0.2, 0.2, 0.1, 0.1, 0.1, 0.05, 0.05, 0.05, 0.05, 0.02, 0.02]
+
+class SimulatedReddit:
+    """Stands in for RedditScraper; posts appear at random times on a simulated clock"""
+
+    def __init__(self, rates, start, end, seed=1):
+        rng = random.Random(seed)
+        self.now = start
+        self.start = start
+        self.posts = {}
+        for index, rate in enumerate(rates):
+            keyword = f"keyword{index}"
+            arrivals = []
+            # A day of posts that are already stored when the simulation starts
+            t = start - 86400
+            while True:
+                t += rng.expovariate(rate / 3600)
+                if t > end:
+                    break
+                arrivals.append(t)
+            self.posts[keyword] = arrivals
+        self.reset()
+
+    def url(self, keyword, t):
+        return f"https://www.reddit.com/r/sim/comments/{keyword}-{t:.3f}/"
+
+    def existing_posts(self, keyword):
+        """Result dicts of the posts made before the simulation starts"""
+        return [self.result(keyword, t) for t in self.posts[keyword] if t < self.start]
+
+    def result(self, keyword, t):
+        return {
+            "title": f"{keyword} post",
+            "url": self.url(keyword, t),
+            "source": "Reddit",
+            "community": "r/sim",
+            "date": datetime.fromtimestamp(t).isoformat(),
+            "content": "",
+            "comments": []
+        }
+
+    def reset(self):
+        self.now = self.start
+        self.requests = 0
+        self.found = {}
+
+    def search(self, keyword, timeframe, on_result=None, on_progress=None, should_stop=None, max_posts=25,
+               skip_urls=None, is_duplicate=None):
+        stats = ScrapeStats()
+        stats.requests = 1
+
+        # Newest posts first, as far as one search page reaches
+        visible = [t for t in self.posts[keyword] if t <= self.now][::-1][:max_posts]
+        results = []
+        for t in visible:
+            url = self.url(keyword, t)
+            if skip_urls and url in skip_urls:
+                continue
+            result = self.result(keyword, t)
+            # One comment request per new post that is not a near duplicate
+            if not (is_duplicate and is_duplicate(result)):
+                stats.requests += 1
+            results.append(result)
+            self.found[url] = (t, self.now - t)
+
+        self.requests += stats.requests
+        if on_progress:
+            on_progress(stats)
+        return results
+
+    def metrics(self, keywords):
+        """Requests, found and missed posts and discovery delay for posts that appeared during the run"""
+        total = sum(1 for keyword in keywords for t in self.posts[keyword] if self.start <= t <= self.now)
+        fresh = [delay for t, delay in self.found.values() if t >= self.start]
+        return {
+            "requests": self.requests,
+            "posts_appeared": total,
+            "posts_found": len(fresh),
+            "posts_missed": total - len(fresh),
+            "mean_delay_minutes": (sum(fresh) / len(fresh) / 60) if fresh else None,
+            "found_per_100_requests": 100 * len(fresh) / self.requests if self.requests else 0.0
+        }
+
+def run_cron(reddit, keywords, interval, end, max_posts=25):
+    """Poll every keyword every `interval` seconds, skipping posts already stored"""
+    reddit.reset()
+    known = {keyword: set(post["url"] for post in reddit.existing_posts(keyword)) for keyword in keywords}
+    t = reddit.start
+    while t <= end:
+        reddit.now = t
+        for keyword in keywords:
+            for result in reddit.search(keyword, "week", max_posts=max_posts, skip_urls=known[keyword]):
+                known[keyword].add(result["url"])
+        t += interval
+    reddit.now = end
+    return reddit.metrics(keywords)
+
+def run_adaptive(reddit, keywords, budget_per_hour, end, workdir, tick=60, min_interval=300, max_interval=86400):
+    """Poll with the KeywordScheduler on the simulated clock"""
+    from database import Database
+    from scheduler import KeywordScheduler
+
+    reddit.reset()
+    db = Database(os.path.join(workdir, "scheduler_bench.db"))
+    for keyword in keywords:
+        db.save_results(reddit.existing_posts(keyword), keyword)
+        db.add_watched_keyword(keyword, "week", min_interval, max_interval)
+        db.reschedule_watched_keyword(keyword, reddit.start)
+
+    scheduler = KeywordScheduler(db, reddit, request_budget=budget_per_hour, clock=lambda: reddit.now)
+    t = reddit.start
+    while t <= end:
+        reddit.now = t
+        scheduler.run_pending(t)
+        t += tick
+    reddit.now = end
+
+    metrics = reddit.metrics(keywords)
+    metrics["intervals_minutes"] = {
+        row["keyword"]: row["interval"] / 60 for row in db.get_watched_keywords(enabled_only=False)
+    }
+    return metrics
+
+def run_benchmark(days=3, cron_minutes=60, rates=None, seed=1):
+    rates = rates or DEFAULT_RATES
+    keywords = [f"keyword{index}" for index in range(len(rates))]
+    start = float(int(datetime(2024, 1, 1).timestamp()))
+    end = start + days * 86400
+    reddit = SimulatedReddit(rates, start, end, seed)
+
+    cron = run_cron(reddit, keywords, cron_minutes * 60, end)
+
+    # Give the scheduler the same number of requests per hour the cron job used
+    budget = cron["requests"] / (days * 24)
+    with tempfile.TemporaryDirectory() as workdir:
+        adaptive = run_adaptive(reddit, keywords, budget, end, workdir)
+
+    report = {
+        "days": days,
+        "keywords": len(keywords),
+        "rates_per_hour": rates,
+        "cron_interval_minutes": cron_minutes,
+        "budget_per_hour": budget,
+        "cron": cron,
+        "adaptive": adaptive
+    }
+    if cron["mean_delay_minutes"] and adaptive["mean_delay_minutes"]:
+        report["delay_improvement"] = cron["mean_delay_minutes"] / adaptive["mean_delay_minutes"]
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare fixed-interval and adaptive keyword polling')
+    parser.add_argument('--days', type=float, default=3, help='Simulated days (default: 3)')
+    parser.add_argument('--cron-minutes', type=int, default=60, help='Fixed polling interval (default: 60)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for post arrivals (default: 1)')
+    parser.add_argument('--output', '-o', type=str, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.days, args.cron_minutes, seed=args.seed)
+
+    print(f"{report['keywords']} keywords, {report['days']} days, {report['budget_per_hour']:.0f} requests/hour for both")
+    for name in ("cron", "adaptive"):
+        m = report[name]
+        print(f"{name:<9} requests {m['requests']:>6}  found {m['posts_found']:>5}/{m['posts_appeared']:<5} "
+              f"missed {m['posts_missed']:>5}  mean delay {m['mean_delay_minutes']:7.1f} min  "
+              f"{m['found_per_100_requests']:5.1f} posts/100 requests")
+    if "delay_improvement" in report:
+        print(f"Adaptive polling finds posts {report['delay_improvement']:.1f}x sooner")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark
+Measures how long the GUI takes until its window is visible, with the default lazy
+startup and with an eager startup that imports and loads everything up front (the
+old behaviour), and lists the slowest imports reported by `python -X importtime`.
+
+Usage: python -m benchmarks.startup [--runs 5] [--output startup.json]
+"""
+
+import sys
+import os
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter; prints the seconds until the window was shown
+CHILD_SCRIPT = r"""
+import time
+start = time.perf_counter()
+import sys
+import os
+import json
+
+eager = sys.argv[1] == "eager"
+if eager:
+    # What startup used to pay for before the window appeared
+    import pandas
+    import nltk
+
+from PyQt6.QtWidgets import QApplication
+import main
+
+app = QApplication(sys.argv)
+window = main.ScraperApp()
+if eager:
+    window.processor.warm_up()
+window.show()
+app.processEvents()
+visible = time.perf_counter() - start
+
+print(json.dumps({"visible_seconds": visible}), flush=True)
+# Skip the background warm-up and interpreter teardown; they are not startup time
+os._exit(0)
+"""
+
+def child_env():
+    env = dict(os.environ)
+    env["QT_QPA_PLATFORM"] = env.get("QT_QPA_PLATFORM", "offscreen")
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+def measure_startup(mode, workdir):
+    """Start the GUI once and return (window visible seconds, process wall seconds)"""
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, mode],
+        cwd=workdir, env=child_env(), capture_output=True, text=True, check=True
+    ).stdout
+    wall = time.perf_counter() - started
+
+    # The application may print its own lines; the measurement is the last one
+    last_line = output.strip().splitlines()[-1]
+    return json.loads(last_line)["visible_seconds"], wall
+
+def top_imports(workdir, limit=15):
+    """Slowest top-level imports of `import main`, from python -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=workdir, env=child_env(), capture_output=True, text=True, check=True
+    ).stderr
+
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # Nesting is shown by two spaces per level after the separator
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append({
+            "module": name.strip(),
+            "depth": depth,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000
+        })
+
+    # Children are listed before their parent, so the imports done by `import main`
+    # are the entries between the previous top-level import and main itself
+    end = next((i for i, entry in enumerate(imports) if entry["module"] == "main"), None)
+    if end is None:
+        return 0.0, []
+    start = max((i for i in range(end) if imports[i]["depth"] == 0), default=-1) + 1
+    subtree = imports[start:end + 1]
+
+    total_ms = imports[end]["cumulative_ms"]
+    slowest = sorted((entry for entry in subtree if entry["depth"] <= 2),
+                     key=lambda entry: -entry["cumulative_ms"])[:limit]
+    return total_ms, slowest
+
+def summarize(samples):
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "runs": len(samples)
+    }
+
+def run_benchmark(runs=5):
+    """Measure lazy and eager startup and return the results as a dictionary"""
+    report = {}
+
+    # A scratch directory keeps the databases the app creates out of the repo
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in ("lazy", "eager"):
+            visible = []
+            wall = []
+            for _ in range(runs):
+                visible_seconds, wall_seconds = measure_startup(mode, workdir)
+                visible.append(visible_seconds)
+                wall.append(wall_seconds)
+            report[mode] = {
+                "window_visible_seconds": summarize(visible),
+                "process_wall_seconds": summarize(wall)
+            }
+
+        import_ms, slowest = top_imports(workdir)
+        report["import_main_ms"] = import_ms
+        report["top_imports"] = slowest
+
+    lazy = report["lazy"]["window_visible_seconds"]["median"]
+    eager = report["eager"]["window_visible_seconds"]["median"]
+    report["speedup"] = eager / lazy if lazy else None
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure time until the GUI window is visible')
+    parser.add_argument('--runs', type=int, default=5, help='Startups per mode (default: 5)')
+    parser.add_argument('--output', '-o', type=str, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.runs)
+
+    for mode in ("lazy", "eager"):
+        visible = report[mode]["window_visible_seconds"]
+        print(f"{mode:<6} window visible after {visible['median']*1000:8.1f} ms "
+              f"(min {visible['min']*1000:.1f}, max {visible['max']*1000:.1f})")
+    print(f"Lazy startup is {report['speedup']:.1f}x faster")
+    print(f"\nimport main: {report['import_main_ms']:.1f} ms; slowest imports:")
+    for entry in report["top_imports"]:
+        print(f"  {entry['cumulative_ms']:8.1f} ms  {'  ' * entry['depth']}{entry['module']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
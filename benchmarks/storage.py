@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Storage compression benchmark
+Saves the same synthetic corpus into fresh databases with each storage codec (none,
+zlib, zstd, and zstd with a dictionary trained on a sample of the corpus) and reports
+the bytes taken by the content and comments columns and by the indexed comment rows'
+bodies, the database file size, and
+write and read throughput through Database.save_results, get_results and
+iter_results. zstd runs are skipped when the zstandard package is missing.
+
+Usage: python -m benchmarks.storage [--posts 2000] [--repeats 3] [--output storage.json]
+"""
+
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+from benchmarks.corpus import CorpusGenerator
+
+KEYWORD = "benchmark"
+
+# (label, codec, train a dictionary first)
+CONFIGURATIONS = (
+    ("none", "none", False),
+    ("zlib", "zlib", False),
+    ("zstd", "zstd", False),
+    ("zstd+dict", "zstd", True),
+)
+
+def payload_bytes(results):
+    """Bytes of content and comment JSON the corpus amounts to uncompressed"""
+    from records import json_default
+    return sum(len((result["content"] or "").encode('utf-8'))
+               + len(json.dumps(result["comments"], default=json_default, separators=(',', ':')).encode('utf-8'))
+               for result in results)
+
+def run_configuration(results, codec, train, repeats, workdir, training_posts):
+    from database import Database
+
+    def fresh_db():
+        path = tempfile.mktemp(suffix=".db", dir=workdir)
+        db = Database(path, compression="none")
+        if train:
+            # Train on a sample stored uncompressed, then start over with the dictionary in place
+            db.save_results(results[:training_posts], KEYWORD)
+            if db.train_compression_dictionary() is None:
+                raise RuntimeError("dictionary training failed")
+            db.clear_results()
+        db.set_storage_codec(codec)
+        return db
+
+    writes, reads, scans = [], [], []
+    for _ in range(repeats):
+        db = fresh_db()
+        started = time.perf_counter()
+        db.save_results(results, KEYWORD)
+        writes.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        rows = db.get_results(KEYWORD, limit=len(results))
+        reads.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        scanned = sum(1 for _ in db.iter_results(search_term=KEYWORD))
+        scans.append(time.perf_counter() - started)
+        if len(rows) != len(results) or scanned != len(results):
+            raise RuntimeError(f"read back {len(rows)}/{scanned} of {len(results)} rows")
+
+    db.vacuum()
+    stats = db.storage_stats()
+    return {
+        "stored_bytes": stats["stored_bytes"],
+        "comment_row_bytes": stats["comment_row_bytes"],
+        "file_bytes": stats["file_bytes"],
+        "write_seconds": statistics.median(writes),
+        "read_seconds": statistics.median(reads),
+        "scan_seconds": statistics.median(scans),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the storage codecs for content and comments')
+    parser.add_argument('--posts', '-n', type=int, default=2000, help='Posts in the corpus (default: 2000)')
+    parser.add_argument('--repeats', '-r', type=int, default=3, help='Timed runs per codec (default: 3)')
+    parser.add_argument('--output', '-o', type=str, help='Write the report to this JSON file')
+    args = parser.parse_args()
+
+    from logs import configure_logging
+    configure_logging("warning")
+
+    try:
+        import zstandard  # noqa: F401
+        configurations = CONFIGURATIONS
+    except ImportError:
+        print("zstandard is not installed; skipping zstd")
+        configurations = [configuration for configuration in CONFIGURATIONS if configuration[1] != "zstd"]
+
+    results = CorpusGenerator(seed=6).results(args.posts, KEYWORD)
+    payload = payload_bytes(results)
+    report = {"posts": args.posts, "payload_bytes": payload, "codecs": {}}
+
+    print(f"{args.posts} posts, {payload / 1e6:.1f} MB of content and comment JSON")
+    with tempfile.TemporaryDirectory() as workdir:
+        for label, codec, train in configurations:
+            entry = run_configuration(results, codec, train, args.repeats, workdir, min(500, args.posts))
+            report["codecs"][label] = entry
+            print(f"  {label:<10} stored {entry['stored_bytes'] / 1e6:6.2f} MB ({entry['stored_bytes'] / payload:4.0%})  "
+                  f"comment rows {entry['comment_row_bytes'] / 1e6:6.2f} MB  "
+                  f"file {entry['file_bytes'] / 1e6:6.2f} MB  "
+                  f"write {payload / entry['write_seconds'] / 1e6:6.1f} MB/s  "
+                  f"read {payload / entry['read_seconds'] / 1e6:6.1f} MB/s  "
+                  f"scan {payload / entry['scan_seconds'] / 1e6:6.1f} MB/s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Reddit Scraper - Pipeline CLI
+Non-interactive commands that read and write NDJSON (one JSON object per line), so
+they can be chained with each other and with tools like jq without temporary files.
+Data goes to stdout as soon as it is available; progress messages go to stderr.
+
+    python cli.py search "python" -t week -l 50 > python.ndjson
+    python cli.py crawl python rust golang -t week --sort new > subreddits.ndjson
+    printf 'rust\\ngo\\n' | python cli.py search - | python cli.py analyze
+    python cli.py query-local --keyword python --since 2024-01-01 | python cli.py export --format csv > python.csv
+    python cli.py analyze --keyword python --report
+    python cli.py authors --keyword python --sort comments -l 20
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+import contextlib
+from collections import Counter
+
+from logs import configure_logging, add_logging_arguments
+from records import json_default
+
+# Columns written by `export --format csv`
+CSV_FIELDS = ["id", "title", "url", "source", "community", "author", "score", "date", "content", "search_term", "created_at",
+              "comments"]
+
+class NdjsonWriter:
+    """Writes one JSON object per line and flushes it right away"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=json_default) + "\n")
+        self.stream.flush()
+        self.count += 1
+
+def read_ndjson(stream):
+    """Yield the objects of an NDJSON stream; malformed lines are reported (on stderr) and skipped"""
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            print(f"Skipping line {line_number}: not valid JSON ({e})")
+            continue
+        if isinstance(record, dict):
+            yield record
+        else:
+            print(f"Skipping line {line_number}: not a JSON object")
+
+def read_keywords(keywords, stream):
+    """Keywords from the command line; '-' reads one keyword per line from stream"""
+    for keyword in keywords:
+        if keyword == "-":
+            for line in stream:
+                if line.strip():
+                    yield line.strip()
+        else:
+            yield keyword
+
+def select_fields(record, fields):
+    if not fields:
+        return record
+    return {field: record.get(field) for field in fields}
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def cmd_search(args, stdin, out):
+    """Search Reddit and stream every post as soon as it and its comments are fetched"""
+    from scraper import RedditScraper
+    from database import Database
+
+    scraper = RedditScraper()
+    db = None if args.no_save else Database(args.db)
+    writer = NdjsonWriter(out)
+
+    for keyword in read_keywords(args.keyword, stdin):
+        def emit(result, keyword=keyword):
+            if db is not None:
+                db.save_results([result], keyword)
+            writer.write(select_fields(dict(result, search_term=keyword), args.fields))
+
+        is_duplicate = None
+        if db is not None and args.skip_duplicate_comments:
+            def is_duplicate(post, keyword=keyword):
+                return db.find_near_duplicate(keyword, post) is not None
+
+        scraper.search(keyword, args.timeframe, on_result=emit, max_posts=args.limit, comment_source=args.comments,
+                       is_duplicate=is_duplicate)
+        if db is not None:
+            db.save_search(keyword, args.timeframe)
+
+    print(f"Wrote {writer.count} posts")
+    return 0
+
+def cmd_crawl(args, stdin, out):
+    """Crawl subreddit listings concurrently and stream every post as soon as it is fetched"""
+    from scraper import RedditScraper
+    from database import Database
+
+    scraper = RedditScraper()
+    db = None if args.no_save else Database(args.db)
+    writer = NdjsonWriter(out)
+    subreddits = list(read_keywords(args.subreddit, stdin))
+    search_terms = set()
+
+    def emit(result):
+        # Stored under the subreddit (as Reddit spells it, e.g. r/Python) unless a search term is given
+        search_term = args.term or result.get("community")
+        search_terms.add(search_term)
+        if db is not None:
+            db.save_results([result], search_term)
+        writer.write(select_fields(dict(result, search_term=search_term), args.fields))
+
+    is_duplicate = None
+    if db is not None and args.skip_duplicate_comments:
+        def is_duplicate(post):
+            return db.find_near_duplicate(args.term or post.get("community"), post) is not None
+
+    scraper.crawl_subreddits(subreddits, args.timeframe, sort=args.sort, on_result=emit,
+                             max_posts=args.limit, max_workers=args.workers, comment_source=args.comments,
+                             is_duplicate=is_duplicate)
+    if db is not None:
+        for search_term in sorted(search_terms):
+            db.save_search(search_term, args.timeframe)
+
+    print(f"Wrote {writer.count} posts from {len(subreddits)} subreddits")
+    return 0
+
+def cmd_analyze(args, stdin, out):
+    """Analyze stored search terms, or the posts read from stdin grouped by search term"""
+    from processor import Processor
+    from doc_cache import DocumentCache
+
+    processor = Processor(cache=None if args.no_cache else DocumentCache())
+    writer = NdjsonWriter(out)
+
+    def emit(search_term, analysis):
+        record = {"search_term": search_term, "analysis": analysis}
+        if args.report:
+            record["report"] = processor.generate_text_report(analysis, search_term or "stdin")
+        writer.write(record)
+
+    if args.keyword:
+        from database import Database
+        db = Database(args.db)
+        for keyword in args.keyword:
+            emit(keyword, processor.update_analysis_state(db, keyword))
+        return 0
+
+    # Posts are analyzed in batches as they arrive; only the per-post counts are kept
+    documents = {}
+    for batch in batched(read_ndjson(stdin), 100):
+        for post, document in zip(batch, processor.analyze_documents(batch)):
+            if args.per_post:
+                record = {"url": post.get("url"), "title": post.get("title"),
+                          "search_term": post.get("search_term"), "sentiment": document["sentiment"],
+                          "top_words": Counter(document["words"]).most_common(args.top_words)}
+                writer.write(record)
+            else:
+                documents.setdefault(post.get("search_term"), []).append(document)
+
+    for search_term, term_documents in documents.items():
+        emit(search_term, processor.build_analysis(term_documents))
+    return 0
+
+def cmd_export(args, stdin, out):
+    """Write stored results (or NDJSON from stdin) as NDJSON, a JSON array or CSV"""
+    if args.keyword or args.all:
+        from database import Database
+        records = Database(args.db).iter_results(search_term=args.keyword)
+    else:
+        records = read_ndjson(stdin)
+
+    with contextlib.ExitStack() as stack:
+        stream = out
+        if args.output_file:
+            stream = stack.enter_context(open(args.output_file, 'w', newline='', encoding='utf-8'))
+
+        count = 0
+        if args.format == "ndjson":
+            writer = NdjsonWriter(stream)
+            for record in records:
+                writer.write(select_fields(record, args.fields))
+            count = writer.count
+        elif args.format == "json":
+            # Streamed as a JSON array, one element at a time
+            stream.write("[")
+            for record in records:
+                stream.write(("\n" if count == 0 else ",\n") + json.dumps(
+                    select_fields(record, args.fields), ensure_ascii=False, default=json_default))
+                count += 1
+            stream.write("\n]\n" if count else "]\n")
+        else:
+            fields = args.fields or CSV_FIELDS
+            writer = csv.DictWriter(stream, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            for record in records:
+                row = dict(record)
+                if isinstance(row.get("comments"), (list, dict)):
+                    row["comments"] = json.dumps(row["comments"], ensure_ascii=False, default=json_default)
+                writer.writerow(row)
+                count += 1
+        stream.flush()
+
+    print(f"Exported {count} posts")
+    return 0
+
+def cmd_query_local(args, stdin, out):
+    """Stream stored results matching the filters as NDJSON"""
+    from database import Database
+
+    writer = NdjsonWriter(out)
+    for record in Database(args.db).iter_results(
+        search_term=args.keyword, source=args.source, community=args.community,
+        since=args.since, contains=args.contains, limit=args.limit
+    ):
+        if args.no_comments:
+            record.pop("comments", None)
+        writer.write(select_fields(record, args.fields))
+    return 0
+
+def cmd_authors(args, stdin, out):
+    """Stream the most active authors, or one author's breakdown, from the author index as NDJSON"""
+    from database import Database
+
+    db = Database(args.db)
+    if args.rebuild:
+        print(f"Indexed {db.rebuild_author_index()} authors")
+    writer = NdjsonWriter(out)
+    if args.author:
+        author = db.get_author(args.author)
+        if author is None:
+            print(f"No activity stored for {args.author}")
+            return 1
+        writer.write(author)
+        return 0
+    for row in db.get_top_authors(args.keyword, args.community, args.sort, args.limit):
+        writer.write(row)
+    return 0
+
+def field_list(value):
+    return [field.strip() for field in value.split(",") if field.strip()]
+
+def get_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Pipeline-friendly Reddit scraper commands (NDJSON on stdout)')
+    parser.add_argument('--db', type=str, default='scraper_data.db', help='Database file (default: scraper_data.db)')
+    parser.add_argument('--quiet', '-q', action='store_true', help='Discard progress messages instead of writing them to stderr')
+    parser.add_argument('--metrics-file', type=str,
+                        help='Write counters and timings here when done (JSON for *.json, Prometheus text otherwise)')
+    parser.add_argument('--profile', nargs='?', const='profiles', metavar='DIR',
+                        help='Profile CPU and memory per stage into DIR (default: profiles)')
+    add_logging_arguments(parser)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    search = subparsers.add_parser('search', help='Search Reddit and stream posts as NDJSON')
+    search.add_argument('keyword', nargs='+', help="Search keywords; '-' reads keywords from stdin, one per line")
+    search.add_argument('--timeframe', '-t', type=str, choices=['week', 'month', 'year', 'all'], default='month',
+                        help='Timeframe for search (default: month)')
+    search.add_argument('--limit', '-l', type=int, default=25, help='Maximum posts per keyword (default: 25)')
+    search.add_argument('--comments', type=str, choices=['api', 'html'], default='api',
+                        help='Read comment threads from the JSON API or old.reddit HTML pages (default: api)')
+    search.add_argument('--no-save', action='store_true', help='Do not store the posts in the database')
+    search.add_argument('--skip-duplicate-comments', action='store_true',
+                        help='Do not fetch comments of near duplicates of stored posts')
+    search.add_argument('--fields', type=field_list, help='Comma-separated fields to output (default: all)')
+    search.set_defaults(handler=cmd_search)
+
+    crawl = subparsers.add_parser('crawl', help='Fetch the newest or top posts of subreddits as NDJSON')
+    crawl.add_argument('subreddit', nargs='+', help="Subreddit names (with or without r/); '-' reads them from stdin")
+    crawl.add_argument('--timeframe', '-t', type=str, choices=['week', 'month', 'year', 'all'], default='week',
+                       help='Only posts from this timeframe (default: week)')
+    crawl.add_argument('--sort', type=str, choices=['new', 'top'], default='new', help='Listing to follow (default: new)')
+    crawl.add_argument('--limit', '-l', type=int, default=100, help='Maximum posts per subreddit (default: 100)')
+    crawl.add_argument('--workers', '-w', type=int, default=4, help='Subreddits fetched at once (default: 4)')
+    crawl.add_argument('--term', type=str, help='Store the posts under this search term (default: the subreddit, e.g. r/python)')
+    crawl.add_argument('--comments', type=str, choices=['api', 'html'], default='api',
+                       help='Read comment threads from the JSON API or old.reddit HTML pages (default: api)')
+    crawl.add_argument('--no-save', action='store_true', help='Do not store the posts in the database')
+    crawl.add_argument('--skip-duplicate-comments', action='store_true',
+                       help='Do not fetch comments of near duplicates of stored posts')
+    crawl.add_argument('--fields', type=field_list, help='Comma-separated fields to output (default: all)')
+    crawl.set_defaults(handler=cmd_crawl)
+
+    analyze = subparsers.add_parser('analyze', help='Analyze posts from stdin, or stored search terms')
+    analyze.add_argument('--keyword', '-k', action='append', help='Analyze a stored search term (repeatable) instead of stdin')
+    analyze.add_argument('--per-post', action='store_true', help='Output the sentiment and top words of every post instead')
+    analyze.add_argument('--top-words', type=int, default=10, help='Top words per post with --per-post (default: 10)')
+    analyze.add_argument('--report', action='store_true', help='Include the text report in each analysis')
+    analyze.add_argument('--no-cache', action='store_true', help='Do not use the per-document analysis cache')
+    analyze.set_defaults(handler=cmd_analyze)
+
+    export = subparsers.add_parser('export', help='Write posts from stdin or the database as NDJSON, JSON or CSV')
+    export.add_argument('--format', '-f', choices=['ndjson', 'json', 'csv'], default='ndjson', help='Output format (default: ndjson)')
+    export.add_argument('--keyword', '-k', type=str, help='Export a stored search term instead of stdin')
+    export.add_argument('--all', action='store_true', help='Export every stored result instead of stdin')
+    export.add_argument('--output-file', '-o', type=str, help='Write to this file instead of stdout')
+    export.add_argument('--fields', type=field_list, help='Comma-separated fields to output')
+    export.set_defaults(handler=cmd_export)
+
+    query = subparsers.add_parser('query-local', help='Stream stored posts matching filters as NDJSON')
+    query.add_argument('--keyword', '-k', type=str, help='Search term the posts were stored under')
+    query.add_argument('--source', type=str, help='Source, e.g. Reddit')
+    query.add_argument('--community', type=str, help='Community, e.g. r/python')
+    query.add_argument('--since', type=str, help='Only posts dated on or after this ISO date')
+    query.add_argument('--contains', type=str, help='Only posts whose title or content contains this text')
+    query.add_argument('--limit', '-l', type=int, help='Maximum number of posts')
+    query.add_argument('--no-comments', action='store_true', help='Leave out comment trees')
+    query.add_argument('--fields', type=field_list, help='Comma-separated fields to output')
+    query.set_defaults(handler=cmd_query_local)
+
+    authors = subparsers.add_parser('authors', help='Stream the most active authors from the author index as NDJSON')
+    authors.add_argument('--keyword', '-k', type=str, help='Only activity under this search term')
+    authors.add_argument('--community', type=str, help='Only activity in this community, e.g. r/python')
+    authors.add_argument('--sort', type=str, choices=['activity', 'posts', 'comments', 'score', 'communities', 'duplicates'],
+                         default='activity', help='Order of the authors (default: activity, posts plus comments)')
+    authors.add_argument('--limit', '-l', type=int, default=20, help='Maximum number of authors (default: 20)')
+    authors.add_argument('--author', type=str, help='Output the per-term and per-community breakdown of this author (e.g. u/name)')
+    authors.add_argument('--rebuild', action='store_true', help='Recount the index from the stored posts first')
+    authors.set_defaults(handler=cmd_authors)
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = get_args(argv)
+    out = sys.stdout
+    # Logs go to stderr; --quiet keeps only warnings and errors
+    configure_logging(args.log_level or ("warning" if args.quiet else None), args.log_format)
+    if args.profile:
+        import profiling
+        profiling.enable(args.profile)
+
+    # Everything the scraper and processor print goes to stderr so stdout stays pure NDJSON
+    log = open(os.devnull, 'w') if args.quiet else sys.stderr
+    try:
+        with contextlib.redirect_stdout(log):
+            return args.handler(args, sys.stdin, out)
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop quietly
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if log is not sys.stderr:
+            log.close()
+        if args.metrics_file:
+            from metrics import registry
+            registry.write(args.metrics_file)
+        if args.profile:
+            print(f"Profile written to {profiling.disable()}", file=sys.stderr)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+def iter_comments(comments):
+    """
+    Yield (comment, parent_index, depth) for every comment in a comment tree
+    The tree is walked depth-first with an explicit stack, so thread depth is unbounded
+    """
+    stack = [(comment, -1, 0) for comment in reversed(comments or [])]
+    index = 0
+
+    while stack:
+        comment, parent, depth = stack.pop()
+        if not isinstance(comment, Mapping) or 'body' not in comment:
+            continue
+
+        yield comment, parent, depth
+
+        replies = comment.get('replies') or []
+        for reply in reversed(replies):
+            stack.append((reply, index, depth + 1))
+        index += 1
+
+class CommentTable:
+    """Column arrays describing every comment of a thread, in depth-first order"""
+
+    __slots__ = ('parent', 'depth', 'score', 'compound', 'weight')
+
+    def __init__(self, parent, depth, score, compound, weight):
+        self.parent = parent
+        self.depth = depth
+        self.score = score
+        self.compound = compound
+        self.weight = weight
+
+    def __len__(self):
+        return len(self.parent)
+
+class CommentAnalyzer:
+    """
+    Comment-level sentiment and term statistics.
+    Each comment is scored once and weighted by its vote score and reply depth,
+    so a highly upvoted top-level comment counts for more than a buried, downvoted reply.
+    """
+
+    def __init__(self, sia, stop_words, tokenize=None, depth_decay=0.7):
+        self.sia = sia
+        self.stop_words = stop_words
+        self.tokenize = tokenize or str.split
+        self.depth_decay = depth_decay
+
+    def build_table(self, comments):
+        """Walk a comment tree once and return its CommentTable plus per-comment tokens"""
+        parents = []
+        depths = []
+        scores = []
+        compounds = []
+        tokens = []
+
+        for comment, parent, depth in iter_comments(comments):
+            body = comment.get('body', '') or ''
+            parents.append(parent)
+            depths.append(depth)
+            scores.append(self._to_int(comment.get('score', 0)))
+            compounds.append(self.sia.polarity_scores(body)['compound'])
+            tokens.append([word for word in self.tokenize(body.lower())
+                           if word.isalnum() and word not in self.stop_words and len(word) > 2])
+
+        score = np.array(scores, dtype=np.int32)
+        depth = np.array(depths, dtype=np.int16)
+        table = CommentTable(
+            parent=np.array(parents, dtype=np.int32),
+            depth=depth,
+            score=score,
+            compound=np.array(compounds, dtype=np.float32),
+            weight=self.weights(score, depth)
+        )
+        return table, tokens
+
+    def weights(self, score, depth):
+        """
+        Weight of each comment from its score and depth
+        Upvotes grow the weight logarithmically, downvotes shrink it towards zero,
+        and every reply level multiplies it by depth_decay
+        """
+        score = score.astype(np.float64)
+        score_weight = np.where(score >= 0, 1.0 + np.log1p(np.maximum(score, 0)), 1.0 / (1.0 + np.maximum(-score, 0)))
+        return (score_weight * np.power(self.depth_decay, depth)).astype(np.float32)
+
+    def analyze(self, comments):
+        """Aggregate statistics for one comment tree, in a form that merge() can combine"""
+        table, tokens = self.build_table(comments)
+        if not len(table):
+            return self.empty_stats()
+
+        weight = table.weight.astype(np.float64)
+        compound = table.compound.astype(np.float64)
+        positive = compound >= 0.05
+        negative = compound <= -0.05
+        neutral = ~(positive | negative)
+
+        # Weighted term counts: every token occurrence adds its comment's weight
+        vocab = {}
+        token_ids = []
+        comment_index = []
+        for i, comment_tokens in enumerate(tokens):
+            for token in comment_tokens:
+                token_ids.append(vocab.setdefault(token, len(vocab)))
+                comment_index.append(i)
+        term_weights = np.bincount(
+            np.array(token_ids, dtype=np.int64),
+            weights=weight[np.array(comment_index, dtype=np.int64)],
+            minlength=len(vocab)
+        ) if token_ids else np.zeros(0)
+        terms = {term: round(float(term_weights[i]), 4) for term, i in vocab.items()}
+
+        return {
+            "comment_count": len(table),
+            "max_depth": int(table.depth.max()),
+            "weight_sum": float(weight.sum()),
+            "weighted_compound": float((weight * compound).sum()),
+            "sentiment_counts": {
+                "positive": int(positive.sum()),
+                "neutral": int(neutral.sum()),
+                "negative": int(negative.sum())
+            },
+            "sentiment_weights": {
+                "positive": float(weight[positive].sum()),
+                "neutral": float(weight[neutral].sum()),
+                "negative": float(weight[negative].sum())
+            },
+            "terms": terms
+        }
+
+    @staticmethod
+    def empty_stats():
+        return {
+            "comment_count": 0,
+            "max_depth": 0,
+            "weight_sum": 0.0,
+            "weighted_compound": 0.0,
+            "sentiment_counts": {"positive": 0, "neutral": 0, "negative": 0},
+            "sentiment_weights": {"positive": 0.0, "neutral": 0.0, "negative": 0.0},
+            "terms": {}
+        }
+
+    @classmethod
+    def merge(cls, stats_list):
+        """Combine the statistics of several comment trees"""
+        merged = cls.empty_stats()
+        terms = merged["terms"]
+
+        for stats in stats_list:
+            merged["comment_count"] += stats["comment_count"]
+            merged["max_depth"] = max(merged["max_depth"], stats["max_depth"])
+            merged["weight_sum"] += stats["weight_sum"]
+            merged["weighted_compound"] += stats["weighted_compound"]
+            for category in ("positive", "neutral", "negative"):
+                merged["sentiment_counts"][category] += stats["sentiment_counts"][category]
+                merged["sentiment_weights"][category] += stats["sentiment_weights"][category]
+            for term, weight in stats["terms"].items():
+                terms[term] = terms.get(term, 0.0) + weight
+
+        return merged
+
+    @staticmethod
+    def summarize(stats, top_n=20):
+        """Report-ready view of merged statistics"""
+        weight_sum = stats["weight_sum"]
+        top_terms = sorted(stats["terms"].items(), key=lambda x: (-x[1], x[0]))[:top_n]
+
+        return {
+            "comment_count": stats["comment_count"],
+            "max_depth": stats["max_depth"],
+            "average_compound": stats["weighted_compound"] / weight_sum if weight_sum else 0.0,
+            "sentiment_counts": stats["sentiment_counts"],
+            "sentiment_share": {
+                category: (weight / weight_sum if weight_sum else 0.0)
+                for category, weight in stats["sentiment_weights"].items()
+            },
+            "top_terms": [(term, round(weight, 2)) for term, weight in top_terms]
+        }
+
+    @staticmethod
+    def _to_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
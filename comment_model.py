@@ -0,0 +1,129 @@
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex
+
+class _CommentNode:
+    """One loaded comment; its replies are loaded when the node is expanded"""
+
+    __slots__ = ('comment_id', 'parent', 'row', 'author', 'score', 'body', 'reply_count', 'children')
+
+    def __init__(self, comment_id, parent, row, author='', score=0, body='', reply_count=0):
+        self.comment_id = comment_id
+        self.parent = parent
+        self.row = row
+        self.author = author
+        self.score = score
+        self.body = body
+        self.reply_count = reply_count
+        self.children = []
+
+class CommentTreeModel(QAbstractItemModel):
+    """
+    Tree model over the stored comments of one result.
+    Only the top-level comments are read when a result is shown; the replies of a
+    comment are read from the Database, a page at a time, when its node is expanded.
+    """
+
+    COLUMNS = ("Comment", "Author", "Score")
+
+    def __init__(self, db, page_size=200, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.page_size = page_size
+        self.result_id = None
+        self.root = _CommentNode(None, None, 0)
+
+    def set_result(self, result_id):
+        """Show the comments of a stored result (None clears the tree)"""
+        self.beginResetModel()
+        self.result_id = result_id
+        self.root = _CommentNode(None, None, 0)
+        if result_id is not None:
+            self.root.reply_count = self.db.count_comment_children(result_id)
+        self.endResetModel()
+
+    def clear(self):
+        self.set_result(None)
+
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if row < 0 or row >= len(node.children) or column < 0 or column >= len(self.COLUMNS):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() and parent.column() != 0:
+            return 0
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        # Known from the stored reply count, so no rows have to be loaded to show an expander
+        if parent.isValid() and parent.column() != 0:
+            return False
+        return self._node(parent).reply_count > 0
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if self.result_id is None:
+            return False
+        node = self._node(parent)
+        return len(node.children) < node.reply_count
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.result_id is None:
+            return
+
+        node = self._node(parent)
+        rows = self.db.get_comment_children(
+            self.result_id, node.comment_id, offset=len(node.children), limit=self.page_size
+        )
+        if not rows:
+            # Stored counts and rows disagree; stop asking for more
+            node.reply_count = len(node.children)
+            return
+
+        start = len(node.children)
+        self.beginInsertRows(parent, start, start + len(rows) - 1)
+        for offset, row in enumerate(rows):
+            node.children.append(_CommentNode(
+                row['id'], node, start + offset,
+                author=row['author'] or '',
+                score=row['score'] or 0,
+                body=row['body'] or '',
+                reply_count=row['reply_count']
+            ))
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        node = index.internalPointer()
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                # Only the first line is rendered in the tree; the full body is in the tooltip
+                first_line = node.body.split('\n', 1)[0]
+                return first_line if len(first_line) <= 200 else first_line[:197] + '...'
+            elif column == 1:
+                return node.author
+            return str(node.score)
+        elif role == Qt.ItemDataRole.ToolTipRole and column == 0:
+            return node.body
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
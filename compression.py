@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Storage compression
+Optional codecs for the bulky columns: the post content and comment tree JSON of the
+results table, and the comment bodies of the comments table. Compressed values are stored as BLOBs that start with a marker
+byte naming their codec (and zstd dictionary), while plain values stay TEXT, so rows
+written with any codec, or none, can be read side by side and a database can be
+migrated gradually. zstd needs the optional zstandard package; a dictionary trained
+on stored posts makes it much more effective on short Reddit texts.
+
+The codec for new rows is stored in the database; migrate existing rows with:
+    python compression.py --db scraper_data.db --codec zstd --train
+"""
+
+import sys
+import zlib
+import struct
+import argparse
+import threading
+
+from logs import configure_logging, add_logging_arguments
+
+CODECS = ("none", "zlib", "zstd")
+
+# First byte of a compressed value; zstd values follow it with the dictionary id
+# (0 for none) as a little-endian 32-bit integer
+ZLIB_MARKER = b"z"
+ZSTD_MARKER = b"s"
+
+# Values shorter than this are left as text; compression would not pay for its header
+MIN_SIZE = 64
+
+DEFAULT_LEVELS = {"zlib": 6, "zstd": 3}
+DEFAULT_DICTIONARY_SIZE = 112640
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression needs the zstandard package (pip install zstandard)") from None
+    return zstandard
+
+class StorageCodec:
+    """
+    Encodes text for storage with one codec and decodes values written by any codec
+    dictionaries maps ids to the zstd dictionaries rows may refer to; dictionary_id
+    names the one new rows are compressed with (None for no dictionary), and
+    load_dictionary(id) is asked for dictionaries added since the codec was made.
+    """
+
+    def __init__(self, name="none", level=None, dictionaries=None, dictionary_id=None, min_size=MIN_SIZE,
+                 load_dictionary=None):
+        if name not in CODECS:
+            raise ValueError(f"Unsupported codec: {name} (expected one of {', '.join(CODECS)})")
+        if name == "zstd":
+            _zstd()
+        self.name = name
+        self.level = level if level is not None else DEFAULT_LEVELS.get(name)
+        self.dictionaries = dict(dictionaries or {})
+        self.dictionary_id = dictionary_id if dictionary_id in self.dictionaries else None
+        self.min_size = min_size
+        self.load_dictionary = load_dictionary
+        # zstandard compressors and decompressors must not be shared between threads
+        self._local = threading.local()
+
+    def encode(self, text):
+        """Value to store for text: compressed bytes, or the text itself when that is smaller"""
+        if text is None or self.name == "none" or not isinstance(text, str):
+            return text
+        data = text.encode('utf-8')
+        if len(data) < self.min_size:
+            return text
+
+        if self.name == "zlib":
+            encoded = ZLIB_MARKER + zlib.compress(data, self.level)
+        else:
+            encoded = (ZSTD_MARKER + struct.pack('<I', self.dictionary_id or 0)
+                       + self._compressor().compress(data))
+        return encoded if len(encoded) < len(data) else text
+
+    def decode(self, value):
+        """Text of a stored value, whichever codec wrote it"""
+        if not isinstance(value, bytes):
+            return value
+        marker = value[:1]
+        if marker == ZLIB_MARKER:
+            return zlib.decompress(value[1:]).decode('utf-8')
+        if marker == ZSTD_MARKER:
+            dictionary_id = struct.unpack('<I', value[1:5])[0]
+            return self._decompressor(dictionary_id).decompress(value[5:]).decode('utf-8')
+        # BLOBs this module did not write are taken to be UTF-8 text
+        return value.decode('utf-8', errors='replace')
+
+    def _compressor(self):
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            zstandard = _zstd()
+            dictionary = self._dictionary(self.dictionary_id) if self.dictionary_id else None
+            compressor = self._local.compressor = zstandard.ZstdCompressor(
+                level=self.level, dict_data=dictionary, write_checksum=False, write_content_size=True)
+        return compressor
+
+    def _decompressor(self, dictionary_id):
+        decompressors = getattr(self._local, 'decompressors', None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        decompressor = decompressors.get(dictionary_id)
+        if decompressor is None:
+            zstandard = _zstd()
+            if dictionary_id and dictionary_id not in self.dictionaries and self.load_dictionary:
+                dictionary = self.load_dictionary(dictionary_id)
+                if dictionary is not None:
+                    self.dictionaries[dictionary_id] = dictionary
+            if dictionary_id and dictionary_id not in self.dictionaries:
+                raise ValueError(f"Stored value needs zstd dictionary {dictionary_id}, which the database does not have")
+            dictionary = self._dictionary(dictionary_id) if dictionary_id else None
+            decompressor = decompressors[dictionary_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+        return decompressor
+
+    def _dictionary(self, dictionary_id):
+        return _zstd().ZstdCompressionDict(self.dictionaries[dictionary_id])
+
+def train_dictionary(samples, size=DEFAULT_DICTIONARY_SIZE):
+    """Train a zstd dictionary on sample texts; returns its bytes"""
+    zstandard = _zstd()
+    data = [sample.encode('utf-8') for sample in samples if sample]
+    return zstandard.train_dictionary(size, data).as_bytes()
+
+def get_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Compress (or decompress) the stored content and comments of a database')
+    parser.add_argument('--db', type=str, default='scraper_data.db', help='Database file (default: scraper_data.db)')
+    parser.add_argument('--codec', type=str, choices=CODECS, help='Codec for existing and future rows')
+    parser.add_argument('--level', type=int, help='Compression level (default: 6 for zlib, 3 for zstd)')
+    parser.add_argument('--train', action='store_true', help='Train a new zstd dictionary on the stored posts first')
+    parser.add_argument('--dictionary-size', type=int, default=DEFAULT_DICTIONARY_SIZE,
+                        help=f'Size of a trained dictionary in bytes (default: {DEFAULT_DICTIONARY_SIZE})')
+    parser.add_argument('--samples', type=int, default=5000, help='Rows to train the dictionary on (default: 5000)')
+    parser.add_argument('--no-vacuum', action='store_true', help='Do not VACUUM the database afterwards')
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = get_args()
+    configure_logging(args.log_level, args.log_format)
+
+    from database import Database
+    db = Database(args.db)
+
+    before = db.storage_stats()
+    print(f"{args.db}: {before['rows']} rows, {before['compressed_rows']} compressed, "
+          f"{before['comment_rows']} comment rows, {before['compressed_comment_rows']} compressed, "
+          f"{before['stored_bytes'] / 1e6:.1f} MB stored, {before['file_bytes'] / 1e6:.1f} MB file")
+    if not args.codec:
+        return 0
+
+    if args.train:
+        if args.codec != "zstd":
+            print("--train only applies to --codec zstd")
+            return 1
+        dictionary_id = db.train_compression_dictionary(args.dictionary_size, args.samples)
+        if dictionary_id is None:
+            print("Not enough stored text to train a dictionary; compressing without one")
+
+    db.set_storage_codec(args.codec, args.level)
+    migrated = db.recompress_results(progress=lambda done, total: print(f"\r{done}/{total} rows", end="", flush=True))
+    print()
+    if not args.no_vacuum:
+        db.vacuum()
+
+    after = db.storage_stats()
+    print(f"Recompressed {migrated} rows with {args.codec}: {after['stored_bytes'] / 1e6:.1f} MB stored "
+          f"({after['stored_bytes'] / max(before['stored_bytes'], 1):.0%} of before), "
+          f"{after['file_bytes'] / 1e6:.1f} MB file")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,92 @@
 import sqlite3
 import json
 import os
+import time
 from datetime import datetime, timedelta
+from collections.abc import Mapping
+
+import profiling
+from logs import get_logger
+from records import json_default, load_comments
+from compression import StorageCodec, train_dictionary
+from dedup import DEDUP_MODES, NearDuplicateIndex, post_text
+from metrics import registry as metrics
+
+log = get_logger("database")
+
+ROWS_WRITTEN = metrics.counter("database_rows_written_total", "Rows inserted, by table", ["table"])
+ROWS_READ = metrics.counter("database_rows_read_total", "Result rows returned, by operation", ["operation"])
+OPERATION_SECONDS = metrics.histogram("database_operation_seconds", "Duration of database operations", ["operation"])
+NEAR_DUPLICATES = metrics.counter("database_near_duplicates_total", "Near-duplicate posts found by save_results, by mode",
+                                  ["mode"])
+
+# SQL expressions mapping an ISO post date to its trend bucket
+# Weeks are labelled by their Monday
+TREND_BUCKETS = {
+    "day": "substr(date, 1, 10)",
+    "week": "date(date, 'weekday 0', '-6 days')",
+    "month": "substr(date, 1, 7)",
+}
+
+# (kind stored in analysis_terms, field of an analyzed document)
+ANALYSIS_TERM_KINDS = (
+    ("word", "words"),
+    ("bigram", "bigrams"),
+    ("trigram", "trigrams"),
+    ("summary_word", "summary_words"),
+)
+
+# Summary candidates handed to the summarizer: the best stored sentences by their
+# frequency score, relative to the summary word counts when they were last scored
+SUMMARY_POOL_SIZE = 500
+
+# Authors left out of the author index: deleted accounts and missing names
+ANONYMOUS_AUTHORS = frozenset(("Anonymous", "Unknown", "u/Anonymous", "u/[deleted]", "u/None"))
+
+# Orders of get_top_authors, over the per-author totals
+AUTHOR_SORTS = {
+    "posts": "posts",
+    "comments": "comments",
+    "activity": "posts + comments",
+    "score": "post_score + comment_score",
+    "communities": "communities",
+    "duplicates": "duplicate_posts",
+}
+
+# Sums of the activity columns, in authors/author_terms column order
+_AUTHOR_SUMS = "SUM(posts), SUM(post_score), SUM(duplicate_posts), SUM(comments), SUM(comment_score)"
+_AUTHOR_ADDS = """
+            posts = posts + excluded.posts,
+            post_score = post_score + excluded.post_score,
+            duplicate_posts = duplicate_posts + excluded.duplicate_posts,
+            comments = comments + excluded.comments,
+            comment_score = comment_score + excluded.comment_score,
+            first_seen = MIN(first_seen, excluded.first_seen),
+            last_seen = MAX(last_seen, excluded.last_seen)"""
+_AUTHOR_SUMS_AS = ("SUM(posts) AS posts, SUM(post_score) AS post_score, SUM(duplicate_posts) AS duplicate_posts, "
+                   "SUM(comments) AS comments, SUM(comment_score) AS comment_score")
 
 class Database:
-    def __init__(self, db_path="scraper_data.db"):
+    def __init__(self, db_path="scraper_data.db", compression=None, dedup=None):
         self.db_path = db_path
         self.create_tables()
+        # Codec for stored content and comments: the argument, SCRAPER_DB_COMPRESSION, or
+        # the one the database was migrated to (see compression.py)
+        self.codec = self._load_codec(compression or os.environ.get("SCRAPER_DB_COMPRESSION"))
+        # What save_results does with near duplicates (see dedup.py)
+        self.dedup = dedup or os.environ.get("SCRAPER_DB_DEDUP") or "flag"
+        if self.dedup not in DEDUP_MODES:
+            raise ValueError(f"Unsupported dedup mode: {self.dedup} (expected one of {', '.join(DEDUP_MODES)})")
+        self.duplicates = NearDuplicateIndex()
         
     def create_tables(self):
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
+            # New databases give space freed by retention back a few pages at a time;
+            # existing ones switch over on their next vacuum()
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            
             # Create results table
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS results (
@@ -38,6 +113,109 @@ class Database:
             )
             ''')
             
+            # Paging through a search term's results by date
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_term_date ON results (search_term, date)")
+            
+            # Per-result contributions to the incremental analysis state
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_documents (
+                result_id INTEGER PRIMARY KEY,
+                search_term TEXT NOT NULL,
+                source TEXT,
+                sentiment TEXT NOT NULL,
+                data TEXT NOT NULL
+            )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_documents_term ON analysis_documents (search_term)")
+            
+            # Aggregated word and n-gram counts per search term
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_terms (
+                search_term TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                term TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (search_term, kind, term)
+            )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_terms_count ON analysis_terms (search_term, kind, count)")
+            
+            # Tokenized summary candidate sentences per result, with their frequency score
+            # (NULL until scored)
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analysis_sentences (
+                result_id INTEGER NOT NULL,
+                search_term TEXT NOT NULL,
+                sentence TEXT NOT NULL,
+                tokens TEXT NOT NULL,
+                score REAL
+            )
+            ''')
+            
+            # Check if the analysis_sentences score column exists, add it if not
+            try:
+                cursor.execute("SELECT score FROM analysis_sentences LIMIT 1")
+            except sqlite3.OperationalError:
+                # Column doesn't exist; score every stored sentence once
+                cursor.execute("ALTER TABLE analysis_sentences ADD COLUMN score REAL")
+                cursor.execute("SELECT DISTINCT search_term FROM analysis_sentences")
+                for (search_term,) in cursor.fetchall():
+                    self._score_sentences(cursor, search_term)
+            
+            cursor.execute("DROP INDEX IF EXISTS idx_analysis_sentences_term")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_sentences_score ON analysis_sentences (search_term, score)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_analysis_sentences_result ON analysis_sentences (result_id)")
+            
+            # Per-community breakdown of the analysis state: posts and sentiment counts, and
+            # word counts, kept up to date by apply_analysis_delta
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS community_rollups (
+                search_term TEXT NOT NULL,
+                community TEXT NOT NULL,
+                posts INTEGER NOT NULL,
+                positive INTEGER NOT NULL,
+                neutral INTEGER NOT NULL,
+                negative INTEGER NOT NULL,
+                PRIMARY KEY (search_term, community)
+            )
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS community_terms (
+                search_term TEXT NOT NULL,
+                community TEXT NOT NULL,
+                term TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (search_term, community, term)
+            )
+            ''')
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_community_terms_count ON community_terms (search_term, community, count)")
+            
+            # Check if the analysis_documents community column exists, add it if not
+            try:
+                cursor.execute("SELECT community FROM analysis_documents LIMIT 1")
+            except sqlite3.OperationalError:
+                # Column doesn't exist; fill it in from the results and roll up what is analyzed
+                cursor.execute("ALTER TABLE analysis_documents ADD COLUMN community TEXT")
+                cursor.execute('''
+                UPDATE analysis_documents SET community = COALESCE(
+                    (SELECT NULLIF(community, '') FROM results WHERE results.id = analysis_documents.result_id), 'Unknown')
+                ''')
+                self._rebuild_community_rollups(cursor)
+            
+            # Cached per-bucket trend statistics
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS trend_buckets (
+                search_term TEXT NOT NULL,
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                data TEXT NOT NULL,
+                computed_at TEXT NOT NULL,
+                PRIMARY KEY (search_term, granularity, bucket)
+            )
+            ''')
+            
             # Check if comments column exists, add it if not
             try:
                 cursor.execute("SELECT comments FROM results LIMIT 1")
@@ -45,36 +223,1016 @@ class Database:
                 # Column doesn't exist, add it
                 cursor.execute("ALTER TABLE results ADD COLUMN comments TEXT")
             
+            # Check if comments_indexed column exists, add it if not
+            try:
+                cursor.execute("SELECT comments_indexed FROM results LIMIT 1")
+            except sqlite3.OperationalError:
+                # Column doesn't exist; older rows get indexed on first view
+                cursor.execute("ALTER TABLE results ADD COLUMN comments_indexed INTEGER NOT NULL DEFAULT 0")
+            
+            # Check if duplicate_of column exists, add it if not
+            try:
+                cursor.execute("SELECT duplicate_of FROM results LIMIT 1")
+            except sqlite3.OperationalError:
+                # Column doesn't exist; older rows are checked by dedup.py --rebuild
+                cursor.execute("ALTER TABLE results ADD COLUMN duplicate_of INTEGER")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_duplicate_of ON results (duplicate_of)")
+            
+            # Check if the post author and score columns exist, add them if not
+            try:
+                cursor.execute("SELECT author, score FROM results LIMIT 1")
+            except sqlite3.OperationalError:
+                # Columns don't exist; older rows have no post author
+                cursor.execute("ALTER TABLE results ADD COLUMN author TEXT")
+                cursor.execute("ALTER TABLE results ADD COLUMN score INTEGER")
+            
+            # MinHash signatures of stored posts and their LSH band keys (see dedup.py)
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS minhash_signatures (
+                result_id INTEGER PRIMARY KEY,
+                signature BLOB NOT NULL
+            )
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS minhash_bands (
+                search_term TEXT NOT NULL,
+                key INTEGER NOT NULL,
+                result_id INTEGER NOT NULL,
+                PRIMARY KEY (search_term, key, result_id)
+            ) WITHOUT ROWID
+            ''')
+            
+            # Comment trees flattened into rows so viewers can load one level at a time
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS comments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                result_id INTEGER NOT NULL,
+                parent_id INTEGER,
+                position INTEGER NOT NULL,
+                author TEXT,
+                score INTEGER,
+                body TEXT,
+                reply_count INTEGER NOT NULL DEFAULT 0
+            )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_parent ON comments (result_id, parent_id, position)")
+            
+            # Keywords polled by the scheduler; times are Unix timestamps, intervals seconds
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS watched_keywords (
+                keyword TEXT PRIMARY KEY,
+                timeframe TEXT NOT NULL DEFAULT 'week',
+                min_interval INTEGER NOT NULL,
+                max_interval INTEGER NOT NULL,
+                interval INTEGER NOT NULL,
+                velocity REAL NOT NULL DEFAULT 0,
+                cost REAL NOT NULL DEFAULT 0,
+                last_run REAL,
+                next_run REAL NOT NULL,
+                last_new_posts INTEGER NOT NULL DEFAULT 0,
+                runs INTEGER NOT NULL DEFAULT 0,
+                requests INTEGER NOT NULL DEFAULT 0,
+                enabled INTEGER NOT NULL DEFAULT 1,
+                created_at TEXT NOT NULL
+            )
+            ''')
+            
+            # Known URLs of a search term, so repeated polls only fetch new posts
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_results_term_url ON results (search_term, url)")
+            
+            # Storage codec settings and the zstd dictionaries compressed rows refer to
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS storage_settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS compression_dictionaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data BLOB NOT NULL,
+                created_at TEXT NOT NULL
+            )
+            ''')
+            
+            # Per-day trend statistics of posts removed by retention (see retention.py)
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_rollups (
+                search_term TEXT NOT NULL,
+                day TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (search_term, day)
+            )
+            ''')
+            
+            # Author index: activity per author, search term and community, tallied as posts
+            # and comments are saved (seen times are post dates; comments have none of their
+            # own), and its totals per author and per author and search term, kept alongside
+            # so top-author queries read them without aggregating
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS author_activity (
+                author TEXT NOT NULL,
+                search_term TEXT NOT NULL,
+                community TEXT NOT NULL,
+                posts INTEGER NOT NULL DEFAULT 0,
+                post_score INTEGER NOT NULL DEFAULT 0,
+                duplicate_posts INTEGER NOT NULL DEFAULT 0,
+                comments INTEGER NOT NULL DEFAULT 0,
+                comment_score INTEGER NOT NULL DEFAULT 0,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                PRIMARY KEY (author, community, search_term)
+            ) WITHOUT ROWID
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_author_activity_term ON author_activity (search_term, community)")
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS authors (
+                author TEXT PRIMARY KEY,
+                posts INTEGER NOT NULL,
+                post_score INTEGER NOT NULL,
+                duplicate_posts INTEGER NOT NULL,
+                comments INTEGER NOT NULL,
+                comment_score INTEGER NOT NULL,
+                communities INTEGER NOT NULL,
+                search_terms INTEGER NOT NULL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS author_terms (
+                search_term TEXT NOT NULL,
+                author TEXT NOT NULL,
+                posts INTEGER NOT NULL,
+                post_score INTEGER NOT NULL,
+                duplicate_posts INTEGER NOT NULL,
+                comments INTEGER NOT NULL,
+                comment_score INTEGER NOT NULL,
+                communities INTEGER NOT NULL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                PRIMARY KEY (search_term, author)
+            ) WITHOUT ROWID
+            ''')
+            
+            conn.commit()
+    
+    def _load_codec(self, name=None):
+        """StorageCodec from the stored settings, with name overriding the stored codec"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT key, value FROM storage_settings")
+            settings = dict(cursor.fetchall())
+            cursor.execute("SELECT id, data FROM compression_dictionaries")
+            dictionaries = dict(cursor.fetchall())
+        
+        stored = settings.get('codec') or 'none'
+        name = name or stored
+        level = int(settings['level']) if settings.get('level') and name == stored else None
+        dictionary_id = int(settings['dictionary_id']) if settings.get('dictionary_id') else None
+        return StorageCodec(name, level, dictionaries, dictionary_id, load_dictionary=self._load_dictionary)
+    
+    def _load_dictionary(self, dictionary_id):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT data FROM compression_dictionaries WHERE id = ?", (dictionary_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
+    def _set_storage_settings(self, **settings):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+            INSERT INTO storage_settings (key, value) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value
+            ''', [(key, None if value is None else str(value)) for key, value in settings.items()])
+            conn.commit()
+    
+    def set_storage_codec(self, name, level=None):
+        """Compress rows written from now on with this codec (existing rows: recompress_results)"""
+        self._set_storage_settings(codec=name, level=level)
+        self.codec = self._load_codec()
+        return self.codec
+    
+    def train_compression_dictionary(self, size=None, samples=5000):
+        """
+        Train a zstd dictionary on the content and comments of the newest rows and use it
+        for rows compressed from now on; returns its id, or None if there is too little text
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT content, comments FROM results ORDER BY id DESC LIMIT ?", (samples,))
+            texts = [self.codec.decode(value) for row in cursor.fetchall() for value in row if value]
+        
+        try:
+            dictionary = train_dictionary(texts, size) if size else train_dictionary(texts)
+        except Exception as e:
+            # zstd refuses to train on too few or too small samples
+            log.warning("dictionary training failed", samples=len(texts), error=e)
+            return None
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO compression_dictionaries (data, created_at) VALUES (?, ?)",
+                           (dictionary, datetime.now().isoformat()))
+            dictionary_id = cursor.lastrowid
+            conn.commit()
+        
+        log.info("dictionary trained", id=dictionary_id, samples=len(texts), bytes=len(dictionary))
+        self._set_storage_settings(dictionary_id=dictionary_id)
+        self.codec = self._load_codec(self.codec.name)
+        return dictionary_id
+    
+    def recompress_results(self, batch_size=500, progress=None):
+        """
+        Rewrite the stored content and comments of every row, and the body of every
+        comment row, with the current codec, a batch per transaction; returns the number
+        of result rows changed
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            total = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        
+        last_id = 0
+        done = changed = 0
+        while True:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, content, comments FROM results WHERE id > ? ORDER BY id LIMIT ?",
+                               (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                
+                updates = []
+                for result_id, content, comments in rows:
+                    new_content = self.codec.encode(self.codec.decode(content))
+                    new_comments = self.codec.encode(self.codec.decode(comments))
+                    if new_content != content or new_comments != comments:
+                        updates.append((new_content, new_comments, result_id))
+                cursor.executemany("UPDATE results SET content = ?, comments = ? WHERE id = ?", updates)
+                conn.commit()
+            
+            changed += len(updates)
+            done += len(rows)
+            last_id = rows[-1][0]
+            if progress:
+                progress(done, total)
+        
+        # The indexed comment rows hold every comment body a second time
+        last_id = 0
+        comments_changed = 0
+        while True:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, body FROM comments WHERE id > ? ORDER BY id LIMIT ?",
+                               (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                
+                updates = []
+                for comment_id, body in rows:
+                    new_body = self.codec.encode(self.codec.decode(body))
+                    if new_body != body:
+                        updates.append((new_body, comment_id))
+                cursor.executemany("UPDATE comments SET body = ? WHERE id = ?", updates)
+                conn.commit()
+            
+            comments_changed += len(updates)
+            last_id = rows[-1][0]
+        
+        log.info("results recompressed", codec=self.codec.name, rows=done, changed=changed,
+                 comments_changed=comments_changed)
+        return changed
+    
+    def storage_stats(self):
+        """
+        Row counts and bytes taken by the content and comments columns and by the bodies of
+        the indexed comment rows, and the file size
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            SELECT COUNT(*),
+                   COALESCE(SUM(typeof(content) = 'blob' OR typeof(comments) = 'blob'), 0),
+                   COALESCE(SUM(length(CAST(content AS BLOB))), 0),
+                   COALESCE(SUM(length(CAST(comments AS BLOB))), 0)
+            FROM results
+            ''')
+            rows, compressed, content_bytes, comment_bytes = cursor.fetchone()
+            cursor.execute('''
+            SELECT COUNT(*), COALESCE(SUM(typeof(body) = 'blob'), 0), COALESCE(SUM(length(CAST(body AS BLOB))), 0)
+            FROM comments
+            ''')
+            comment_rows, compressed_comment_rows, comment_row_bytes = cursor.fetchone()
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return {
+            "codec": self.codec.name,
+            "rows": rows,
+            "compressed_rows": compressed,
+            "content_bytes": content_bytes,
+            "comment_bytes": comment_bytes,
+            "comment_rows": comment_rows,
+            "compressed_comment_rows": compressed_comment_rows,
+            "comment_row_bytes": comment_row_bytes,
+            "stored_bytes": content_bytes + comment_bytes + comment_row_bytes,
+            "file_bytes": page_count * page_size,
+            "free_bytes": free_pages * page_size
+        }
+    
+    def vacuum(self):
+        """
+        Rebuild the database file to return the space freed by deletes and recompression,
+        switching it to incremental vacuuming on the way
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+    
+    def incremental_vacuum(self, pages=None):
+        """
+        Give up to `pages` free pages (all of them when None) back to the file system
+        without rebuilding the file; returns the number of pages freed. Only databases in
+        incremental mode can do this: new ones are, older ones after one vacuum().
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return 0
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # execute() steps the pragma once, freeing a single page; a script runs it to the end
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages or 0)})")
+            return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            conn.close()
+    
+    def get_retention_policy(self):
+        """Stored retention policy as {"comment_days": days, "post_days": days}, None meaning forever"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT key, value FROM storage_settings WHERE key LIKE 'retention_%'")
+            settings = dict(cursor.fetchall())
+        
+        return {
+            name: int(settings[f"retention_{name}"]) if settings.get(f"retention_{name}") else None
+            for name in ("comment_days", "post_days")
+        }
+    
+    def set_retention_policy(self, comment_days=None, post_days=None):
+        """Keep comment trees for comment_days and posts for post_days (None keeps them forever)"""
+        for days in (comment_days, post_days):
+            if days is not None and days < 1:
+                raise ValueError(f"Retention periods must be at least one day, not {days}")
+        self._set_storage_settings(retention_comment_days=comment_days, retention_post_days=post_days)
+    
+    def strip_comments(self, before_day, batch_size=500):
+        """
+        Drop the comment trees (JSON and comment rows) of posts dated before before_day
+        (YYYY-MM-DD), or stored before it when undated, keeping the posts themselves.
+        Works a batch per transaction; returns the number of posts stripped.
+        """
+        last_id = 0
+        stripped = 0
+        while True:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                SELECT id FROM results
+                WHERE id > ?
+                  AND CASE WHEN date IS NULL OR date = '' THEN created_at ELSE substr(date, 1, 10) END < ?
+                  AND (comments IS NOT NULL OR EXISTS (SELECT 1 FROM comments WHERE result_id = results.id))
+                ORDER BY id LIMIT ?
+                ''', (last_id, before_day, batch_size))
+                ids = [(row[0],) for row in cursor.fetchall()]
+                if not ids:
+                    break
+                
+                # Marked indexed so ensure_comment_index leaves the empty tree alone
+                cursor.executemany("UPDATE results SET comments = NULL, comments_indexed = 1 WHERE id = ?", ids)
+                cursor.executemany("DELETE FROM comments WHERE result_id = ?", ids)
+                conn.commit()
+            
+            stripped += len(ids)
+            last_id = ids[-1][0]
+        
+        if stripped:
+            log.info("comments stripped", before=before_day, posts=stripped)
+        return stripped
+    
+    def get_expired_days(self, before_day):
+        """
+        Search terms with posts dated before before_day (or undated and stored before it),
+        as {search_term: (days, max_id)}: the dated days to roll up, and the newest of
+        those rows, so expire_results can leave rows stored after the rollup alone
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT search_term, CASE WHEN date IS NULL OR date = '' THEN NULL ELSE substr(date, 1, 10) END AS day,
+                   MAX(id)
+            FROM results
+            WHERE CASE WHEN date IS NULL OR date = '' THEN created_at ELSE substr(date, 1, 10) END < ?
+            GROUP BY search_term, day
+            ORDER BY search_term, day
+            ''', (before_day,))
+            
+            expired = {}
+            for search_term, day, max_id in cursor.fetchall():
+                days, newest = expired.get(search_term, ([], 0))
+                if day is not None:
+                    days.append(day)
+                expired[search_term] = (days, max(newest, max_id))
+            return expired
+    
+    def expire_results(self, search_term, before_day, max_id=None):
+        """
+        Delete the posts of a search term dated before before_day (or stored before it
+        when undated), optionally only rows up to max_id; returns the number deleted
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            query = '''
+            DELETE FROM results
+            WHERE search_term = ?
+              AND CASE WHEN date IS NULL OR date = '' THEN created_at ELSE substr(date, 1, 10) END < ?
+            '''
+            params = [search_term, before_day]
+            if max_id is not None:
+                query += " AND id <= ?"
+                params.append(max_id)
+            
+            cursor.execute(query, params)
+            deleted = cursor.rowcount
+            
+            # Drop the comment rows and duplicate index entries of deleted results
+            if deleted:
+                cursor.execute("DELETE FROM comments WHERE result_id NOT IN (SELECT id FROM results)")
+                self._repair_duplicates(cursor)
+            
             conn.commit()
+        
+        if deleted:
+            log.info("results expired", search_term=search_term, before=before_day, rows=deleted)
+        return deleted
+    
+    def get_daily_rollups(self, search_term):
+        """Rolled-up days of a search term as {day: data}"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT day, data FROM daily_rollups WHERE search_term = ?", (search_term,))
+            return {day: json.loads(data) for day, data in cursor.fetchall()}
     
+    def save_daily_rollups(self, search_term, rollups):
+        """Store rolled-up days of a search term, given as {day: data}, replacing earlier ones"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            now = datetime.now().isoformat()
+            cursor.executemany('''
+            INSERT OR REPLACE INTO daily_rollups (search_term, day, data, updated_at)
+            VALUES (?, ?, ?, ?)
+            ''', [(search_term, day, json.dumps(data), now) for day, data in rollups.items()])
+            
+            conn.commit()
+    
+    def _decode_result(self, result, include_comments=True):
+        """Decompress the content and parse the comments of a result row, in place"""
+        result.pop('comments_indexed', None)
+        if 'content' in result:
+            result['content'] = self.codec.decode(result['content'])
+        if not include_comments:
+            result.pop('comments', None)
+            return result
+        if 'comments' not in result:
+            return result
+        try:
+            comments = self.codec.decode(result.get('comments'))
+            result['comments'] = load_comments(comments) if comments else []
+        except Exception:
+            result['comments'] = []
+        return result
+    
+    @OPERATION_SECONDS.timed(operation="save_results")
+    @profiling.profiled("db.save_results")
     def save_results(self, results, search_term):
-        """Save search results to database"""
+        """
+        Save search results to database and return the ids of their rows
+        A near duplicate of a post already stored for the search term is stored with
+        duplicate_of set to that post, or, when dedup is "collapse", not stored at all
+        and that post's id returned for it.
+        """
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
+            now = datetime.now().isoformat()
+            result_ids = []
+            # {(author, community): [posts, post score, duplicate posts, comments, comment score, first, last]}
+            authors = {}
             for result in results:
+                signature = keys = duplicate_of = None
+                if self.dedup != "off":
+                    with profiling.stage("db.minhash"):
+                        signature = self.duplicates.hasher.signature(post_text(result))
+                        if signature is not None:
+                            keys = self.duplicates.hasher.band_keys(signature)
+                            duplicate_of = self._find_duplicate(cursor, search_term, signature, keys=keys)
+                    if duplicate_of is not None:
+                        NEAR_DUPLICATES.inc(mode=self.dedup)
+                        if self.dedup == "collapse":
+                            result_ids.append(duplicate_of)
+                            continue
+                
+                # A post saved again under a URL already stored for the search term (a
+                # re-scrape) had its author activity tallied when it was first saved
+                resaved = bool(result.get('url')) and cursor.execute(
+                    "SELECT 1 FROM results WHERE search_term = ? AND url = ? LIMIT 1",
+                    (search_term, result['url'])).fetchone() is not None
+                
                 # Convert comments to JSON string if they exist
                 comments_json = None
                 if 'comments' in result and result['comments']:
-                    comments_json = json.dumps(result['comments'])
+                    with profiling.stage("db.serialize_comments"):
+                        comments_json = self.codec.encode(
+                            json.dumps(result['comments'], default=json_default, separators=(',', ':')))
                 
                 cursor.execute('''
                 INSERT INTO results 
-                (title, url, source, community, date, content, search_term, created_at, comments)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (title, url, source, community, date, content, search_term, created_at, comments, duplicate_of,
+                 author, score)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     result.get('title', ''),
                     result.get('url', ''),
                     result.get('source', ''),
                     result.get('community', ''),
                     result.get('date', None),
-                    result.get('content', ''),
+                    self.codec.encode(result.get('content', '')),
                     search_term,
-                    datetime.now().isoformat(),
-                    comments_json
+                    now,
+                    comments_json,
+                    duplicate_of,
+                    result.get('author'),
+                    result.get('score')
                 ))
+                result_id = cursor.lastrowid
+                result_ids.append(result_id)
+                if signature is not None:
+                    self.duplicates.add(cursor, result_id, search_term, signature, keys)
+                
+                # Comment authors are tallied while the tree is walked for indexing
+                comment_authors = {}
+                self._index_comments(cursor, result_id, result.get('comments') or [], comment_authors)
+                if not resaved:
+                    self._tally_authors(authors, result, result.get('date') or now, duplicate_of is not None,
+                                        comment_authors)
             
+            self._save_author_tallies(cursor, search_term, authors)
             conn.commit()
+            
+            ROWS_WRITTEN.inc(len(result_ids), table="results")
+            log.debug("results saved", search_term=search_term, rows=len(result_ids))
+            return result_ids
+    
+    def _find_duplicate(self, cursor, search_term, signature, exclude=None, keys=None):
+        """Id of the original of the stored post a signature nearly matches, or None"""
+        match, _ = self.duplicates.find(cursor, search_term, signature, exclude, keys)
+        if match is None:
+            return None
+        cursor.execute("SELECT duplicate_of FROM results WHERE id = ?", (match,))
+        row = cursor.fetchone()
+        return row[0] if row and row[0] is not None else match
+    
+    def find_near_duplicate(self, search_term, result):
+        """Id of the stored post of a search term that a result nearly duplicates, or None"""
+        signature = self.duplicates.hasher.signature(post_text(result))
+        if signature is None:
+            return None
+        with sqlite3.connect(self.db_path) as conn:
+            return self._find_duplicate(conn.cursor(), search_term, signature)
+    
+    def rebuild_duplicate_index(self, search_term=None, batch_size=500, progress=None):
+        """
+        Index the stored posts that have no signature yet, oldest first, flagging those
+        that nearly duplicate an earlier post; returns the number of posts indexed
+        """
+        condition = "s.result_id IS NULL" + (" AND r.search_term = ?" if search_term else "")
+        params = [search_term] if search_term else []
+        with sqlite3.connect(self.db_path) as conn:
+            total = conn.execute(f'''
+            SELECT COUNT(*) FROM results r LEFT JOIN minhash_signatures s ON s.result_id = r.id WHERE {condition}
+            ''', params).fetchone()[0]
+        
+        last_id = 0
+        done = indexed = 0
+        while True:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                SELECT r.id, r.search_term, r.title, r.content FROM results r
+                LEFT JOIN minhash_signatures s ON s.result_id = r.id
+                WHERE r.id > ? AND {condition}
+                ORDER BY r.id LIMIT ?
+                ''', [last_id] + params + [batch_size])
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                
+                for result_id, term, title, content in rows:
+                    signature = self.duplicates.hasher.signature(
+                        post_text({"title": title, "content": self.codec.decode(content)}))
+                    if signature is None:
+                        continue
+                    duplicate_of = self._find_duplicate(cursor, term, signature, exclude=result_id)
+                    # Only earlier posts are originals, as if the posts were saved in order
+                    if duplicate_of is not None and duplicate_of < result_id:
+                        cursor.execute("UPDATE results SET duplicate_of = ? WHERE id = ?", (duplicate_of, result_id))
+                    self.duplicates.add(cursor, result_id, term, signature)
+                    indexed += 1
+                conn.commit()
+            
+            done += len(rows)
+            last_id = rows[-1][0]
+            if progress:
+                progress(done, total)
+        
+        log.info("duplicate index rebuilt", search_term=search_term, posts=done, indexed=indexed)
+        return indexed
+    
+    def duplicate_stats(self, search_term=None):
+        """Stored posts, how many are indexed for duplicate detection, and how many are duplicates"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(f'''
+            SELECT COUNT(*), COUNT(s.result_id), COUNT(r.duplicate_of)
+            FROM results r LEFT JOIN minhash_signatures s ON s.result_id = r.id
+            {"WHERE r.search_term = ?" if search_term else ""}
+            ''', [search_term] if search_term else [])
+            rows, indexed, duplicates = cursor.fetchone()
+            return {"rows": rows, "indexed": indexed, "duplicates": duplicates}
+    
+    def get_duplicate_groups(self, search_term=None, limit=10):
+        """Posts with the most near duplicates, as light rows with a duplicates count"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute(f'''
+            SELECT r.id, r.title, r.url, r.search_term, COUNT(*) AS duplicates
+            FROM results d JOIN results r ON r.id = d.duplicate_of
+            {"WHERE r.search_term = ?" if search_term else ""}
+            GROUP BY r.id
+            ORDER BY duplicates DESC, r.id
+            LIMIT ?
+            ''', ([search_term] if search_term else []) + [limit])
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def _repair_duplicates(self, cursor):
+        """
+        After deletes: drop index entries of deleted posts, and make the oldest remaining
+        duplicate of each deleted original the new original of the others
+        """
+        self.duplicates.remove_missing(cursor)
+        cursor.execute('''
+        SELECT id, duplicate_of FROM results
+        WHERE duplicate_of IS NOT NULL AND duplicate_of NOT IN (SELECT id FROM results)
+        ORDER BY id
+        ''')
+        originals = {}
+        updates = []
+        for result_id, duplicate_of in cursor.fetchall():
+            if duplicate_of not in originals:
+                originals[duplicate_of] = result_id
+                updates.append((None, result_id))
+            else:
+                updates.append((originals[duplicate_of], result_id))
+        cursor.executemany("UPDATE results SET duplicate_of = ? WHERE id = ?", updates)
+    
+    def _tally_authors(self, authors, result, seen, duplicate, comment_authors):
+        """Add a saved post, and the {author: [comments, score]} of its tree, to an author tally"""
+        community = result.get('community') or ''
+        entries = []
+        author = result.get('author')
+        if author and author not in ANONYMOUS_AUTHORS:
+            entries.append((author, (1, result.get('score') or 0, int(duplicate), 0, 0)))
+        for author, (count, score) in comment_authors.items():
+            if author and author not in ANONYMOUS_AUTHORS:
+                entries.append((author, (0, 0, 0, count, score)))
+        
+        for author, counts in entries:
+            tally = authors.get((author, community))
+            if tally is None:
+                authors[(author, community)] = list(counts) + [seen, seen]
+                continue
+            for index, count in enumerate(counts):
+                tally[index] += count
+            tally[5] = min(tally[5], seen)
+            tally[6] = max(tally[6], seen)
+    
+    def _save_author_tallies(self, cursor, search_term, authors):
+        """Add an author tally of a search term to author_activity and to the authors' totals"""
+        if not authors:
+            return
+        # Whether each author was seen in each community before, at all and under this
+        # search term, and under this search term at all, to count new ones
+        cursor.execute('''
+        WITH tallied (author, community) AS (
+            SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?)
+        )
+        SELECT t.author, t.community,
+               EXISTS (SELECT 1 FROM author_activity a WHERE a.author = t.author AND a.community = t.community),
+               EXISTS (SELECT 1 FROM author_activity a
+                       WHERE a.author = t.author AND a.search_term = ? AND a.community = t.community),
+               EXISTS (SELECT 1 FROM author_terms a WHERE a.search_term = ? AND a.author = t.author)
+        FROM tallied t
+        ''', (json.dumps(list(authors)), search_term, search_term))
+        known = {(author, community): (seen, seen_in_term, term_seen)
+                 for author, community, seen, seen_in_term, term_seen in cursor.fetchall()}
+        
+        # {author: [posts, post score, duplicate posts, comments, comment score, first, last, new communities,
+        #           new communities of the term, seen under the term before]}
+        totals = {}
+        for (author, community), tally in authors.items():
+            seen, seen_in_term, term_seen = known[(author, community)]
+            total = totals.get(author)
+            if total is None:
+                total = totals[author] = tally[:5] + [tally[5], tally[6], 0, 0, term_seen]
+            else:
+                for index in range(5):
+                    total[index] += tally[index]
+                total[5] = min(total[5], tally[5])
+                total[6] = max(total[6], tally[6])
+            total[7] += not seen
+            total[8] += not seen_in_term
+        
+        cursor.executemany(f'''
+        INSERT INTO author_activity
+        (author, search_term, community, posts, post_score, duplicate_posts, comments, comment_score,
+         first_seen, last_seen)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (author, community, search_term) DO UPDATE SET {_AUTHOR_ADDS}
+        ''', [(author, search_term, community, *tally) for (author, community), tally in authors.items()])
+        cursor.executemany(f'''
+        INSERT INTO authors
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (author) DO UPDATE SET {_AUTHOR_ADDS},
+            communities = communities + excluded.communities,
+            search_terms = search_terms + excluded.search_terms
+        ''', [(author, *total[:5], total[7], int(not total[9]), total[5], total[6]) for author, total in totals.items()])
+        cursor.executemany(f'''
+        INSERT INTO author_terms
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (search_term, author) DO UPDATE SET {_AUTHOR_ADDS},
+            communities = communities + excluded.communities
+        ''', [(search_term, author, *total[:5], total[8], total[5], total[6]) for author, total in totals.items()])
+        ROWS_WRITTEN.inc(len(authors), table="author_activity")
+    
+    def _refresh_author_totals(self, cursor, authors):
+        """Recompute the totals of authors from author_activity, after some of their activity was deleted"""
+        authors = json.dumps(sorted(authors))
+        cursor.execute("DELETE FROM authors WHERE author IN (SELECT value FROM json_each(?))", (authors,))
+        cursor.execute(f'''
+        INSERT INTO authors
+        SELECT author, {_AUTHOR_SUMS}, COUNT(DISTINCT community), COUNT(DISTINCT search_term),
+               MIN(first_seen), MAX(last_seen)
+        FROM author_activity WHERE author IN (SELECT value FROM json_each(?)) GROUP BY author
+        ''', (authors,))
+    
+    def rebuild_author_index(self):
+        """
+        Recount the author index from the stored posts and comment rows, for databases
+        from before it existed; activity whose posts or comments retention has already
+        removed is lost. Returns the number of authors.
+        """
+        # Comment trees stored before the comments table get their rows first
+        with sqlite3.connect(self.db_path) as conn:
+            pending = [row[0] for row in conn.execute(
+                "SELECT id FROM results WHERE comments_indexed = 0 AND comments IS NOT NULL")]
+        for result_id in pending:
+            self.ensure_comment_index(result_id)
+        
+        anonymous = ",".join("?" * len(ANONYMOUS_AUTHORS))
+        seen = "COALESCE(NULLIF(r.date, ''), r.created_at)"
+        # Posts saved again under a URL stored earlier for the same search term are not counted
+        first_saved = '''NOT EXISTS (SELECT 1 FROM results o
+                              WHERE o.search_term = r.search_term AND o.url = r.url AND o.id < r.id)'''
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            for table in ("author_activity", "authors", "author_terms"):
+                cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(f'''
+            INSERT INTO author_activity
+            (author, search_term, community, posts, post_score, duplicate_posts, comments, comment_score,
+             first_seen, last_seen)
+            SELECT r.author, r.search_term, COALESCE(r.community, ''), COUNT(*), SUM(COALESCE(r.score, 0)),
+                   COUNT(r.duplicate_of), 0, 0, MIN({seen}), MAX({seen})
+            FROM results r
+            WHERE r.author IS NOT NULL AND r.author != '' AND r.author NOT IN ({anonymous})
+              AND (COALESCE(r.url, '') = '' OR {first_saved})
+            GROUP BY r.author, r.search_term, COALESCE(r.community, '')
+            ''', list(ANONYMOUS_AUTHORS))
+            # The WHERE clause is required for an upsert from a SELECT
+            cursor.execute(f'''
+            INSERT INTO author_activity
+            (author, search_term, community, posts, post_score, duplicate_posts, comments, comment_score,
+             first_seen, last_seen)
+            SELECT c.author, r.search_term, COALESCE(r.community, ''), 0, 0, 0, COUNT(*), SUM(COALESCE(c.score, 0)),
+                   MIN({seen}), MAX({seen})
+            FROM comments c JOIN results r ON r.id = c.result_id
+            WHERE c.author IS NOT NULL AND c.author != '' AND c.author NOT IN ({anonymous})
+              AND (COALESCE(r.url, '') = '' OR {first_saved})
+            GROUP BY c.author, r.search_term, COALESCE(r.community, '')
+            ON CONFLICT (author, community, search_term) DO UPDATE SET
+                comments = excluded.comments,
+                comment_score = excluded.comment_score,
+                first_seen = MIN(first_seen, excluded.first_seen),
+                last_seen = MAX(last_seen, excluded.last_seen)
+            ''', list(ANONYMOUS_AUTHORS))
+            cursor.execute(f'''
+            INSERT INTO authors
+            SELECT author, {_AUTHOR_SUMS}, COUNT(DISTINCT community), COUNT(DISTINCT search_term),
+                   MIN(first_seen), MAX(last_seen)
+            FROM author_activity GROUP BY author
+            ''')
+            cursor.execute(f'''
+            INSERT INTO author_terms
+            SELECT search_term, author, {_AUTHOR_SUMS}, COUNT(*), MIN(first_seen), MAX(last_seen)
+            FROM author_activity GROUP BY search_term, author
+            ''')
+            
+            authors = cursor.execute("SELECT COUNT(*) FROM authors").fetchone()[0]
+            conn.commit()
+        
+        log.info("author index rebuilt", authors=authors)
+        return authors
+    
+    @OPERATION_SECONDS.timed(operation="get_top_authors")
+    def get_top_authors(self, search_term=None, community=None, sort="activity", limit=20):
+        """
+        Most active authors, optionally of one search term and/or community, with their
+        summed posts, comments and scores, the number of communities and search terms they
+        appear in, and when they were first and last seen; sort is one of AUTHOR_SORTS
+        """
+        if sort not in AUTHOR_SORTS:
+            raise ValueError(f"Unsupported author sort: {sort} (expected one of {', '.join(AUTHOR_SORTS)})")
+        order = f"ORDER BY {AUTHOR_SORTS[sort]} DESC, author LIMIT ?"
+        
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            if community:
+                # Communities are few per author, so their activity is summed on the fly
+                # (in a subquery, so the sort expressions see the sums, not the columns)
+                cursor.execute(f'''
+                SELECT * FROM (
+                    SELECT author, {_AUTHOR_SUMS_AS}, COUNT(DISTINCT community) AS communities,
+                           COUNT(DISTINCT search_term) AS search_terms, MIN(first_seen) AS first_seen,
+                           MAX(last_seen) AS last_seen
+                    FROM author_activity
+                    WHERE community = ? {"AND search_term = ?" if search_term else ""}
+                    GROUP BY author
+                ) {order}
+                ''', [community] + ([search_term] if search_term else []) + [limit])
+            elif search_term:
+                cursor.execute(f'''
+                SELECT author, posts, post_score, duplicate_posts, comments, comment_score, communities,
+                       1 AS search_terms, first_seen, last_seen
+                FROM author_terms WHERE search_term = ? {order}
+                ''', (search_term, limit))
+            else:
+                cursor.execute(f"SELECT * FROM authors {order}", (limit,))
+            rows = [dict(row) for row in cursor.fetchall()]
+            ROWS_READ.inc(len(rows), operation="get_top_authors")
+            return rows
+    
+    def get_author(self, author):
+        """
+        Activity of one author (e.g. "u/name"): the totals get_top_authors reports, plus
+        "breakdown", one row per search term and community; None if never seen
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT * FROM authors WHERE author = ?", (author,))
+            totals = cursor.fetchone()
+            if totals is None:
+                return None
+            
+            cursor.execute('''
+            SELECT search_term, community, posts, post_score, duplicate_posts, comments, comment_score,
+                   first_seen, last_seen
+            FROM author_activity WHERE author = ?
+            ORDER BY posts + comments DESC, search_term, community
+            ''', (author,))
+            return dict(totals, breakdown=[dict(row) for row in cursor.fetchall()])
+    
+    def count_authors(self, search_term=None):
+        """Number of distinct authors, optionally of one search term"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            if search_term:
+                cursor.execute("SELECT COUNT(*) FROM author_terms WHERE search_term = ?", (search_term,))
+            else:
+                cursor.execute("SELECT COUNT(*) FROM authors")
+            return cursor.fetchone()[0]
+    
+    def _index_comments(self, cursor, result_id, comments, authors=None):
+        """
+        Store a comment tree as rows of the comments table
+        authors, if given, gets each author's [comments, score] added to it
+        """
+        # Walk the tree iteratively: (comment, parent row id, position among siblings)
+        stack = [(comment, None, position) for position, comment in reversed(list(enumerate(comments)))]
+        rows = 0
+        while stack:
+            comment, parent_id, position = stack.pop()
+            if not isinstance(comment, Mapping):
+                comment = {"author": "Unknown", "score": 0, "body": str(comment), "replies": []}
+            
+            replies = comment.get('replies') or []
+            if authors is not None:
+                tally = authors.setdefault(comment.get('author', 'Anonymous'), [0, 0])
+                tally[0] += 1
+                tally[1] += comment.get('score') or 0
+            cursor.execute('''
+            INSERT INTO comments (result_id, parent_id, position, author, score, body, reply_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                result_id,
+                parent_id,
+                position,
+                comment.get('author', 'Anonymous'),
+                comment.get('score', 0),
+                self.codec.encode(comment.get('body', '')),
+                len(replies)
+            ))
+            
+            comment_id = cursor.lastrowid
+            rows += 1
+            for reply_position, reply in reversed(list(enumerate(replies))):
+                stack.append((reply, comment_id, reply_position))
+        
+        cursor.execute("UPDATE results SET comments_indexed = 1 WHERE id = ?", (result_id,))
+        ROWS_WRITTEN.inc(rows, table="comments")
+    
+    def ensure_comment_index(self, result_id):
+        """Index the comment tree of a result stored before the comments table existed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT comments, comments_indexed FROM results WHERE id = ?", (result_id,))
+            row = cursor.fetchone()
+            if row is None or row[1]:
+                return
+            
+            try:
+                comments = load_comments(self.codec.decode(row[0])) if row[0] else []
+            except (ValueError, TypeError) as e:
+                # Bad JSON, or a compression dictionary the database lacks; the tree stays
+                # unindexed so it is tried again rather than recorded as having no comments
+                log.warning("comment tree not indexed", result_id=result_id, error=e)
+                return
+            
+            cursor.execute("DELETE FROM comments WHERE result_id = ?", (result_id,))
+            self._index_comments(cursor, result_id, comments)
+            conn.commit()
+    
+    def count_comment_children(self, result_id, parent_id=None):
+        """Count the direct replies of a comment, or the top-level comments of a result"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT COUNT(*) FROM comments WHERE result_id = ? AND parent_id IS ?
+            ''', (result_id, parent_id))
+            return cursor.fetchone()[0]
+    
+    def get_comment_children(self, result_id, parent_id=None, offset=0, limit=200):
+        """Get one page of the direct replies of a comment (or top-level comments), in order"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT id, author, score, body, reply_count FROM comments
+            WHERE result_id = ? AND parent_id IS ?
+            ORDER BY position LIMIT ? OFFSET ?
+            ''', (result_id, parent_id, limit, offset))
+            return [dict(row, body=self.codec.decode(row['body'])) for row in cursor.fetchall()]
     
     def save_search(self, search_term, timeframe):
         """Save search query to history"""
@@ -86,6 +1244,8 @@ class Database:
             ''', (search_term, timeframe, datetime.now().isoformat()))
             conn.commit()
     
+    @OPERATION_SECONDS.timed(operation="get_results")
+    @profiling.profiled("db.get_results")
     def get_results(self, search_term=None, timeframe=None, source=None, limit=50):
         """Retrieve results with optional filtering"""
         with sqlite3.connect(self.db_path) as conn:
@@ -130,19 +1290,112 @@ class Database:
             
             cursor.execute(query, params)
             results = [dict(row) for row in cursor.fetchall()]
+            ROWS_READ.inc(len(results), operation="get_results")
             
-            # Parse comments from JSON
+            # Decompress content and parse comments from JSON
             for result in results:
-                if 'comments' in result and result['comments']:
-                    try:
-                        result['comments'] = json.loads(result['comments'])
-                    except:
-                        result['comments'] = []
-                else:
-                    result['comments'] = []
+                self._decode_result(result)
             
             return results
     
+    @OPERATION_SECONDS.timed(operation="get_result_page")
+    def get_result_page(self, search_term=None, offset=0, limit=200):
+        """Get one page of light result rows (no content or comments), newest first"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            query = "SELECT id, title, url, source, community, date FROM results"
+            params = []
+            
+            if search_term:
+                query += " WHERE search_term = ?"
+                params.append(search_term)
+            
+            query += " ORDER BY date DESC, id DESC LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+            
+            cursor.execute(query, params)
+            rows = [dict(row) for row in cursor.fetchall()]
+            ROWS_READ.inc(len(rows), operation="get_result_page")
+            return rows
+    
+    def count_results(self, search_term=None):
+        """Count stored results, optionally for a specific search term"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            if search_term:
+                cursor.execute("SELECT COUNT(*) FROM results WHERE search_term = ?", (search_term,))
+            else:
+                cursor.execute("SELECT COUNT(*) FROM results")
+            
+            return cursor.fetchone()[0]
+    
+    @OPERATION_SECONDS.timed(operation="get_result")
+    def get_result(self, result_id, include_comments=True):
+        """Get a single result with its content and, optionally, parsed comments"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT * FROM results WHERE id = ?", (result_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            
+            # Comments are only decompressed and parsed when asked for
+            return self._decode_result(dict(row), include_comments)
+    
+    def iter_results(self, search_term=None, source=None, community=None, since=None, contains=None,
+                     limit=None, batch_size=500):
+        """
+        Yield stored results with parsed comments, oldest first, a batch at a time
+        so arbitrarily many results can be streamed without holding them all in memory
+        """
+        conditions = ["id > ?"]
+        params = []
+        
+        if search_term:
+            conditions.append("search_term = ?")
+            params.append(search_term)
+        if source:
+            conditions.append("source = ?")
+            params.append(source)
+        if community:
+            conditions.append("community = ?")
+            params.append(community)
+        if since:
+            conditions.append("date >= ?")
+            params.append(since)
+        if contains:
+            # Compressed content is matched through the codec (registered on the connection below)
+            conditions.append("(title LIKE ? OR stored_text(content) LIKE ?)")
+            params.extend([f"%{contains}%", f"%{contains}%"])
+        
+        query = "SELECT * FROM results WHERE " + " AND ".join(conditions) + " ORDER BY id LIMIT ?"
+        
+        last_id = 0
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            with OPERATION_SECONDS.time(operation="iter_results_batch"), sqlite3.connect(self.db_path) as conn:
+                conn.create_function("stored_text", 1, self.codec.decode, deterministic=True)
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute(query, [last_id] + params + [size])
+                rows = [dict(row) for row in cursor.fetchall()]
+            ROWS_READ.inc(len(rows), operation="iter_results")
+            
+            for result in rows:
+                yield self._decode_result(result)
+            
+            if len(rows) < size:
+                return
+            last_id = rows[-1]['id']
+            if remaining is not None:
+                remaining -= len(rows)
+    
     def get_search_history(self, limit=10):
         """Get recent search history"""
         with sqlite3.connect(self.db_path) as conn:
@@ -158,6 +1411,7 @@ class Database:
             history = [dict(row) for row in cursor.fetchall()]
             return history
     
+    @OPERATION_SECONDS.timed(operation="export_json")
     def export_results_to_json(self, search_term=None, output_path=None):
         """
         Export results to JSON file with organized folder structure:
@@ -182,15 +1436,9 @@ class Database:
             cursor.execute(query, params)
             results = [dict(row) for row in cursor.fetchall()]
             
-            # Parse comments from JSON string
+            # Decompress content and parse comments from JSON
             for result in results:
-                if 'comments' in result and result['comments']:
-                    try:
-                        result['comments'] = json.loads(result['comments'])
-                    except:
-                        result['comments'] = []
-                else:
-                    result['comments'] = []
+                self._decode_result(result)
         
         # Create base results directory
         results_dir = "results"
@@ -214,10 +1462,11 @@ class Database:
         
         # Write to JSON file
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+            json.dump(results, f, indent=2, ensure_ascii=False, default=json_default)
         
         return output_path
         
+    @OPERATION_SECONDS.timed(operation="export_csv")
     def export_results_to_csv(self, search_term=None, output_path=None):
         """
         Export results to CSV file with organized folder structure:
@@ -259,7 +1508,11 @@ class Database:
         with open(output_path, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
-            writer.writerows(results)
+            for result in results:
+                # Comment trees are written as JSON
+                if result.get('comments'):
+                    result['comments'] = json.dumps(result['comments'], ensure_ascii=False, default=json_default)
+                writer.writerow(result)
         
         return output_path
     
@@ -270,9 +1523,498 @@ class Database:
             
             if search_term:
                 cursor.execute("DELETE FROM results WHERE search_term = ?", (search_term,))
+                deleted = cursor.rowcount
+                # The term's authors lose its activity from their totals
+                cursor.execute("SELECT author FROM author_terms WHERE search_term = ?", (search_term,))
+                authors = [row[0] for row in cursor.fetchall()]
+                cursor.execute("DELETE FROM author_activity WHERE search_term = ?", (search_term,))
+                cursor.execute("DELETE FROM author_terms WHERE search_term = ?", (search_term,))
+                self._refresh_author_totals(cursor, authors)
             else:
                 cursor.execute("DELETE FROM results")
+                deleted = cursor.rowcount
+                for table in ("author_activity", "authors", "author_terms"):
+                    cursor.execute(f"DELETE FROM {table}")
+            
+            # Drop the comment rows and duplicate index entries of deleted results
+            cursor.execute("DELETE FROM comments WHERE result_id NOT IN (SELECT id FROM results)")
+            self._repair_duplicates(cursor)
             
             conn.commit()
             
-            return cursor.rowcount 
\ No newline at end of file
+            return deleted
+    
+    def get_unanalyzed_results(self, search_term):
+        """Get results for a search term that are not part of the analysis state yet (near duplicates never are)"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT r.id, r.title, r.url, r.source, r.community, r.date, r.content
+            FROM results r
+            LEFT JOIN analysis_documents a ON a.result_id = r.id
+            WHERE r.search_term = ? AND a.result_id IS NULL AND r.duplicate_of IS NULL
+            ORDER BY r.id
+            ''', (search_term,))
+            
+            return [self._decode_result(dict(row)) for row in cursor.fetchall()]
+    
+    def get_stale_analysis_documents(self, search_term):
+        """Get analysis contributions whose result rows have been removed or flagged as near duplicates"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT a.result_id, a.data, a.sentiment, a.community
+            FROM analysis_documents a
+            LEFT JOIN results r ON r.id = a.result_id
+            WHERE a.search_term = ? AND (r.id IS NULL OR r.duplicate_of IS NOT NULL)
+            ''', (search_term,))
+            
+            return [(result_id, dict(json.loads(data), sentiment=sentiment, community=community))
+                    for result_id, data, sentiment, community in cursor.fetchall()]
+    
+    @OPERATION_SECONDS.timed(operation="apply_analysis_delta")
+    def apply_analysis_delta(self, search_term, added_documents, removed_documents):
+        """
+        Fold analyzed documents into the analysis state of a search term.
+        added_documents and removed_documents are lists of (result_id, document) pairs
+        as produced by Processor.analyze_documents; documents without a community count
+        towards "Unknown" in the per-community breakdown. Added documents that are already
+        part of the state, and removed ones that no longer are, are skipped.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            # Take the write lock before reading which documents are already applied, so
+            # that concurrent updates of the same search term (which may have analyzed the
+            # same new results) add or subtract every document exactly once
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute('''
+            SELECT result_id FROM analysis_documents
+            WHERE result_id IN (SELECT value FROM json_each(?))
+            ''', (json.dumps([result_id for result_id, _ in added_documents + removed_documents]),))
+            applied = {result_id for (result_id,) in cursor.fetchall()}
+            added_documents = [(result_id, document) for result_id, document in added_documents
+                               if result_id not in applied]
+            removed_documents = [(result_id, document) for result_id, document in removed_documents
+                                 if result_id in applied]
+            
+            # Net change of every term, and of every community's posts, sentiment and
+            # words, across the whole delta
+            deltas = {}
+            communities = {}
+            community_words = {}
+            for sign, documents in ((1, added_documents), (-1, removed_documents)):
+                for _, document in documents:
+                    for kind, field in ANALYSIS_TERM_KINDS:
+                        for term, count in document.get(field, {}).items():
+                            key = (kind, term)
+                            deltas[key] = deltas.get(key, 0) + sign * count
+                    
+                    community = document.get('community') or 'Unknown'
+                    rollup = communities.setdefault(community, {"posts": 0, "positive": 0, "neutral": 0, "negative": 0})
+                    rollup["posts"] += sign
+                    rollup[document['sentiment']] += sign
+                    for term, count in document.get('words', {}).items():
+                        key = (community, term)
+                        community_words[key] = community_words.get(key, 0) + sign * count
+            
+            # Subtract removed documents
+            removed_ids = [(result_id,) for result_id, _ in removed_documents]
+            cursor.executemany("DELETE FROM analysis_documents WHERE result_id = ?", removed_ids)
+            cursor.executemany("DELETE FROM analysis_sentences WHERE result_id = ?", removed_ids)
+            
+            # Add new documents
+            cursor.executemany('''
+            INSERT OR REPLACE INTO analysis_documents (result_id, search_term, source, sentiment, data, community)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', [
+                (result_id, search_term, document['source'], document['sentiment'], json.dumps({
+                    field: document.get(field, {}) for _, field in ANALYSIS_TERM_KINDS
+                }), document.get('community') or 'Unknown')
+                for result_id, document in added_documents
+            ])
+            cursor.executemany('''
+            INSERT INTO analysis_sentences (result_id, search_term, sentence, tokens)
+            VALUES (?, ?, ?, ?)
+            ''', [
+                (result_id, search_term, sentence, json.dumps(tokens))
+                for result_id, document in added_documents
+                for sentence, tokens in document.get('sentences', [])
+            ])
+            
+            # Apply the net term counts
+            cursor.executemany('''
+            INSERT INTO analysis_terms (search_term, kind, term, count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (search_term, kind, term) DO UPDATE SET count = count + excluded.count
+            ''', [
+                (search_term, kind, term, delta)
+                for (kind, term), delta in deltas.items() if delta
+            ])
+            cursor.execute("DELETE FROM analysis_terms WHERE search_term = ? AND count <= 0", (search_term,))
+            
+            # Apply the per-community changes
+            cursor.executemany('''
+            INSERT INTO community_rollups (search_term, community, posts, positive, neutral, negative)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (search_term, community) DO UPDATE SET
+                posts = posts + excluded.posts,
+                positive = positive + excluded.positive,
+                neutral = neutral + excluded.neutral,
+                negative = negative + excluded.negative
+            ''', [
+                (search_term, community, rollup["posts"], rollup["positive"], rollup["neutral"], rollup["negative"])
+                for community, rollup in communities.items()
+            ])
+            cursor.execute("DELETE FROM community_rollups WHERE search_term = ? AND posts <= 0", (search_term,))
+            cursor.executemany('''
+            INSERT INTO community_terms (search_term, community, term, count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (search_term, community, term) DO UPDATE SET count = count + excluded.count
+            ''', [
+                (search_term, community, term, delta)
+                for (community, term), delta in community_words.items() if delta
+            ])
+            cursor.execute("DELETE FROM community_terms WHERE search_term = ? AND count <= 0", (search_term,))
+            
+            self._score_sentences(cursor, search_term)
+            
+            conn.commit()
+    
+    def _score_sentences(self, cursor, search_term):
+        """
+        Score the unscored sentences of a search term, and rescore its current summary
+        pool, by the summed counts of their summary words relative to all summary words.
+        Sentences outside the pool keep the score they had when they were last scored.
+        """
+        cursor.execute('''
+        SELECT rowid, tokens FROM analysis_sentences WHERE search_term = ? AND score IS NULL
+        UNION
+        SELECT rowid, tokens FROM (
+            SELECT rowid, tokens FROM analysis_sentences
+            WHERE search_term = ? AND score IS NOT NULL ORDER BY score DESC LIMIT ?
+        )
+        ''', (search_term, search_term, SUMMARY_POOL_SIZE))
+        sentences = [(rowid, json.loads(tokens)) for rowid, tokens in cursor.fetchall()]
+        if not sentences:
+            return
+        
+        cursor.execute('''
+        SELECT SUM(count) FROM analysis_terms WHERE search_term = ? AND kind = 'summary_word'
+        ''', (search_term,))
+        total = cursor.fetchone()[0] or 1
+        counts = self._summary_word_counts(cursor, search_term, sentences)
+        
+        cursor.executemany("UPDATE analysis_sentences SET score = ? WHERE rowid = ?", [
+            (sum(counts.get(token, 0) for token in tokens) / total, rowid)
+            for rowid, tokens in sentences
+        ])
+    
+    def _summary_word_counts(self, cursor, search_term, sentences):
+        """Current counts of the summary words used by a list of (key, tokens) sentences"""
+        terms = {token for _, tokens in sentences for token in tokens}
+        cursor.execute('''
+        SELECT term, count FROM analysis_terms
+        WHERE search_term = ? AND kind = 'summary_word' AND term IN (SELECT value FROM json_each(?))
+        ''', (search_term, json.dumps(list(terms))))
+        return dict(cursor.fetchall())
+    
+    @OPERATION_SECONDS.timed(operation="get_analysis_state")
+    def get_analysis_state(self, search_term, top_words=20, top_phrases=5, top_communities=10):
+        """
+        Read the aggregated analysis state for a search term
+        Only the summary pool is read as summary sentences, with the counts of their words
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT sentiment, COUNT(*) FROM analysis_documents
+            WHERE search_term = ? GROUP BY sentiment
+            ''', (search_term,))
+            sentiment = {"positive": 0, "neutral": 0, "negative": 0}
+            sentiment.update(dict(cursor.fetchall()))
+            
+            cursor.execute('''
+            SELECT source, COUNT(*) FROM analysis_documents
+            WHERE search_term = ? GROUP BY source
+            ''', (search_term,))
+            sources = dict(cursor.fetchall())
+            
+            def top_terms(kind, limit):
+                cursor.execute('''
+                SELECT term, count FROM analysis_terms
+                WHERE search_term = ? AND kind = ?
+                ORDER BY count DESC, term LIMIT ?
+                ''', (search_term, kind, limit))
+                return cursor.fetchall()
+            
+            # The pool is handed over in stored order, as a full analysis would see it
+            cursor.execute('''
+            SELECT sentence, tokens FROM (
+                SELECT rowid, result_id, sentence, tokens FROM analysis_sentences
+                WHERE search_term = ? ORDER BY score DESC LIMIT ?
+            ) ORDER BY result_id, rowid
+            ''', (search_term, SUMMARY_POOL_SIZE))
+            sentences = [(sentence, json.loads(tokens)) for sentence, tokens in cursor.fetchall()]
+            summary_words = self._summary_word_counts(cursor, search_term, sentences)
+            
+            communities = self._community_breakdown(cursor, search_term, top_communities)
+            
+            return {
+                "total_results": sum(sentiment.values()),
+                "sources": sources,
+                "sentiment": sentiment,
+                "words": top_terms('word', top_words),
+                "bigrams": top_terms('bigram', top_phrases),
+                "trigrams": top_terms('trigram', top_phrases),
+                "summary_words": summary_words,
+                "sentences": sentences,
+                "communities": communities
+            }
+    
+    def get_community_breakdown(self, search_term, limit=10, top_words=5):
+        """
+        Communities of a search term's analyzed posts, most posts first, each with its
+        sentiment counts and most common words
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            return self._community_breakdown(conn.cursor(), search_term, limit, top_words)
+    
+    def _community_breakdown(self, cursor, search_term, limit=10, top_words=5):
+        cursor.execute('''
+        SELECT community, posts, positive, neutral, negative FROM community_rollups
+        WHERE search_term = ? ORDER BY posts DESC, community LIMIT ?
+        ''', (search_term, limit))
+        breakdown = [
+            {"community": community, "posts": posts,
+             "sentiment": {"positive": positive, "neutral": neutral, "negative": negative}}
+            for community, posts, positive, neutral, negative in cursor.fetchall()
+        ]
+        for entry in breakdown:
+            cursor.execute('''
+            SELECT term, count FROM community_terms
+            WHERE search_term = ? AND community = ?
+            ORDER BY count DESC, term LIMIT ?
+            ''', (search_term, entry["community"], top_words))
+            entry["top_words"] = cursor.fetchall()
+        return breakdown
+    
+    def _rebuild_community_rollups(self, cursor):
+        """Recompute the per-community breakdown from the stored analysis documents"""
+        cursor.execute("DELETE FROM community_rollups")
+        cursor.execute("DELETE FROM community_terms")
+        cursor.execute('''
+        INSERT INTO community_rollups (search_term, community, posts, positive, neutral, negative)
+        SELECT search_term, community, COUNT(*), SUM(sentiment = 'positive'), SUM(sentiment = 'neutral'),
+               SUM(sentiment = 'negative')
+        FROM analysis_documents GROUP BY search_term, community
+        ''')
+        
+        cursor.execute("SELECT DISTINCT search_term FROM analysis_documents")
+        for (search_term,) in cursor.fetchall():
+            words = {}
+            rows = cursor.execute(
+                "SELECT community, data FROM analysis_documents WHERE search_term = ?", (search_term,)).fetchall()
+            for community, data in rows:
+                for term, count in json.loads(data).get('words', {}).items():
+                    key = (community, term)
+                    words[key] = words.get(key, 0) + count
+            cursor.executemany(
+                "INSERT INTO community_terms (search_term, community, term, count) VALUES (?, ?, ?, ?)",
+                [(search_term, community, term, count) for (community, term), count in words.items()])
+    
+    def clear_analysis_state(self, search_term=None):
+        """Drop the persisted analysis state, optionally for a specific search term"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            for table in ("analysis_documents", "analysis_terms", "analysis_sentences", "community_rollups",
+                          "community_terms"):
+                if search_term:
+                    cursor.execute(f"DELETE FROM {table} WHERE search_term = ?", (search_term,))
+                else:
+                    cursor.execute(f"DELETE FROM {table}")
+            
+            conn.commit()
+    
+    def get_trend_fingerprints(self, search_term, granularity):
+        """
+        Get {bucket: fingerprint} for the stored posts of a search term
+        The fingerprint changes whenever rows are added to or removed from a bucket
+        """
+        bucket_expr = TREND_BUCKETS[granularity]
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(f'''
+            SELECT {bucket_expr} AS bucket, COUNT(*), MAX(id)
+            FROM results
+            WHERE search_term = ? AND date IS NOT NULL AND date != '' AND duplicate_of IS NULL
+            GROUP BY bucket
+            ''', (search_term,))
+            
+            return {
+                bucket: f"{count}:{max_id}"
+                for bucket, count, max_id in cursor.fetchall() if bucket
+            }
+    
+    def get_trend_bucket_results(self, search_term, granularity, bucket, max_id=None):
+        """
+        Get the posts of one trend bucket, keeping only the latest copy of each URL and no near duplicates,
+        optionally only those whose latest copy is stored at or before row max_id
+        """
+        bucket_expr = TREND_BUCKETS[granularity]
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            query = f'''
+            SELECT id, title, url, source, community, date, content
+            FROM results
+            WHERE id IN (
+                SELECT MAX(id) FROM results
+                WHERE search_term = ? AND {bucket_expr} = ? AND duplicate_of IS NULL
+                GROUP BY url
+            )
+            '''
+            params = [search_term, bucket]
+            if max_id is not None:
+                # A URL stored again after max_id is counted with its latest copy, later
+                query += " AND id <= ?"
+                params.append(max_id)
+            
+            cursor.execute(query + " ORDER BY id", params)
+            
+            return [self._decode_result(dict(row)) for row in cursor.fetchall()]
+    
+    def get_trend_buckets(self, search_term, granularity):
+        """Get cached trend buckets as {bucket: (fingerprint, data)}"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT bucket, fingerprint, data FROM trend_buckets
+            WHERE search_term = ? AND granularity = ?
+            ''', (search_term, granularity))
+            
+            return {
+                bucket: (fingerprint, json.loads(data))
+                for bucket, fingerprint, data in cursor.fetchall()
+            }
+    
+    @OPERATION_SECONDS.timed(operation="save_trend_buckets")
+    def save_trend_buckets(self, search_term, granularity, buckets):
+        """Cache computed trend buckets, given as {bucket: (fingerprint, data)}"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            now = datetime.now().isoformat()
+            cursor.executemany('''
+            INSERT OR REPLACE INTO trend_buckets
+            (search_term, granularity, bucket, fingerprint, data, computed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', [
+                (search_term, granularity, bucket, fingerprint, json.dumps(data), now)
+                for bucket, (fingerprint, data) in buckets.items()
+            ])
+            
+            conn.commit()
+    
+    def delete_trend_buckets(self, search_term, granularity, buckets):
+        """Drop cached trend buckets that no longer have any posts"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.executemany('''
+            DELETE FROM trend_buckets
+            WHERE search_term = ? AND granularity = ? AND bucket = ?
+            ''', [(search_term, granularity, bucket) for bucket in buckets])
+            
+            conn.commit()
+    
+    def get_known_urls(self, search_term):
+        """URLs already stored for a search term"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT DISTINCT url FROM results WHERE search_term = ?", (search_term,))
+            return set(row[0] for row in cursor.fetchall())
+    
+    def count_recent_results(self, search_term, since):
+        """Number of distinct stored posts of a search term dated at or after since (a datetime)"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT COUNT(DISTINCT url) FROM results WHERE search_term = ? AND date >= ?
+            ''', (search_term, since.isoformat()))
+            return cursor.fetchone()[0]
+    
+    def add_watched_keyword(self, keyword, timeframe="week", min_interval=900, max_interval=86400):
+        """Start (or keep) watching a keyword; it is due immediately when new"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            INSERT INTO watched_keywords
+            (keyword, timeframe, min_interval, max_interval, interval, next_run, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (keyword) DO UPDATE SET
+                timeframe = excluded.timeframe,
+                min_interval = excluded.min_interval,
+                max_interval = excluded.max_interval,
+                interval = MIN(MAX(watched_keywords.interval, excluded.min_interval), excluded.max_interval),
+                enabled = 1
+            ''', (keyword, timeframe, min_interval, max_interval, min_interval, time.time(), datetime.now().isoformat()))
+            
+            conn.commit()
+    
+    def remove_watched_keyword(self, keyword):
+        """Stop watching a keyword; returns whether it was watched"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("DELETE FROM watched_keywords WHERE keyword = ?", (keyword,))
+            conn.commit()
+            return cursor.rowcount > 0
+    
+    def get_watched_keywords(self, enabled_only=True):
+        """Watched keywords with their polling state, soonest due first"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            query = "SELECT * FROM watched_keywords"
+            if enabled_only:
+                query += " WHERE enabled = 1"
+            query += " ORDER BY next_run"
+            
+            cursor.execute(query)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def reschedule_watched_keyword(self, keyword, next_run):
+        """Move the next poll of a watched keyword; returns whether it is watched"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("UPDATE watched_keywords SET next_run = ? WHERE keyword = ?", (next_run, keyword))
+            conn.commit()
+            return cursor.rowcount > 0
+    
+    def record_keyword_run(self, keyword, run_at, new_posts, requests, velocity, cost, interval, next_run):
+        """Store the outcome of one poll of a watched keyword"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            UPDATE watched_keywords SET
+                last_run = ?, last_new_posts = ?, velocity = ?, cost = ?,
+                interval = ?, next_run = ?, runs = runs + 1, requests = requests + ?
+            WHERE keyword = ?
+            ''', (run_at, new_posts, velocity, cost, interval, next_run, requests, keyword))
+            
+            conn.commit()
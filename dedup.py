@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection
+Reposts and cross-posts of the same text are found with MinHash signatures of each
+post's title and content, indexed with locality-sensitive hashing (LSH): a signature
+is cut into bands, and only stored posts sharing a band with a new post are compared
+with it, so a lookup costs a few index probes however many posts are stored. The
+signatures and bands live in the Database's own file (see Database.save_results).
+
+Index the posts stored before detection existed, and show the duplicates found, with:
+    python dedup.py --db scraper_data.db --rebuild
+"""
+
+import re
+import sys
+import zlib
+import argparse
+
+from logs import configure_logging, add_logging_arguments
+
+# What save_results does with a near duplicate of a stored post of the same search term:
+# nothing, store it flagged with the post it duplicates, or store nothing new
+DEDUP_MODES = ("off", "flag", "collapse")
+
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 3
+# Texts with fewer shingles are too short to call duplicates
+MIN_SHINGLES = 5
+# Estimated Jaccard similarity of shingle sets from which posts count as duplicates;
+# with 32 bands of 4 rows, pairs this similar share a band 99.9% of the time and pairs
+# at 0.3 (far above unrelated posts) 23% of the time, only to be ruled out by comparison
+THRESHOLD = 0.7
+
+# numpy is slow to import, so it is imported where MinHasher first needs it
+
+# Mersenne prime for the permutations; a * x + b stays within 64 bits for 32-bit x
+_PRIME = (1 << 31) - 1
+
+WORD = re.compile(r"\w+")
+
+def post_text(result):
+    """The text of a post that duplicates are compared on"""
+    return f"{result.get('title', '') or ''}\n{result.get('content', '') or ''}"
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles, and their LSH band keys
+    The same seed gives the same permutations in every process, so stored signatures
+    stay comparable.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, shingle_size=SHINGLE_SIZE, min_shingles=MIN_SHINGLES, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"{num_perm} permutations cannot be cut into {bands} equal bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+
+        import numpy as np
+        generator = np.random.default_rng(seed)
+        self._a = generator.integers(1, _PRIME, num_perm, dtype=np.uint64)[:, None]
+        self._b = generator.integers(0, _PRIME, num_perm, dtype=np.uint64)[:, None]
+        # Band keys hash the rows of a band with odd multipliers, modulo 2**64, plus a
+        # per-band offset so equal rows in different bands get different keys
+        self._row_weights = generator.integers(0, 1 << 63, self.rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._band_offsets = generator.integers(0, 1 << 63, bands, dtype=np.uint64)
+
+    def shingles(self, text):
+        """Set of the text's lowercased word n-grams"""
+        words = WORD.findall(text.lower())
+        size = self.shingle_size
+        return {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 0))}
+
+    def signature(self, text):
+        """MinHash signature (uint32 array) of a text, or None if it is too short"""
+        shingles = self.shingles(text)
+        if len(shingles) < self.min_shingles:
+            return None
+        import numpy as np
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature):
+        """One signed 64-bit key per band; posts sharing a key are duplicate candidates"""
+        import numpy as np
+        rows = signature.reshape(self.bands, self.rows).astype(np.uint64)
+        keys = (rows * self._row_weights).sum(axis=1, dtype=np.uint64) + self._band_offsets
+        return keys.view(np.int64).tolist()
+
+    @staticmethod
+    def similarity(signature, other):
+        """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+        import numpy as np
+        return float(np.count_nonzero(signature == other)) / len(signature)
+
+    @staticmethod
+    def to_bytes(signature):
+        return signature.tobytes()
+
+    @staticmethod
+    def from_bytes(data):
+        import numpy as np
+        return np.frombuffer(data, dtype=np.uint32)
+
+class NearDuplicateIndex:
+    """
+    LSH index over the minhash_signatures and minhash_bands tables of a Database
+    Methods work on the caller's cursor, so lookups and inserts share its transaction.
+    """
+
+    def __init__(self, hasher=None, threshold=THRESHOLD):
+        self._hasher = hasher
+        self.threshold = threshold
+
+    @property
+    def hasher(self):
+        # Built on first use, so creating a Database does not import numpy
+        if self._hasher is None:
+            self._hasher = MinHasher()
+        return self._hasher
+
+    def find(self, cursor, search_term, signature, exclude=None, keys=None):
+        """
+        (id, similarity) of the most similar indexed post of a search term, or (None, 0.0)
+        keys are the signature's band keys, if already computed
+        """
+        keys = keys if keys is not None else self.hasher.band_keys(signature)
+        cursor.execute(f'''
+        SELECT s.result_id, s.signature FROM minhash_signatures s
+        WHERE s.result_id IN (
+            SELECT result_id FROM minhash_bands
+            WHERE search_term = ? AND key IN ({",".join("?" * len(keys))})
+        )
+        ''', [search_term] + keys)
+
+        best, best_similarity = None, 0.0
+        for result_id, data in cursor.fetchall():
+            if result_id == exclude:
+                continue
+            similarity = self.hasher.similarity(signature, self.hasher.from_bytes(data))
+            if similarity >= self.threshold and (similarity > best_similarity or
+                                                 (similarity == best_similarity and result_id < best)):
+                best, best_similarity = result_id, similarity
+        return best, best_similarity
+
+    def add(self, cursor, result_id, search_term, signature, keys=None):
+        """Index a newly stored post"""
+        keys = keys if keys is not None else self.hasher.band_keys(signature)
+        cursor.execute("INSERT INTO minhash_signatures (result_id, signature) VALUES (?, ?)",
+                       (result_id, self.hasher.to_bytes(signature)))
+        cursor.executemany("INSERT OR IGNORE INTO minhash_bands (search_term, key, result_id) VALUES (?, ?, ?)",
+                           [(search_term, key, result_id) for key in keys])
+
+    def remove_missing(self, cursor):
+        """Drop the entries of posts that are no longer stored"""
+        cursor.execute("DELETE FROM minhash_signatures WHERE result_id NOT IN (SELECT id FROM results)")
+        cursor.execute("DELETE FROM minhash_bands WHERE result_id NOT IN (SELECT id FROM results)")
+
+def get_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Index stored posts for near-duplicate detection')
+    parser.add_argument('--db', type=str, default='scraper_data.db', help='Database file (default: scraper_data.db)')
+    parser.add_argument('--rebuild', action='store_true', help='Index the posts that are not indexed yet')
+    parser.add_argument('--search-term', type=str, help='Only this search term')
+    parser.add_argument('--show', type=int, default=10, metavar='N', help='Duplicate groups to list (default: 10)')
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = get_args()
+    configure_logging(args.log_level, args.log_format)
+
+    from database import Database
+    db = Database(args.db)
+
+    if args.rebuild:
+        indexed = db.rebuild_duplicate_index(
+            args.search_term, progress=lambda done, total: print(f"\r{done}/{total} posts", end="", flush=True))
+        print(f"\nIndexed {indexed} posts")
+
+    stats = db.duplicate_stats(args.search_term)
+    print(f"{stats['rows']} posts, {stats['indexed']} indexed, {stats['duplicates']} flagged as near duplicates")
+    for group in db.get_duplicate_groups(args.search_term, limit=args.show):
+        print(f"\n{group['title'][:80]}  ({group['duplicates']} duplicates)\n  {group['url']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import sqlite3
+import hashlib
+import json
+import time
+
+from records import json_default
+
+class DocumentCache:
+    """
+    Persistent memoization of per-document analysis results.
+    Entries are keyed by a hash of the document's title and content, and its comments
+    for analyses that read them, stored in SQLite and evicted least-recently-used
+    beyond max_entries.
+    """
+
+    def __init__(self, db_path="analysis_cache.db", max_entries=100000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.create_tables()
+
+    def create_tables(self):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS document_cache (
+                key TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                data TEXT NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_document_cache_access ON document_cache (last_access)")
+
+            conn.commit()
+
+    @staticmethod
+    def document_key(result, salt="", comments=True):
+        """
+        Hash the parts of a result that analysis depends on; comments=False leaves the
+        comments out, for analyses of the title and content only
+        """
+        parts = [salt, result.get('title', '') or '', result.get('content', '') or '']
+        if comments:
+            tree = result.get('comments') or []
+            if not isinstance(tree, str):
+                tree = json.dumps(tree, sort_keys=True, ensure_ascii=False, default=json_default)
+            parts.append(tree)
+
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get_many(self, kind, keys):
+        """Return a {key: value} dict for the cached keys and mark them as recently used"""
+        if not keys:
+            return {}
+
+        found = {}
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            unique_keys = list(set(keys))
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT key, data FROM document_cache WHERE kind = ? AND key IN ({placeholders})",
+                    [kind] + chunk
+                )
+                for key, data in cursor.fetchall():
+                    found[key] = json.loads(data)
+
+            if found:
+                now = time.time()
+                cursor.executemany(
+                    "UPDATE document_cache SET last_access = ? WHERE kind = ? AND key = ?",
+                    [(now, kind, key) for key in found]
+                )
+                conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, kind, items):
+        """Store {key: value} entries and evict the least recently used beyond max_entries"""
+        if not items:
+            return
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            now = time.time()
+            cursor.executemany('''
+            INSERT OR REPLACE INTO document_cache (key, kind, data, last_access)
+            VALUES (?, ?, ?, ?)
+            ''', [(key, kind, json.dumps(value), now) for key, value in items.items()])
+
+            cursor.execute("SELECT COUNT(*) FROM document_cache")
+            overflow = cursor.fetchone()[0] - self.max_entries
+            if overflow > 0:
+                cursor.execute('''
+                DELETE FROM document_cache WHERE rowid IN (
+                    SELECT rowid FROM document_cache ORDER BY last_access LIMIT ?
+                )
+                ''', (overflow,))
+
+            conn.commit()
+
+    def get(self, kind, key):
+        """Return a single cached value or None"""
+        return self.get_many(kind, [key]).get(key)
+
+    def put(self, kind, key, value):
+        """Store a single value"""
+        self.put_many(kind, {key: value})
+
+    def clear(self):
+        """Remove every cached entry"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM document_cache")
+            conn.commit()
+            return cursor.rowcount
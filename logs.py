@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Structured logging
+Leveled log events with key=value fields, written to stderr as text or JSON lines.
+Loggers check their level before building a record, so a disabled level costs a
+single comparison. The level and format default to the SCRAPER_LOG_LEVEL and
+SCRAPER_LOG_FORMAT environment variables (INFO and text).
+
+    log = get_logger("scraper")
+    log.debug("comments retrieved", permalink=permalink, count=len(comments))
+"""
+
+import os
+import sys
+import json
+import logging
+from datetime import datetime
+
+# Every application logger lives under this name so they are configured together
+ROOT_LOGGER = "reddit_scraper"
+
+LEVELS = ("debug", "info", "warning", "error", "critical")
+FORMATS = ("text", "json")
+
+class StructuredLogger:
+    """Thin wrapper over a logging.Logger taking an event name and keyword fields"""
+
+    def __init__(self, name):
+        self.logger = logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+    def is_enabled(self, level):
+        return self.logger.isEnabledFor(level)
+
+    def debug(self, event, **fields):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(event, extra={"fields": fields})
+
+    def info(self, event, **fields):
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(event, extra={"fields": fields})
+
+    def warning(self, event, **fields):
+        if self.logger.isEnabledFor(logging.WARNING):
+            self.logger.warning(event, extra={"fields": fields})
+
+    def error(self, event, exc_info=False, **fields):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self.logger.error(event, exc_info=exc_info, extra={"fields": fields})
+
+class TextFormatter(logging.Formatter):
+    """2024-01-01T12:00:00 INFO scraper: event key=value ..."""
+
+    def format(self, record):
+        name = record.name[len(ROOT_LOGGER) + 1:] if record.name.startswith(ROOT_LOGGER + ".") else record.name
+        parts = [datetime.fromtimestamp(record.created).isoformat(timespec='seconds'),
+                 record.levelname, f"{name}:", record.getMessage()]
+        for key, value in getattr(record, "fields", {}).items():
+            value = str(value)
+            if not value or any(ch.isspace() for ch in value) or '"' in value:
+                value = json.dumps(value, ensure_ascii=False)
+            parts.append(f"{key}={value}")
+        line = " ".join(parts)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per event"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _StderrHandler(logging.StreamHandler):
+    """Writes to whatever sys.stderr is at the time of the event"""
+
+    def __init__(self):
+        super().__init__(sys.stderr)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+def get_logger(name):
+    return StructuredLogger(name)
+
+def configure_logging(level=None, fmt=None, stream=None):
+    """Set the level and format of every application logger; replaces earlier configuration"""
+    level = (level or os.environ.get("SCRAPER_LOG_LEVEL") or "info").upper()
+    fmt = (fmt or os.environ.get("SCRAPER_LOG_FORMAT") or "text").lower()
+
+    handler = logging.StreamHandler(stream) if stream is not None else _StderrHandler()
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    root = logging.getLogger(ROOT_LOGGER)
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level, logging.INFO))
+    # Application events are not repeated by handlers on the global root logger
+    root.propagate = False
+    return root
+
+def add_logging_arguments(parser):
+    """--log-level and --log-format options for a command's argument parser"""
+    parser.add_argument('--log-level', type=str.lower, choices=LEVELS,
+                        help='Log level (default: SCRAPER_LOG_LEVEL or info)')
+    parser.add_argument('--log-format', type=str.lower, choices=FORMATS,
+                        help='Log format (default: SCRAPER_LOG_FORMAT or text)')
+
+# Defaults until an entry point configures logging from its arguments
+configure_logging()
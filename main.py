@@ -1,6 +1,5 @@
 import sys
 import os
-import threading
 import webbrowser
 from datetime import datetime
 from PyQt6.QtWidgets import (
@@ -8,21 +7,25 @@ from PyQt6.QtWidgets import (
     QPushButton, QLabel, QLineEdit, QComboBox, QTabWidget,
     QTableWidget, QTableWidgetItem, QTextEdit, QFileDialog,
     QCheckBox, QMessageBox, QProgressBar, QGroupBox, QSplitter,
-    QListWidget, QListWidgetItem
+    QListView, QTreeView
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QObject
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QFont, QDesktopServices, QColor
 
 from scraper import RedditScraper
 from database import Database
 from processor import Processor
+from workers import JobRunner
+from result_model import ResultListModel
+from comment_model import CommentTreeModel
+from doc_cache import DocumentCache
+from logs import get_logger
+import profiling
 
-class ScraperSignals(QObject):
-    """Signals to communicate between threads"""
-    progress = pyqtSignal(int)
-    message = pyqtSignal(str)
-    finished = pyqtSignal(list)
-    error = pyqtSignal(str)
+log = get_logger("main")
+
+# Directory the "Profile stages" setting writes to; setting SCRAPER_PROFILE turns it on at startup
+PROFILE_DIR = os.environ.get("SCRAPER_PROFILE") or "profiles"
 
 class ScraperApp(QMainWindow):
     def __init__(self):
@@ -30,9 +33,11 @@ class ScraperApp(QMainWindow):
         
         # Initialize components
         self.db = Database()
-        self.processor = Processor()
+        self.processor = Processor(cache=DocumentCache())
         self.reddit_scraper = RedditScraper()
-        self.signals = ScraperSignals()
+        
+        # Long operations run as background jobs so the UI thread stays responsive
+        self.jobs = JobRunner(self)
         
         # Setup UI
         self.setWindowTitle("Social Media Content Scraper")
@@ -40,11 +45,19 @@ class ScraperApp(QMainWindow):
         
         self.init_ui()
         
-        # Connect signals
-        self.signals.progress.connect(self.update_progress)
-        self.signals.message.connect(self.update_status)
-        self.signals.finished.connect(self.handle_scrape_complete)
-        self.signals.error.connect(self.handle_error)
+        if os.environ.get("SCRAPER_PROFILE"):
+            self.profile_checkbox.setChecked(True)
+        
+        # NLTK models and pandas are loaded in the background once the window is up,
+        # so they are usually ready before the first analysis without delaying startup
+        QTimer.singleShot(0, self.start_warm_up)
+        
+    def start_warm_up(self):
+        """Load the analysis models in the background"""
+        self.jobs.start(
+            "warmup", lambda job: self.processor.warm_up(),
+            on_error=lambda message: log.warning("warm-up failed", error=message)
+        )
         
     def init_ui(self):
         # Main layout
@@ -76,11 +89,23 @@ class ScraperApp(QMainWindow):
         source_layout.addWidget(self.reddit_checkbox)
         source_layout.addStretch()
         
+        # Opt-in per-stage CPU and memory profiling
+        self.profile_checkbox = QCheckBox("Profile stages")
+        self.profile_checkbox.setToolTip(f"Profile CPU and memory per pipeline stage into '{PROFILE_DIR}'")
+        self.profile_checkbox.toggled.connect(self.toggle_profiling)
+        source_layout.addWidget(self.profile_checkbox)
+        
         # Search button
         self.search_button = QPushButton("Search")
         self.search_button.clicked.connect(self.start_scraping)
         search_input_layout.addWidget(self.search_button)
         
+        # Cancel button for running background jobs
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_jobs)
+        search_input_layout.addWidget(self.cancel_button)
+        
         # Progress bar and status
         progress_layout = QHBoxLayout()
         self.progress_bar = QProgressBar()
@@ -106,9 +131,12 @@ class ScraperApp(QMainWindow):
         # Split view for results list and content preview
         results_splitter = QSplitter(Qt.Orientation.Horizontal)
         
-        # Results list
-        self.results_list = QListWidget()
-        self.results_list.itemClicked.connect(self.show_result_details)
+        # Results list, backed by a model that pages rows in from the database
+        self.results_model = ResultListModel(self.db, parent=self)
+        self.results_list = QListView()
+        self.results_list.setModel(self.results_model)
+        self.results_list.setUniformItemSizes(True)
+        self.results_list.clicked.connect(self.show_result_details)
         results_splitter.addWidget(self.results_list)
         
         # Result details
@@ -134,7 +162,21 @@ class ScraperApp(QMainWindow):
         
         result_details_layout.addLayout(result_meta_layout)
         result_details_layout.addWidget(self.result_url)
-        result_details_layout.addWidget(self.result_content)
+        
+        # Comment tree; replies are loaded from the database as nodes are expanded
+        self.comment_model = CommentTreeModel(self.db, parent=self)
+        self.comment_tree = QTreeView()
+        self.comment_tree.setModel(self.comment_model)
+        self.comment_tree.setUniformRowHeights(True)
+        self.comment_tree.setAlternatingRowColors(True)
+        self.comment_tree.header().setStretchLastSection(False)
+        self.comment_tree.setColumnWidth(0, 480)
+        
+        details_splitter = QSplitter(Qt.Orientation.Vertical)
+        details_splitter.addWidget(self.result_content)
+        details_splitter.addWidget(self.comment_tree)
+        details_splitter.setSizes([300, 400])
+        result_details_layout.addWidget(details_splitter)
         
         result_details_widget.setLayout(result_details_layout)
         results_splitter.addWidget(result_details_widget)
@@ -167,8 +209,20 @@ class ScraperApp(QMainWindow):
         self.analysis_text = QTextEdit()
         self.analysis_text.setReadOnly(True)
         
+        # Community breakdown, read from the per-community rollups of the analysis state
+        self.community_table = QTableWidget()
+        self.community_table.setColumnCount(6)
+        self.community_table.setHorizontalHeaderLabels(
+            ["Community", "Posts", "Positive", "Neutral", "Negative", "Top Words"])
+        self.community_table.horizontalHeader().setStretchLastSection(True)
+        
+        analysis_splitter = QSplitter(Qt.Orientation.Vertical)
+        analysis_splitter.addWidget(self.analysis_text)
+        analysis_splitter.addWidget(self.community_table)
+        analysis_splitter.setSizes([450, 250])
+        
         analysis_layout.addWidget(self.analyze_button)
-        analysis_layout.addWidget(self.analysis_text)
+        analysis_layout.addWidget(analysis_splitter)
         
         self.analysis_tab.setLayout(analysis_layout)
         
@@ -206,7 +260,7 @@ class ScraperApp(QMainWindow):
         self.load_history()
     
     def start_scraping(self):
-        """Start the scraping process in a separate thread"""
+        """Start the scraping process as a background job"""
         keyword = self.search_input.text().strip()
         if not keyword:
             QMessageBox.warning(self, "Input Error", "Please enter a search term.")
@@ -229,80 +283,114 @@ class ScraperApp(QMainWindow):
             return
         
         # Clear previous results
-        self.results_list.clear()
+        self.results_model.clear()
         self.update_result_details(None)
         
         # Reset progress and status
         self.progress_bar.setValue(0)
         self.update_status(f"Starting search for '{keyword}'...")
         
-        # Disable search button
+        # Disable search button until the job finishes
         self.search_button.setEnabled(False)
-        
-        # Start scraping thread
-        scrape_thread = threading.Thread(
-            target=self.run_scraping, 
-            args=(keyword, timeframe, sources)
+        self.cancel_button.setEnabled(True)
+        
+        # Start scraping job
+        self.jobs.start(
+            "scrape", self.run_scraping, keyword, timeframe, sources,
+            on_result=self.handle_scrape_complete,
+            on_error=lambda message: self.handle_error(f"Error during scraping: {message}"),
+            on_progress=self.update_progress,
+            on_message=self.update_status,
+            on_partial=self.handle_scrape_result,
+            on_cancelled=lambda: self.update_status("Search cancelled."),
+            on_finished=self.handle_job_finished
         )
-        scrape_thread.daemon = True
-        scrape_thread.start()
     
-    def run_scraping(self, keyword, timeframe, sources):
-        """Run the scraping process (called in separate thread)"""
-        try:
-            all_results = []
-            
-            # Track progress
-            total_sources = len(sources)
-            source_progress = 0
-            
-            if "reddit" in sources:
-                self.signals.message.emit(f"Searching Reddit for '{keyword}'...")
-                reddit_results = self.reddit_scraper.search(keyword, timeframe)
-                all_results.extend(reddit_results)
-                source_progress += 1
-                self.signals.progress.emit(int(source_progress / total_sources * 100))
-                self.signals.message.emit(f"Found {len(reddit_results)} results from Reddit")
-            
-            # Save results to database
-            self.db.save_results(all_results, keyword)
-            self.db.save_search(keyword, timeframe)
-            
-            self.signals.message.emit(f"Search complete. Found {len(all_results)} results.")
-            self.signals.finished.emit(all_results)
-            
-        except Exception as e:
-            self.signals.error.emit(f"Error during scraping: {str(e)}")
-            
-        finally:
-            # Re-enable search button
-            self.search_button.setEnabled(True)
+    def run_scraping(self, job, keyword, timeframe, sources):
+        """Run the scraping process (called in a worker thread)"""
+        total_results = 0
+        
+        def handle_result(result):
+            # Save each post as it arrives and stream a light row to the UI;
+            # details are loaded from the database on selection
+            result_id = self.db.save_results([result], keyword)[0]
+            job.partial(self._light_row(result_id, result))
+        
+        def handle_progress(stats):
+            job.progress(stats.progress_percent())
+            job.message(f"Searching Reddit: {stats.describe()}")
+        
+        if "reddit" in sources:
+            job.message(f"Searching Reddit for '{keyword}'...")
+            reddit_results = self.reddit_scraper.search(
+                keyword, timeframe,
+                on_result=handle_result,
+                on_progress=handle_progress,
+                should_stop=job.is_cancelled
+            )
+            job.check_cancelled()
+            total_results += len(reddit_results)
+            job.message(f"Found {len(reddit_results)} results from Reddit")
+        
+        self.db.save_search(keyword, timeframe)
+        
+        job.message(f"Search complete. Found {total_results} results.")
+        return total_results
     
-    def handle_scrape_complete(self, results):
+    def _light_row(self, result_id, result):
+        """Metadata of a result as shown in the results list"""
+        return {
+            'id': result_id,
+            'title': result.get('title', 'Untitled'),
+            'url': result.get('url', ''),
+            'source': result.get('source', 'Unknown'),
+            'community': result.get('community', ''),
+            'date': result.get('date', '')
+        }
+    
+    def handle_scrape_result(self, row):
+        """Append a result to the list as soon as the scraper delivers it"""
+        self.results_model.append_rows([row])
+    
+    def handle_scrape_complete(self, total_results):
         """Handle when scraping is complete"""
         self.progress_bar.setValue(100)
         self.search_button.setEnabled(True)
         
-        # Format results for display
-        formatted_results = self.processor.format_results_for_display(results)
-        
-        # Add to results list
-        self.results_list.clear()
-        for result in formatted_results:
-            item = QListWidgetItem(f"{result['title']} ({result['source']})")
-            item.setData(Qt.ItemDataRole.UserRole, result)
-            self.results_list.addItem(item)
-        
         # Update history tab
         self.load_history()
         
         # Switch to results tab
         self.tabs.setCurrentIndex(0)
     
-    def show_result_details(self, item):
-        """Show details of the selected result"""
-        result = item.data(Qt.ItemDataRole.UserRole)
-        self.update_result_details(result)
+    def show_result_details(self, index):
+        """Show details of the selected result, loading its content in the background"""
+        row = self.results_model.data(index, ResultListModel.ResultRole)
+        if row is None:
+            return
+        
+        self.update_result_details(row)
+        self.comment_model.clear()
+        
+        if row.get('id') is not None:
+            self.jobs.start(
+                "details", self.run_load_details, row['id'],
+                on_result=self.show_loaded_details
+            )
+    
+    def run_load_details(self, job, result_id):
+        """Load a result's content and prepare its comment rows (called in a worker thread)"""
+        # Results stored before comments were indexed get their tree indexed once here
+        self.db.ensure_comment_index(result_id)
+        job.check_cancelled()
+        return self.db.get_result(result_id, include_comments=False)
+    
+    def show_loaded_details(self, result):
+        """Show a result loaded from the database if it is still the selected one"""
+        current = self.results_model.data(self.results_list.currentIndex(), ResultListModel.ResultRole)
+        if result is not None and current is not None and current.get('id') == result['id']:
+            self.update_result_details(result)
+            self.comment_model.set_result(result['id'])
     
     def update_result_details(self, result):
         """Update the result details panel"""
@@ -312,6 +400,7 @@ class ScraperApp(QMainWindow):
             self.result_date.setText("")
             self.result_url.setText("")
             self.result_content.setText("")
+            self.comment_model.clear()
             return
         
         self.result_title.setText(result['title'])
@@ -381,32 +470,78 @@ class ScraperApp(QMainWindow):
             QMessageBox.warning(self, "Analysis Error", "No search term specified.")
             return
         
-        # Get results from database
-        results = self.db.get_results(search_term=search_term)
+        self.analyze_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.update_status(f"Analyzing results for '{search_term}'...")
+        
+        self.jobs.start(
+            "analysis", self.run_analysis, search_term,
+            on_result=self.handle_analysis_complete,
+            on_error=lambda message: self.handle_error(f"Error during analysis: {message}"),
+            on_message=self.update_status,
+            on_cancelled=lambda: self.update_status("Analysis cancelled."),
+            on_finished=self.handle_job_finished
+        )
+    
+    def run_analysis(self, job, search_term):
+        """Build the analysis report for a search term (called in a worker thread)"""
+        # Fold any new results into the stored analysis state for this term
+        analysis = self.processor.update_analysis_state(self.db, search_term)
+        job.check_cancelled()
+        
+        if not analysis.get('total_results'):
+            return None
         
-        if not results:
+        # Generate report
+        return self.processor.generate_text_report(analysis, search_term), analysis.get('communities', [])
+    
+    def handle_analysis_complete(self, analysis):
+        """Show a finished analysis report and its community breakdown"""
+        if analysis is None:
+            self.update_status("Ready")
             QMessageBox.warning(
                 self, "Analysis Error", 
                 "No results found for analysis."
             )
             return
         
-        # Run analysis
-        analysis = self.processor.analyze_results(results)
-        
-        # Generate report
-        report = self.processor.generate_text_report(analysis, search_term)
-        
         # Display in analysis tab
+        report, communities = analysis
         self.analysis_text.setText(report)
+        self.show_communities(communities)
+        self.update_status("Analysis complete.")
         
         # Switch to analysis tab
         self.tabs.setCurrentIndex(1)
     
-    def load_history(self):
-        """Load search history from database"""
-        history = self.db.get_search_history()
+    def show_communities(self, communities):
+        """Fill the community breakdown table"""
+        self.community_table.setRowCount(len(communities))
         
+        for i, entry in enumerate(communities):
+            sentiment = entry['sentiment']
+            total = sum(sentiment.values())
+            
+            self.community_table.setItem(i, 0, QTableWidgetItem(entry['community']))
+            self.community_table.setItem(i, 1, QTableWidgetItem(str(entry['posts'])))
+            for column, category in enumerate(("positive", "neutral", "negative"), start=2):
+                share = f" ({sentiment[category] / total * 100:.0f}%)" if total else ""
+                self.community_table.setItem(i, column, QTableWidgetItem(f"{sentiment[category]}{share}"))
+            words = ", ".join(word for word, _ in entry.get('top_words', []))
+            self.community_table.setItem(i, 5, QTableWidgetItem(words))
+        
+        self.community_table.resizeColumnsToContents()
+    
+    def load_history(self):
+        """Load search history from database in the background"""
+        self.jobs.start(
+            "history", lambda job: self.db.get_search_history(),
+            on_result=self.show_history,
+            on_error=lambda message: self.update_status(f"Could not load history: {message}")
+        )
+    
+    def show_history(self, history):
+        """Fill the history table"""
         self.history_list.setRowCount(len(history))
         
         for i, entry in enumerate(history):
@@ -451,22 +586,18 @@ class ScraperApp(QMainWindow):
             if index >= 0:
                 self.timeframe_combo.setCurrentIndex(index)
         
-        # Load results
-        results = self.db.get_results(search_term=search_term)
-        formatted_results = self.processor.format_results_for_display(results)
-        
-        # Display results
-        self.results_list.clear()
-        for result in formatted_results:
-            item = QListWidgetItem(f"{result['title']} ({result['source']})")
-            item.setData(Qt.ItemDataRole.UserRole, result)
-            self.results_list.addItem(item)
+        # Show stored results; the model pages them in as the list scrolls
+        self.update_result_details(None)
+        self.results_model.load_search_term(search_term)
         
         # Switch to results tab
         self.tabs.setCurrentIndex(0)
         
-        # Show status message
-        self.update_status(f"Loaded {len(results)} results for '{search_term}'")
+        # Count results in the background for the status message
+        self.jobs.start(
+            "load_results", lambda job: self.db.count_results(search_term),
+            on_result=lambda count: self.update_status(f"Loaded {count} results for '{search_term}'")
+        )
     
     def update_progress(self, value):
         """Update progress bar"""
@@ -476,8 +607,37 @@ class ScraperApp(QMainWindow):
         """Update status label"""
         self.status_label.setText(message)
     
+    def toggle_profiling(self, enabled):
+        """Start profiling stages, or stop and write the report"""
+        if enabled:
+            profiling.enable(PROFILE_DIR)
+            self.update_status(f"Profiling stages into '{PROFILE_DIR}'")
+        else:
+            report_path = profiling.disable()
+            if report_path:
+                self.update_status(f"Profile written to {report_path}")
+    
+    def cancel_jobs(self):
+        """Cancel all running background jobs"""
+        self.jobs.cancel()
+        self.update_status("Cancelling...")
+    
+    def handle_job_finished(self):
+        """Update controls once a background job ends"""
+        self.search_button.setEnabled(not self.jobs.is_running("scrape"))
+        self.analyze_button.setEnabled(not self.jobs.is_running("analysis"))
+        self.cancel_button.setEnabled(
+            self.jobs.is_running("scrape") or self.jobs.is_running("analysis")
+        )
+    
+    def closeEvent(self, event):
+        """Stop background jobs before the window closes"""
+        self.jobs.shutdown()
+        profiling.disable()
+        super().closeEvent(event)
+    
     def handle_error(self, error_message):
-        """Handle error from scraping thread"""
+        """Handle error from a background job"""
         QMessageBox.critical(self, "Error", error_message)
         self.search_button.setEnabled(True)
         self.progress_bar.setValue(0)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Metrics
+Process-wide counters and latency histograms for the scraper, database and processor.
+Modules register their metrics once at import and update them as they work; the
+registry renders everything in the Prometheus text exposition format or as a JSON
+snapshot (see ScraperService's /metrics endpoint and the --metrics-file options).
+"""
+
+import json
+import time
+import functools
+import threading
+
+# Latency buckets in seconds, from a cached lookup to a slow Reddit request
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Counter:
+    """A monotonically increasing value per combination of label values"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self):
+        """(labels dict, value) of every label combination seen so far"""
+        with self._lock:
+            items = list(self.values.items())
+        return [(dict(zip(self.labels, key)), value) for key, value in sorted(items)]
+
+    def reset(self):
+        with self._lock:
+            self.values.clear()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+class Histogram(Counter):
+    """Observation counts in cumulative buckets, plus their sum, per label combination"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self.values.get(key)
+            if state is None:
+                # Per-bucket (not yet cumulative) counts, then count and sum
+                state = self.values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += 1
+            state[2] += value
+
+    def time(self, **labels):
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self, labels)
+
+    def timed(self, **labels):
+        """Decorator observing the seconds each call of the function takes"""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, **labels)
+            return wrapper
+        return decorator
+
+    def value(self, **labels):
+        state = self.values.get(self._key(labels))
+        return {"count": state[1], "sum": state[2]} if state else {"count": 0, "sum": 0.0}
+
+    def samples(self):
+        """(labels dict, {"buckets": cumulative counts, "count", "sum"}) per label combination"""
+        with self._lock:
+            items = [(key, ([*state[0]], state[1], state[2])) for key, state in self.values.items()]
+
+        samples = []
+        for key, (counts, count, total) in sorted(items):
+            cumulative, running = [], 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            samples.append((dict(zip(self.labels, key)), {"buckets": cumulative, "count": count, "sum": total}))
+        return samples
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.started
+        self.histogram.observe(self.seconds, **self.labels)
+        return False
+
+class MetricsRegistry:
+    """Holds every metric of the process by name"""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, labels, buckets=buckets)
+
+    def _register(self, cls, name, help_text, labels, **kwargs):
+        """Create a metric, or return the existing one of that name (modules may be reloaded)"""
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help_text, labels, **kwargs)
+            elif not isinstance(metric, cls) or metric.labels != tuple(labels):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def reset(self):
+        for metric in list(self.metrics.values()):
+            metric.reset()
+
+    def snapshot(self):
+        """Every metric as a JSON-serializable dict"""
+        snapshot = {"timestamp": time.time(), "metrics": {}}
+        for name, metric in sorted(self.metrics.items()):
+            entry = {"type": metric.kind, "help": metric.help, "samples": []}
+            if metric.kind == "histogram":
+                entry["buckets"] = list(metric.buckets)
+            for labels, value in metric.samples():
+                sample = {"labels": labels}
+                if metric.kind == "histogram":
+                    sample.update(value)
+                else:
+                    sample["value"] = value
+                entry["samples"].append(sample)
+            snapshot["metrics"][name] = entry
+        return snapshot
+
+    def to_prometheus(self):
+        """Every metric in the Prometheus text exposition format"""
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, value in metric.samples():
+                if metric.kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                for bound, count in zip(metric.buckets, value["buckets"]):
+                    lines.append(f"{name}_bucket{_format_labels(labels, le=_format_value(bound))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {value['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the metrics to a file: a JSON snapshot for *.json, Prometheus text otherwise"""
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.json'):
+                json.dump(self.snapshot(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
+        return path
+
+def _format_labels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _escape_help(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+# Shared registry used by the application
+registry = MetricsRegistry()
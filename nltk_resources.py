@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+NLTK resource manager
+Resolves the NLTK data the analysis needs (punkt, stopwords, vader_lexicon) from a
+local bundle directory, so production machines need no network access. The first
+successful check writes a verification stamp; later starts only compare file stats
+against the stamp instead of searching every NLTK data directory. The VADER lexicon
+is cached as a pickle so the analyzer does not re-parse the text lexicon each start.
+The application never downloads anything itself; missing resources are logged once
+per process and the analysis falls back to simpler tokenization and stopwords.
+
+Build a bundle on a connected machine with:
+    python nltk_resources.py --download
+and ship the resulting nltk_data directory with the application.
+"""
+
+import os
+import sys
+import json
+import pickle
+import argparse
+import threading
+
+from logs import get_logger
+
+log = get_logger("nltk_resources")
+
+# Bundle location; override with SCRAPER_NLTK_DATA
+DEFAULT_BUNDLE_DIR = os.environ.get(
+    "SCRAPER_NLTK_DATA",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "nltk_data")
+)
+
+# Resources used by the analysis, as (name, nltk.data path)
+RESOURCES = (
+    ('punkt', 'tokenizers/punkt'),
+    ('punkt_tab', 'tokenizers/punkt_tab'),
+    ('stopwords', 'corpora/stopwords'),
+    ('vader_lexicon', 'sentiment/vader_lexicon.zip'),
+)
+
+VADER_LEXICON = 'sentiment/vader_lexicon.zip/vader_lexicon/vader_lexicon.txt'
+
+STAMP_FILE = '.verified.json'
+LEXICON_PICKLE = 'vader_lexicon.pickle'
+
+class NltkResources:
+    """Locates, verifies and loads the NLTK data used by the Processor"""
+
+    def __init__(self, bundle_dir=DEFAULT_BUNDLE_DIR, allow_download=False):
+        self.bundle_dir = bundle_dir
+        self.allow_download = allow_download
+        self.stamp_path = os.path.join(bundle_dir, STAMP_FILE)
+        self.lexicon_path = os.path.join(bundle_dir, LEXICON_PICKLE)
+        self.resolved = {}
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def required_resources(self):
+        """Resources needed by the installed NLTK version"""
+        import nltk
+        # word_tokenize/sent_tokenize read punkt_tab from NLTK 3.8.2 on, and punkt before
+        tab = self._version_tuple(nltk.__version__) >= (3, 8, 2)
+        return [(name, path) for name, path in RESOURCES
+                if name != ('punkt' if tab else 'punkt_tab')]
+
+    def ensure(self):
+        """
+        Make every resource loadable, once per process
+        A valid stamp skips all probing; otherwise resources are searched for (and
+        the missing ones downloaded into the bundle only if allow_download is set),
+        and a new stamp is written once all of them are found.
+        Returns the names of resources that are still missing.
+        """
+        if self._ready:
+            return []
+
+        with self._lock:
+            if self._ready:
+                return []
+
+            import nltk
+            stamp = self._read_stamp(nltk.__version__)
+            if stamp is not None:
+                self.resolved = stamp
+                self._add_data_paths()
+                self._ready = True
+                return []
+
+            missing = self.verify(download=self.allow_download)
+            # Without a complete stamp the next start will check again
+            self._ready = True
+            return missing
+
+    def verify(self, download=False):
+        """Search for every resource, optionally downloading the missing ones"""
+        import nltk
+
+        # The bundle is searched first so it wins over any system-wide NLTK data
+        if self.bundle_dir not in nltk.data.path:
+            nltk.data.path.insert(0, self.bundle_dir)
+
+        self.resolved = {}
+        missing = []
+        for name, path in self.required_resources():
+            location = self._find(path)
+            if location is None and download:
+                os.makedirs(self.bundle_dir, exist_ok=True)
+                try:
+                    nltk.download(name, download_dir=self.bundle_dir, quiet=True)
+                except Exception as e:
+                    log.warning("download failed", resource=name, error=e)
+                location = self._find(path)
+
+            if location is None:
+                missing.append(name)
+            else:
+                self.resolved[name] = location
+
+        self._add_data_paths()
+        if missing:
+            log.warning("resources not available", missing=",".join(missing),
+                        hint="run python nltk_resources.py --download")
+        else:
+            self._write_stamp(nltk.__version__)
+        return missing
+
+    def load_stopwords(self, language='english'):
+        """Read a stopword list straight from the corpus file"""
+        self.ensure()
+        location = self.resolved.get('stopwords')
+        if location is None:
+            raise LookupError("NLTK stopwords are not available")
+
+        with open(os.path.join(location['root'], 'corpora', 'stopwords', language), encoding='utf-8') as f:
+            return set(line.strip() for line in f if line.strip())
+
+    def load_lexicon(self):
+        """The VADER lexicon as a dict, from the pickle when it matches the source zip"""
+        self.ensure()
+        location = self.resolved.get('vader_lexicon')
+        if location is None:
+            raise LookupError("NLTK vader_lexicon is not available")
+
+        source = {"path": location['path'], "size": location['size'], "mtime": location['mtime']}
+        try:
+            with open(self.lexicon_path, 'rb') as f:
+                cached = pickle.load(f)
+            if cached.get('source') == source:
+                return cached['lexicon']
+        except Exception:
+            pass
+
+        # Parse the text lexicon the same way SentimentIntensityAnalyzer does
+        import nltk
+        lexicon = {}
+        for line in nltk.data.load(VADER_LEXICON, format='text').split('\n'):
+            word, measure = line.strip().split('\t')[0:2]
+            lexicon[word] = float(measure)
+
+        try:
+            os.makedirs(self.bundle_dir, exist_ok=True)
+            with open(self.lexicon_path, 'wb') as f:
+                pickle.dump({"source": source, "lexicon": lexicon}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError as e:
+            log.warning("lexicon cache not written", path=self.lexicon_path, error=e)
+        return lexicon
+
+    def sentiment_analyzer(self):
+        """A SentimentIntensityAnalyzer built from the pickled lexicon"""
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+        # Skip __init__, which would load and parse the text lexicon again
+        sia = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+        sia.lexicon_file = VADER_LEXICON
+        sia.lexicon = self.load_lexicon()
+        sia.constants = VaderConstants()
+        return sia
+
+    def clear_stamp(self):
+        """Forget the verification so the next start checks every resource again"""
+        for path in (self.stamp_path, self.lexicon_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._ready = False
+
+    def _find(self, path):
+        """Filesystem location of a resource, or None"""
+        import nltk
+        try:
+            pointer = nltk.data.find(path)
+        except LookupError:
+            return None
+
+        # Zip resources point inside the archive; the stamp records the file itself
+        file_path = pointer.zipfile.filename if hasattr(pointer, 'zipfile') else pointer.path
+        resource_path = path
+        if hasattr(pointer, 'zipfile') and not path.endswith('.zip'):
+            resource_path = path + '.zip'
+        root = file_path[:len(file_path) - len(resource_path)].rstrip(os.sep)
+
+        stat = os.stat(file_path)
+        return {"path": file_path, "root": root, "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def _add_data_paths(self):
+        """Put the directories the resources were found in first on the NLTK path"""
+        import nltk
+        for root in reversed(sorted(set(location['root'] for location in self.resolved.values()))):
+            if root in nltk.data.path:
+                nltk.data.path.remove(root)
+            nltk.data.path.insert(0, root)
+
+    def _read_stamp(self, nltk_version):
+        """The resolved resources from a stamp that still matches the files, or None"""
+        try:
+            with open(self.stamp_path, encoding='utf-8') as f:
+                stamp = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if stamp.get('nltk_version') != nltk_version:
+            return None
+
+        resolved = stamp.get('resources', {})
+        for location in resolved.values():
+            try:
+                stat = os.stat(location['path'])
+            except (OSError, KeyError):
+                return None
+            if stat.st_size != location['size'] or stat.st_mtime != location['mtime']:
+                return None
+        return resolved
+
+    def _write_stamp(self, nltk_version):
+        try:
+            os.makedirs(self.bundle_dir, exist_ok=True)
+            with open(self.stamp_path, 'w', encoding='utf-8') as f:
+                json.dump({"nltk_version": nltk_version, "resources": self.resolved}, f, indent=2)
+        except OSError as e:
+            log.warning("stamp not written", path=self.stamp_path, error=e)
+
+    @staticmethod
+    def _version_tuple(version):
+        parts = []
+        for part in version.split('.'):
+            digits = ''.join(ch for ch in part if ch.isdigit())
+            parts.append(int(digits) if digits else 0)
+        return tuple(parts)
+
+# Shared instance used by the application
+resources = NltkResources()
+
+def ensure_resources():
+    return resources.ensure()
+
+def main():
+    parser = argparse.ArgumentParser(description='Prepare and verify the local NLTK data bundle')
+    parser.add_argument('--dir', type=str, default=DEFAULT_BUNDLE_DIR,
+                        help=f'Bundle directory (default: {DEFAULT_BUNDLE_DIR})')
+    parser.add_argument('--download', action='store_true',
+                        help='Download missing resources into the bundle directory')
+    args = parser.parse_args()
+
+    manager = NltkResources(args.dir, allow_download=args.download)
+    manager.clear_stamp()
+    missing = manager.verify(download=args.download)
+
+    for name, location in sorted(manager.resolved.items()):
+        print(f"  {name:<14} {location['path']}")
+    if missing:
+        print(f"Missing: {', '.join(missing)}")
+        return 1
+
+    # Build the lexicon pickle now so the first start does not have to
+    manager.load_lexicon()
+    print(f"Verified; stamp written to {manager.stamp_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
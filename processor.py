@@ -1,95 +1,424 @@
 import re
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.probability import FreqDist
 from collections import Counter
 import string
-import pandas as pd
-from nltk.sentiment import SentimentIntensityAnalyzer
 import json
 from datetime import datetime
 import os
+import hashlib
+import importlib
+import threading
+from collections.abc import Mapping
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('stopwords')
+import profiling
+from nltk_resources import resources as nltk_resources
+from logs import get_logger
+from metrics import registry as metrics
+from records import json_default
+
+log = get_logger("processor")
+
+DOCUMENTS_ANALYZED = metrics.counter("processor_documents_analyzed_total",
+                                     "Documents analyzed (not served from the cache), by analysis kind", ["kind"])
+CACHE_LOOKUPS = metrics.counter("processor_cache_lookups_total", "Document cache lookups by kind and outcome",
+                                ["kind", "result"])
+STAGE_SECONDS = metrics.histogram("processor_stage_seconds", "Duration of analysis stages", ["stage"])
+
+# NLTK, pandas and numpy are slow to import, so they are imported on first use
+# rather than here; see the lazy Processor attributes
+
+# Bump when per-document analysis output changes so cached results are not reused
+ANALYSIS_VERSION = "2"
+
+# Word lists used by the keyword-based sentiment classification
+POSITIVE_WORDS = set([
+    'good', 'great', 'excellent', 'amazing', 'awesome', 'fantastic',
+    'wonderful', 'best', 'love', 'recommend', 'positive', 'perfect',
+    'helpful', 'impressive', 'better', 'easy', 'top', 'favorite',
+    'satisfied', 'worth', 'nice', 'happy', 'reliable', 'effective'
+])
+
+NEGATIVE_WORDS = set([
+    'bad', 'poor', 'terrible', 'awful', 'horrible', 'worst',
+    'hate', 'negative', 'difficult', 'broken', 'annoying', 'avoid',
+    'disappointing', 'issue', 'problem', 'bug', 'error', 'crash',
+    'slow', 'expensive', 'overpriced', 'useless', 'confusing', 'fail'
+])
 
 class Processor:
-    def __init__(self):
+    def __init__(self, summary_method="frequency", cache=None, lazy=True):
+        self.summary_method = summary_method
+        
+        # Optional DocumentCache for per-document results
+        self.cache = cache
+        
+        # Stopwords, the VADER model, the comment analyzer and the summarizer are
+        # built on first use so creating a Processor is cheap; call warm_up() to
+        # build them ahead of time, e.g. from a background thread
+        self._loaded = {}
+        self._init_lock = threading.RLock()
+        
+        # Tokenizers that raised LookupError are not tried again
+        self._tokenizer_failed = set()
+        
+        if not lazy:
+            self.warm_up()
+    
+    def warm_up(self):
+        """
+        Load NLTK data and build every lazily created component now
+        Failures are only reported here; the component is retried when it is used
+        """
+        nltk_resources.ensure()
+        for name in ('stop_words', 'sia', 'comment_analyzer', 'summarizer', '_cache_salt'):
+            try:
+                getattr(self, name)
+            except Exception as e:
+                log.warning("warm-up failed", component=name, error=e)
+        
+        # A first tokenizer call loads the punkt model
+        self._tokenize_sentences("Warm up. Done.")
+        self._tokenize_words("warm up")
+        
+        # Reports and exports build DataFrames; pandas is the slowest import left
+        try:
+            importlib.import_module("pandas")
+        except Exception as e:
+            log.warning("warm-up failed", component="pandas", error=e)
+    
+    def _lazy(self, name, factory):
+        """Return a component built by factory() the first time it is needed"""
+        value = self._loaded.get(name)
+        if value is None:
+            with self._init_lock:
+                value = self._loaded.get(name)
+                if value is None:
+                    value = factory()
+                    self._loaded[name] = value
+        return value
+    
+    @property
+    def stop_words(self):
+        return self._lazy('stop_words', self._load_stop_words)
+    
+    @property
+    def sia(self):
+        return self._lazy('sia', self._load_sia)
+    
+    @property
+    def comment_analyzer(self):
+        # Comment-level analysis weighted by score and reply depth
+        def build():
+            from comment_analytics import CommentAnalyzer
+            return CommentAnalyzer(self.sia, self.stop_words, tokenize=self._tokenize_words)
+        return self._lazy('comment_analyzer', build)
+    
+    @property
+    def summarizer(self):
+        # Extractive summarizer used by the analysis report
+        def build():
+            from summarizer import Summarizer
+            return Summarizer(method=self.summary_method)
+        return self._lazy('summarizer', build)
+    
+    @property
+    def _cache_salt(self):
+        # Changes whenever the analysis itself would produce different output
+        return self._lazy('cache_salt', lambda: hashlib.sha256(
+            (ANALYSIS_VERSION + " " + " ".join(sorted(self.stop_words))).encode('utf-8')
+        ).hexdigest())
+    
+    def _load_stop_words(self):
         # Initialize stopwords - with error handling
         try:
-            self.stop_words = set(stopwords.words('english'))
+            return nltk_resources.load_stopwords('english')
         except:
-            print("Warning: Could not load stopwords, using a minimal set instead")
-            self.stop_words = set(['i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 
-                                'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 
-                                'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its', 
-                                'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 
-                                'which', 'who', 'whom', 'this', 'that', 'these', 'those', 'am', 
-                                'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 
-                                'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 
-                                'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 
-                                'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 
-                                'through', 'during', 'before', 'after', 'above', 'below', 'to', 
-                                'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 
-                                'again', 'further', 'then', 'once', 'here', 'there', 'when', 
-                                'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 
-                                'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 
-                                'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 
-                                'don', 'should', 'now'])
-        
-        # Download required NLTK resources
-        try:
-            nltk.data.find('vader_lexicon')
-        except LookupError:
-            nltk.download('vader_lexicon')
-        
-        self.sia = SentimentIntensityAnalyzer()
+            log.warning("stopwords unavailable, using a minimal set")
+            return set(['i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 
+                        'you', 'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 
+                        'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its', 
+                        'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 
+                        'which', 'who', 'whom', 'this', 'that', 'these', 'those', 'am', 
+                        'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 
+                        'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 
+                        'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 
+                        'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 
+                        'through', 'during', 'before', 'after', 'above', 'below', 'to', 
+                        'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 
+                        'again', 'further', 'then', 'once', 'here', 'there', 'when', 
+                        'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 
+                        'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 
+                        'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 
+                        'don', 'should', 'now'])
+    
+    def _load_sia(self):
+        # Built from the pickled lexicon instead of parsing the text lexicon
+        return nltk_resources.sentiment_analyzer()
     
+    @STAGE_SECONDS.timed(stage="analyze_results")
+    @profiling.profiled("analysis.analyze_results")
     def analyze_results(self, results):
         """
         Analyze a list of results to extract key insights
         Returns a dictionary with analysis data
         """
         if not results:
-            return {
-                "total_results": 0,
-                "sources": {},
-                "sentiment": {"positive": 0, "neutral": 0, "negative": 0},
-                "common_words": [],
-                "common_phrases": [],
-                "summary": "No results to analyze."
-            }
+            return self._empty_analysis()
         
         try:
-            # Extract basic stats
-            analysis = {
-                "total_results": len(results),
-                "sources": self._count_sources(results),
-                "sentiment": self._analyze_sentiment(results),
-                "common_words": self._extract_common_words(results),
-                "common_phrases": self._extract_common_phrases(results),
-                "summary": self._generate_summary(results)
-            }
-            
-            return analysis
+            # Analyze each result on its own, then fold the per-document counts together
+            documents = self.analyze_documents(results)
+            return self._build_analysis(documents)
         except Exception as e:
-            print(f"Error during analysis: {e}")
+            log.error("analysis failed", results=len(results), error=e)
             # Return basic data even if analysis fails
             return {
                 "total_results": len(results),
                 "sources": self._count_sources(results),
+                "communities": self._count_communities(results),
                 "sentiment": {"positive": 0, "neutral": 0, "negative": 0},
                 "common_words": [],
                 "common_phrases": [],
                 "summary": f"Analysis could not be completed: {str(e)}"
             }
     
+    @STAGE_SECONDS.timed(stage="update_analysis_state")
+    @profiling.profiled("analysis.update_analysis_state")
+    def update_analysis_state(self, db, search_term):
+        """
+        Bring the persisted analysis state for a search term up to date and return it.
+        Only results added since the last update are analyzed; results that were
+        removed from the database are subtracted using their stored contribution.
+        """
+        try:
+            new_results = db.get_unanalyzed_results(search_term)
+            removed_documents = db.get_stale_analysis_documents(search_term)
+            
+            documents = self.analyze_documents(new_results)
+            added_documents = [(result['id'], document) for result, document in zip(new_results, documents)]
+            
+            if added_documents or removed_documents:
+                db.apply_analysis_delta(search_term, added_documents, removed_documents)
+            
+            return self.analysis_from_state(db.get_analysis_state(search_term))
+        except Exception as e:
+            log.error("analysis state update failed", search_term=search_term, error=e)
+            # Fall back to a full analysis of every stored result, not just a first page
+            return self.analyze_results(list(db.iter_results(search_term=search_term)))
+    
+    def analysis_from_state(self, state):
+        """Build an analysis dictionary from a persisted analysis state"""
+        if not state or not state.get('total_results'):
+            return self._empty_analysis()
+        
+        return self._format_analysis(
+            total_results=state['total_results'],
+            sources=state['sources'],
+            sentiment=state['sentiment'],
+            word_counts=Counter(dict(state['words'])),
+            bigram_counts=Counter(dict(state['bigrams'])),
+            trigram_counts=Counter(dict(state['trigrams'])),
+            summary_word_counts=Counter(state['summary_words']),
+            sentences=state['sentences'],
+            communities=state.get('communities', [])
+        )
+    
+    def analyze_document(self, result):
+        """
+        Analyze the text of a single result and return its contribution to an analysis:
+        sentiment category, word and n-gram counts, and tokenized summary sentences
+        """
+        title = result.get('title', '') or ''      # Ensure title is never None
+        content = result.get('content', '') or ''  # Ensure content is never None
+        text = title + " " + content
+        
+        # Word counts over title and content
+        words = Counter(self._filter_tokens(self._tokenize_words(text.lower())))
+        
+        # Bigrams and trigrams are built per sentence so they never span sentences
+        bigrams = Counter()
+        trigrams = Counter()
+        for sentence in self._tokenize_sentences(text):
+            sentence_words = [word.lower() for word in self._tokenize_words(sentence)
+                              if word.lower() not in self.stop_words
+                              and word not in string.punctuation
+                              and len(word) > 2]
+            
+            for i in range(len(sentence_words) - 1):
+                bigrams[f"{sentence_words[i]} {sentence_words[i+1]}"] += 1
+            
+            for i in range(len(sentence_words) - 2):
+                trigrams[f"{sentence_words[i]} {sentence_words[i+1]} {sentence_words[i+2]}"] += 1
+        
+        # Summary candidates come from the content only, tokenized once here
+        sentences = []
+        summary_words = Counter()
+        for sentence in self._tokenize_sentences(content):
+            tokens = self._filter_tokens(self._tokenize_words(sentence.lower()), min_length=1)
+            summary_words.update(tokens)
+            sentences.append((sentence, tokens))
+        
+        return {
+            "sentiment": self._classify_keyword_sentiment(text),
+            "words": dict(words),
+            "bigrams": dict(bigrams),
+            "trigrams": dict(trigrams),
+            "summary_words": dict(summary_words),
+            "sentences": sentences
+        }
+    
+    def analyze_documents(self, results):
+        """
+        Run analyze_document over results, reusing cached documents when a cache is set
+        Each document also gets the source and community of its result; they are not part
+        of the cached document, which posts with the same text elsewhere share.
+        """
+        # Only the title and content are analyzed, so results read with or without their
+        # comments share cache entries
+        documents = self._memoized('document', results, self.analyze_document, comments=False)
+        return [dict(document, source=result.get('source', 'Unknown'),
+                     community=result.get('community') or 'Unknown')
+                for result, document in zip(results, documents)]
+    
+    def _memoized(self, kind, results, analyze, comments=True):
+        """
+        Apply analyze to each result, reusing cached values for documents seen before
+        Only documents whose title, content and (unless comments is False) comments are
+        new to the cache are analyzed
+        """
+        if self.cache is None:
+            DOCUMENTS_ANALYZED.inc(len(results), kind=kind)
+            return [analyze(result) for result in results]
+        
+        keys = [self.cache.document_key(result, self._cache_salt, comments) for result in results]
+        cached = self.cache.get_many(kind, keys)
+        
+        values = []
+        computed = {}
+        for key, result in zip(keys, results):
+            if key in cached:
+                values.append(cached[key])
+            else:
+                if key not in computed:
+                    computed[key] = analyze(result)
+                values.append(computed[key])
+        
+        self.cache.put_many(kind, computed)
+        DOCUMENTS_ANALYZED.inc(len(computed), kind=kind)
+        CACHE_LOOKUPS.inc(len(values) - len(computed), kind=kind, result="hit")
+        CACHE_LOOKUPS.inc(len(computed), kind=kind, result="miss")
+        return values
+    
+    @STAGE_SECONDS.timed(stage="build_analysis")
+    def build_analysis(self, documents):
+        """Fold documents returned by analyze_documents into an analysis dictionary"""
+        if not documents:
+            return self._empty_analysis()
+        return self._build_analysis(documents)
+    
+    def _build_analysis(self, documents):
+        """Fold per-document analyses into a single analysis dictionary"""
+        sources = {}
+        sentiment = {"positive": 0, "neutral": 0, "negative": 0}
+        word_counts = Counter()
+        bigram_counts = Counter()
+        trigram_counts = Counter()
+        summary_word_counts = Counter()
+        sentences = []
+        communities = {}
+        
+        for document in documents:
+            sources[document['source']] = sources.get(document['source'], 0) + 1
+            sentiment[document['sentiment']] += 1
+            name = document.get('community') or 'Unknown'
+            community = communities.get(name)
+            if community is None:
+                community = communities[name] = {
+                    "posts": 0, "sentiment": {"positive": 0, "neutral": 0, "negative": 0}, "words": Counter()}
+            community["posts"] += 1
+            community["sentiment"][document['sentiment']] += 1
+            community["words"].update(document['words'])
+            word_counts.update(document['words'])
+            bigram_counts.update(document['bigrams'])
+            trigram_counts.update(document['trigrams'])
+            summary_word_counts.update(document['summary_words'])
+            sentences.extend(document['sentences'])
+        
+        return self._format_analysis(
+            total_results=len(documents),
+            sources=sources,
+            sentiment=sentiment,
+            word_counts=word_counts,
+            bigram_counts=bigram_counts,
+            trigram_counts=trigram_counts,
+            summary_word_counts=summary_word_counts,
+            sentences=sentences,
+            communities=self._top_communities(communities)
+        )
+    
+    def _format_analysis(self, total_results, sources, sentiment, word_counts, bigram_counts,
+                         trigram_counts, summary_word_counts, sentences, communities=None):
+        """Turn aggregated counts into the analysis dictionary used by reports and the UI"""
+        return {
+            "total_results": total_results,
+            "sources": sources,
+            "communities": communities or [],
+            "sentiment": sentiment,
+            "common_words": self._most_common(word_counts, 20),
+            "common_phrases": self._top_phrases(bigram_counts, trigram_counts),
+            "summary": self._generate_extractive_summary(sentences, summary_word_counts)
+        }
+    
+    def _empty_analysis(self):
+        """Analysis returned when there is nothing to analyze"""
+        return {
+            "total_results": 0,
+            "sources": {},
+            "communities": [],
+            "sentiment": {"positive": 0, "neutral": 0, "negative": 0},
+            "common_words": [],
+            "common_phrases": [],
+            "summary": "No results to analyze."
+        }
+    
+    @profiling.profiled("analysis.tokenize")
+    def _tokenize_words(self, text):
+        """Tokenize text into words, falling back to whitespace splitting"""
+        if 'word' not in self._tokenizer_failed:
+            try:
+                nltk_resources.ensure()
+                from nltk.tokenize import word_tokenize
+                return word_tokenize(text)
+            except LookupError:
+                # Missing punkt data will not appear mid-run, so stop trying
+                self._tokenizer_failed.add('word')
+            except Exception:
+                pass
+        # Fall back to simple splitting if NLTK tokenizer fails
+        return text.split()
+    
+    @profiling.profiled("analysis.tokenize")
+    def _tokenize_sentences(self, text):
+        """Split text into sentences, falling back to splitting on periods"""
+        if 'sentence' not in self._tokenizer_failed:
+            try:
+                nltk_resources.ensure()
+                from nltk.tokenize import sent_tokenize
+                return sent_tokenize(text)
+            except LookupError:
+                # Missing punkt data will not appear mid-run, so stop trying
+                self._tokenizer_failed.add('sentence')
+            except Exception:
+                pass
+        # Fall back to simple period splitting if NLTK tokenizer fails
+        return text.split('.')
+    
+    def _filter_tokens(self, tokens, min_length=3):
+        """Drop stopwords, punctuation and short tokens"""
+        return [word for word in tokens
+                if word not in self.stop_words
+                and word not in string.punctuation
+                and len(word) >= min_length]
+    
     def _count_sources(self, results):
         """Count results by source (Reddit)"""
         sources = {}
@@ -98,189 +427,62 @@ class Processor:
             sources[source] = sources.get(source, 0) + 1
         return sources
     
-    def _analyze_sentiment(self, results):
+    def _count_communities(self, results):
+        """Count results by community, in the shape of an analysis' community breakdown"""
+        counts = Counter(result.get('community') or 'Unknown' for result in results)
+        return [{"community": community, "posts": posts, "sentiment": {"positive": 0, "neutral": 0, "negative": 0},
+                 "top_words": []}
+                for community, posts in self._most_common(counts, 10)]
+    
+    def _top_communities(self, communities, top_n=10, top_words=5):
+        """The community breakdown of an analysis: communities with the most posts, with their top words"""
+        ranked = sorted(communities.items(), key=lambda item: (-item[1]["posts"], item[0]))[:top_n]
+        return [{"community": community, "posts": entry["posts"], "sentiment": entry["sentiment"],
+                 "top_words": self._most_common(entry["words"], top_words)}
+                for community, entry in ranked]
+    
+    def _classify_keyword_sentiment(self, text):
         """
-        Simple sentiment analysis based on positive/negative word counts
+        Simple sentiment classification based on positive/negative word counts
         More sophisticated sentiment analysis could be implemented with external libraries
         """
-        positive_words = set([
-            'good', 'great', 'excellent', 'amazing', 'awesome', 'fantastic',
-            'wonderful', 'best', 'love', 'recommend', 'positive', 'perfect',
-            'helpful', 'impressive', 'better', 'easy', 'top', 'favorite',
-            'satisfied', 'worth', 'nice', 'happy', 'reliable', 'effective'
-        ])
-        
-        negative_words = set([
-            'bad', 'poor', 'terrible', 'awful', 'horrible', 'worst',
-            'hate', 'negative', 'difficult', 'broken', 'annoying', 'avoid',
-            'disappointing', 'issue', 'problem', 'bug', 'error', 'crash',
-            'slow', 'expensive', 'overpriced', 'useless', 'confusing', 'fail'
-        ])
-        
-        sentiment = {"positive": 0, "neutral": 0, "negative": 0}
-        
-        for result in results:
-            try:
-                content = result.get('content', '') or ''  # Ensure content is never None
-                title = result.get('title', '') or ''      # Ensure title is never None
-                
-                text = title + " " + content
-                
-                pos_count = sum(1 for word in text.split() if word in positive_words)
-                neg_count = sum(1 for word in text.split() if word in negative_words)
-                
-                if pos_count > neg_count:
-                    sentiment["positive"] += 1
-                elif neg_count > pos_count:
-                    sentiment["negative"] += 1
-                else:
-                    sentiment["neutral"] += 1
-            except Exception as e:
-                print(f"Error analyzing sentiment for a result: {e}")
-                sentiment["neutral"] += 1  # Default to neutral on error
-                
-        return sentiment
+        words = text.split()
+        pos_count = sum(1 for word in words if word in POSITIVE_WORDS)
+        neg_count = sum(1 for word in words if word in NEGATIVE_WORDS)
+        
+        if pos_count > neg_count:
+            return "positive"
+        elif neg_count > pos_count:
+            return "negative"
+        return "neutral"
     
-    def _extract_common_words(self, results, top_n=20):
-        """Extract most common words from all results content"""
-        try:
-            all_text = " ".join([(result.get('title', '') or '') + " " + (result.get('content', '') or '') for result in results])
+    def _top_phrases(self, bigram_counts, trigram_counts, top_n=10):
+        """Combine the most common bigrams and trigrams into one ranked list"""
+        phrases = []
+        for phrase, count in self._most_common(bigram_counts, top_n//2):
+            phrases.append((phrase, count))
             
-            # Tokenize and clean
-            try:
-                tokens = word_tokenize(all_text.lower())
-            except:
-                # Fall back to simple splitting if NLTK tokenizer fails
-                tokens = all_text.lower().split()
-                
-            tokens = [word for word in tokens 
-                    if word not in self.stop_words
-                    and word not in string.punctuation
-                    and len(word) > 2]
+        for phrase, count in self._most_common(trigram_counts, top_n//2):
+            phrases.append((phrase, count))
             
-            # Get frequency distribution
-            fdist = FreqDist(tokens)
-            return fdist.most_common(top_n)
-        except Exception as e:
-            print(f"Error extracting common words: {e}")
-            return []
+        return sorted(phrases, key=lambda x: x[1], reverse=True)[:top_n]
     
-    def _extract_common_phrases(self, results, top_n=10):
-        """Extract common 2-3 word phrases (bigrams and trigrams)"""
-        try:
-            all_text = " ".join([(result.get('title', '') or '') + " " + (result.get('content', '') or '') for result in results])
-            
-            # Tokenize sentences and words
-            try:
-                sentences = sent_tokenize(all_text)
-            except:
-                # Fall back to simple period splitting if NLTK tokenizer fails
-                sentences = all_text.split('.')
-            
-            # Extract bigrams and trigrams
-            bigrams = []
-            trigrams = []
-            
-            for sentence in sentences:
-                try:
-                    words = [word.lower() for word in word_tokenize(sentence) 
-                            if word.lower() not in self.stop_words
-                            and word not in string.punctuation
-                            and len(word) > 2]
-                except:
-                    # Fall back to simple word splitting
-                    words = [word.lower() for word in sentence.split() 
-                            if word.lower() not in self.stop_words
-                            and word not in string.punctuation
-                            and len(word) > 2]
-                
-                # Add bigrams
-                for i in range(len(words) - 1):
-                    bigrams.append(f"{words[i]} {words[i+1]}")
-                
-                # Add trigrams
-                for i in range(len(words) - 2):
-                    trigrams.append(f"{words[i]} {words[i+1]} {words[i+2]}")
-            
-            # Count frequencies
-            bigram_counter = Counter(bigrams)
-            trigram_counter = Counter(trigrams)
-            
-            # Combine and get top phrases
-            phrases = []
-            for phrase, count in bigram_counter.most_common(top_n//2):
-                phrases.append((phrase, count))
-                
-            for phrase, count in trigram_counter.most_common(top_n//2):
-                phrases.append((phrase, count))
-                
-            return sorted(phrases, key=lambda x: x[1], reverse=True)[:top_n]
-        except Exception as e:
-            print(f"Error extracting common phrases: {e}")
-            return []
+    def _most_common(self, counts, top_n):
+        """Most common items, with ties broken alphabetically so results are stable"""
+        return sorted(counts.items(), key=lambda x: (-x[1], x[0]))[:top_n]
     
-    def _generate_summary(self, results, max_sentences=10):
-        """Generate a brief summary of the results"""
+    def _generate_extractive_summary(self, sentences, word_frequencies, max_sentences=10):
+        """
+        Pick the highest scoring sentences as a summary
+        Sentences are (text, tokens) pairs scored by the frequency of their tokens
+        """
         try:
-            # Extract all sentences
-            all_sentences = []
-            for result in results:
-                content = result.get('content', '') or ''  # Ensure content is never None
-                try:
-                    sentences = sent_tokenize(content)
-                except:
-                    # Fall back to simple period splitting if NLTK tokenizer fails
-                    sentences = content.split('.')
-                all_sentences.extend(sentences)
-            
-            # If there are very few sentences, return them directly
-            if len(all_sentences) <= max_sentences:
-                return " ".join(all_sentences)
-            
-            # Score each sentence based on word frequency
-            all_text = " ".join(all_sentences)
-            try:
-                words = word_tokenize(all_text.lower())
-            except:
-                # Fall back to simple word splitting
-                words = all_text.lower().split()
-                
-            words = [word for word in words 
-                    if word not in self.stop_words
-                    and word not in string.punctuation]
-            
-            word_frequencies = Counter(words)
-            
-            # Calculate sentence scores
-            sentence_scores = {}
-            for sentence in all_sentences:
-                if not sentence.strip():  # Skip empty sentences
-                    continue
-                    
-                try:
-                    sentence_words = word_tokenize(sentence.lower())
-                except:
-                    sentence_words = sentence.lower().split()
-                    
-                for word in sentence_words:
-                    if word in word_frequencies:
-                        if sentence in sentence_scores:
-                            sentence_scores[sentence] += word_frequencies[word]
-                        else:
-                            sentence_scores[sentence] = word_frequencies[word]
-            
-            # Get top sentences
-            summary_sentences = sorted(sentence_scores.items(), key=lambda x: x[1], reverse=True)[:max_sentences]
-            summary = " ".join([sentence for sentence, score in summary_sentences])
-            
-            return summary
+            return self.summarizer.summarize(sentences, max_sentences, word_frequencies)
         except Exception as e:
-            print(f"Error generating summary: {e}")
-            if results and len(results) > 0:
-                # Return first result title as fallback
-                return f"Could not generate summary. Sample title: {results[0].get('title', '')}"
+            log.error("summary failed", error=e)
             return "Could not generate summary."
     
+    @profiling.profiled("analysis.report")
     def generate_text_report(self, analysis, search_term):
         """Generate a formatted text report from analysis data"""
         try:
@@ -293,6 +495,20 @@ class Processor:
             if sources:
                 report += f"Sources: {', '.join([f'{src} ({count})' for src, count in sources.items()])}\n\n"
             
+            # Community breakdown
+            communities = analysis.get('communities', [])
+            if communities:
+                report += "Communities:\n"
+                for entry in communities:
+                    counts = entry['sentiment']
+                    posts = sum(counts.values()) or 1
+                    report += (f"  {entry['community']}: {entry['posts']} posts, "
+                               f"{counts['positive']/posts*100:.0f}% positive, {counts['negative']/posts*100:.0f}% negative")
+                    if entry.get('top_words'):
+                        report += f" - {', '.join(word for word, _ in entry['top_words'])}"
+                    report += "\n"
+                report += "\n"
+            
             # Sentiment
             sentiment = analysis.get('sentiment', {"positive": 0, "neutral": 0, "negative": 0})
             report += "Sentiment Analysis:\n"
@@ -326,7 +542,7 @@ class Processor:
             
             return report
         except Exception as e:
-            print(f"Error generating report: {e}")
+            log.error("report failed", search_term=search_term, error=e)
             return f"Error generating report: {str(e)}"
     
     def format_results_for_display(self, results):
@@ -356,7 +572,7 @@ class Processor:
                     'full_result': result  # Keep reference to full result
                 })
             except Exception as e:
-                print(f"Error formatting result for display: {e}")
+                log.error("display formatting failed", url=result.get('url'), error=e)
                 # Add a placeholder for the error result
                 formatted.append({
                     'title': 'Error formatting result',
@@ -370,6 +586,8 @@ class Processor:
             
         return formatted 
 
+    @STAGE_SECONDS.timed(stage="process_results")
+    @profiling.profiled("analysis.process_results")
     def process_results(self, results, search_term):
         """Process the scraped results to extract insights"""
         if not results:
@@ -378,6 +596,8 @@ class Processor:
                 "message": "No results found for the given search term and timeframe."
             }
         
+        import pandas as pd
+        
         # Create a DataFrame from the results
         df = pd.DataFrame(results)
         
@@ -391,7 +611,8 @@ class Processor:
         # Run analysis
         sentiment_data = self._analyze_sentiment(df)
         word_freq = self._analyze_word_frequency(df)
-        summary = self._generate_summary(df, sentiment_data, word_freq)
+        comment_data = self._analyze_comment_trees(df)
+        summary = self._generate_summary(df, sentiment_data, word_freq, comment_data)
         
         # Return both the processed data and the analysis summary
         return {
@@ -399,6 +620,7 @@ class Processor:
             "analysis": {
                 "sentiment": sentiment_data,
                 "word_frequency": word_freq,
+                "comments": comment_data,
                 "summary": summary
             }
         }
@@ -407,29 +629,10 @@ class Processor:
         """Analyze sentiment of the content"""
         sentiments = []
         
-        for _, row in df.iterrows():
-            content_text = row['content']
-            
-            # Also analyze comments
-            if 'comments' in row and row['comments']:
-                # Process structured comments
-                all_comment_text = ""
-                for comment in row['comments']:
-                    if isinstance(comment, dict) and 'body' in comment:
-                        all_comment_text += " " + comment['body']
-                        
-                        # Include replies
-                        if 'replies' in comment and comment['replies']:
-                            for reply in comment['replies']:
-                                if isinstance(reply, dict) and 'body' in reply:
-                                    all_comment_text += " " + reply['body']
-                
-                # Combine post content with comments for complete sentiment
-                content_text = content_text + " " + all_comment_text
-            
-            # Get sentiment scores
-            sentiment = self.sia.polarity_scores(content_text)
-            
+        rows = [row for _, row in df.iterrows()]
+        scores = self._memoized('vader', rows, self._score_row_sentiment)
+        
+        for row, sentiment in zip(rows, scores):
             # Categorize the sentiment
             if sentiment['compound'] >= 0.05:
                 category = 'positive'
@@ -449,6 +652,7 @@ class Processor:
             })
         
         # Create a summary of sentiments
+        import pandas as pd
         sentiment_df = pd.DataFrame(sentiments)
         sentiment_summary = {
             'total': len(sentiment_df),
@@ -463,56 +667,85 @@ class Processor:
             'summary': sentiment_summary
         }
     
-    def _analyze_word_frequency(self, df):
-        """Analyze word frequency in content"""
-        # Combine all content and comments
-        all_text = ""
+    def _score_row_sentiment(self, row):
+        """VADER polarity scores for a post's content combined with its comments"""
+        content_text = row['content']
         
-        for _, row in df.iterrows():
-            all_text += " " + row['content']
-            
-            # Also include comments in the analysis
-            if 'comments' in row and row['comments']:
-                # Process structured comments
-                for comment in row['comments']:
-                    if isinstance(comment, dict) and 'body' in comment:
-                        all_text += " " + comment['body']
-                        
-                        # Include replies
-                        if 'replies' in comment and comment['replies']:
-                            for reply in comment['replies']:
-                                if isinstance(reply, dict) and 'body' in reply:
-                                    all_text += " " + reply['body']
+        # Also analyze comments
+        if 'comments' in row and row['comments']:
+            # Combine post content with comments for complete sentiment
+            content_text = content_text + " " + self._comment_text(row['comments'])
         
-        # Clean the text
-        cleaned_text = re.sub(r'[^\w\s]', '', all_text.lower())
+        with profiling.stage("analysis.sentiment"):
+            return self.sia.polarity_scores(content_text)
+    
+    def _comment_text(self, comments):
+        """Join the bodies of all comments and replies at every depth"""
+        from comment_analytics import iter_comments
+        return "".join(" " + comment['body'] for comment, _, _ in iter_comments(comments))
+    
+    def analyze_comments(self, comments):
+        """Score-weighted sentiment and term statistics for one comment tree"""
+        return self.comment_analyzer.analyze(comments)
+    
+    def _analyze_comment_trees(self, df):
+        """Comment-level analysis across all posts, weighted by comment score and depth"""
+        rows = [row for _, row in df.iterrows()]
         
-        # Tokenize
-        words = word_tokenize(cleaned_text)
+        def analyze_row(row):
+            comments = row['comments'] if 'comments' in row and isinstance(row['comments'], list) else []
+            return self.analyze_comments(comments)
         
-        # Remove stop words
-        words = [word for word in words if word not in self.stop_words and len(word) > 2]
+        per_post = self._memoized('comments', rows, analyze_row)
+        from comment_analytics import CommentAnalyzer
+        return CommentAnalyzer.summarize(CommentAnalyzer.merge(per_post))
+    
+    def _analyze_word_frequency(self, df):
+        """Analyze word frequency in content"""
+        rows = [row for _, row in df.iterrows()]
         
-        # Count word frequency
-        word_counts = Counter(words)
+        # Count words and bigrams per post so unchanged posts come from the cache
+        word_counts = Counter()
+        bigram_counts = Counter()
+        for counts in self._memoized('word_frequency', rows, self._count_row_words):
+            word_counts.update(counts['words'])
+            bigram_counts.update(counts['bigrams'])
         
         # Get the most common words
         most_common = word_counts.most_common(20)
         
-        # Extract phrases (bigrams)
-        bigrams = list(nltk.bigrams(words))
-        bigram_counts = Counter(bigrams)
-        common_phrases = bigram_counts.most_common(10)
-        
         # Format the phrases
-        formatted_phrases = [' '.join(phrase) for phrase, count in common_phrases]
+        formatted_phrases = [phrase for phrase, count in bigram_counts.most_common(10)]
         
         return {
             'common_words': {word: count for word, count in most_common},
             'common_phrases': formatted_phrases
         }
     
-    def _generate_summary(self, df, sentiment_data, word_freq):
+    def _count_row_words(self, row):
+        """Word and bigram counts for a post's content and comments"""
+        all_text = " " + row['content']
+        
+        # Also include comments in the analysis
+        if 'comments' in row and row['comments']:
+            all_text += self._comment_text(row['comments'])
+        
+        # Clean the text
+        cleaned_text = re.sub(r'[^\w\s]', '', all_text.lower())
+        
+        # Tokenize and remove stop words
+        words = [word for word in self._tokenize_words(cleaned_text)
+                 if word not in self.stop_words and len(word) > 2]
+        
+        # Extract phrases (bigrams)
+        bigrams = Counter(f"{first} {second}" for first, second in zip(words, words[1:]))
+        
+        return {
+            'words': dict(Counter(words)),
+            'bigrams': dict(bigrams)
+        }
+    
+    def _generate_summary(self, df, sentiment_data, word_freq, comment_data=None):
         """Generate a text summary of the findings"""
         summary = []
         
@@ -543,8 +776,18 @@ class Processor:
         if common_phrases:
             summary.append(f"Common phrases: {', '.join(common_phrases)}.")
         
+        # Add score-weighted comment sentiment
+        if comment_data and comment_data['comment_count']:
+            share = comment_data['sentiment_share']
+            summary.append(
+                f"Comments (weighted by score and depth): {comment_data['comment_count']} comments, "
+                f"{share['positive']*100:.1f}% positive, {share['negative']*100:.1f}% negative, "
+                f"average compound {comment_data['average_compound']:.3f}."
+            )
+        
         return "\n".join(summary)
     
+    @profiling.profiled("export")
     def export_results(self, processed_data, output_format='json', filename=None):
         """Export processed results to a file"""
         if not filename:
@@ -570,7 +813,7 @@ class Processor:
                     
                 # Ensure each comment has all required fields
                 for i, comment in enumerate(post['comments']):
-                    if not isinstance(comment, dict):
+                    if not isinstance(comment, Mapping):
                         # Convert string comments to proper format
                         post['comments'][i] = {
                             "author": "Unknown",
@@ -583,9 +826,10 @@ class Processor:
             
             # Export as JSON with proper formatting
             with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(processed_data, f, ensure_ascii=False, indent=2)
+                json.dump(processed_data, f, ensure_ascii=False, indent=2, default=json_default)
             
-            print(f"Exported {len(processed_data)} posts with {sum(len(post.get('comments', [])) for post in processed_data)} comments to JSON")
+            log.info("exported", path=output_file, posts=len(processed_data),
+                     comments=sum(len(post.get('comments', [])) for post in processed_data))
             
             return output_file
         
@@ -593,12 +837,13 @@ class Processor:
             output_file = f"{filename}.csv"
             
             # Convert to DataFrame
+            import pandas as pd
             df = pd.DataFrame(processed_data)
             
             # Handle nested comment structures for CSV export
             if 'comments' in df.columns:
                 # Serialize nested comments to string
-                df['comments'] = df['comments'].apply(lambda x: json.dumps(x) if x else "")
+                df['comments'] = df['comments'].apply(lambda x: json.dumps(x, default=json_default) if x else "")
             
             # Export as CSV
             df.to_csv(output_file, index=False, encoding='utf-8')
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Stage profiling
+Opt-in CPU and memory profiling of the pipeline stages (HTTP fetches, JSON parsing,
+comment threads, saving, tokenization, analysis). While enabled, each stage runs
+under cProfile and outermost stages between tracemalloc snapshots; calls of the same
+stage are accumulated. On close the profiler writes <stage>.prof files (readable with
+pstats or snakeviz) and report.txt with time, hottest functions, peak memory and top
+allocations per stage.
+
+While profiling is off, stage() returns a shared no-op context manager and
+profiled functions make a single check, so the hooks cost next to nothing.
+
+    import profiling
+    profiling.enable("profiles")
+    ...
+    profiling.disable()      # writes the report
+"""
+
+import io
+import os
+import time
+import pstats
+import cProfile
+import functools
+import threading
+import tracemalloc
+
+# Active StageProfiler, or None while profiling is off
+_profiler = None
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class StageStats:
+    """What the profiler accumulated for one stage name"""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.profiled_calls = 0
+        self.memory_calls = 0
+        self.seconds = 0.0
+        self.peak_bytes = 0
+        self.profile = cProfile.Profile()
+        # (filename, lineno) -> [net bytes, net blocks] retained by calls of the stage
+        self.allocations = {}
+
+class StageProfiler:
+    """
+    Profiles named stages into output_dir
+    A stage entered inside another pauses the outer stage's profile, so each .prof
+    holds the stage's own work; memory is measured by the outermost stage only,
+    including its nested stages. cProfile follows one thread at a time, so stages
+    entered in other threads meanwhile are timed but not profiled.
+    """
+
+    def __init__(self, output_dir="profiles", memory=True, top=25):
+        self.output_dir = output_dir
+        self.memory = memory
+        self.top = top
+        self.stages = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        # Thread whose stages are being profiled, and its stack of open stages
+        self._owner = None
+        self._stack = []
+        self._started_tracemalloc = False
+
+        os.makedirs(output_dir, exist_ok=True)
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def _stats(self, name):
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats(name)
+            return stats
+
+    def _push(self, stage):
+        """Make stage the one being profiled; False if another thread holds the profiler"""
+        thread = threading.get_ident()
+        with self._lock:
+            if self._owner is None:
+                self._owner = thread
+            elif self._owner != thread:
+                return False
+            if self._stack:
+                self._stack[-1].stats.profile.disable()
+            self._stack.append(stage)
+            return True
+
+    def _pop(self):
+        """Close the innermost stage and resume the one around it"""
+        with self._lock:
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1].stats.profile.enable()
+            else:
+                self._owner = None
+
+    def _record_allocations(self, stats, before, after):
+        # Leave out the snapshots themselves and the profiler's bookkeeping
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        before = before.filter_traces(ignore)
+        after = after.filter_traces(ignore)
+        for diff in after.compare_to(before, 'lineno'):
+            if not diff.size_diff and not diff.count_diff:
+                continue
+            frame = diff.traceback[0]
+            entry = stats.allocations.setdefault((frame.filename, frame.lineno), [0, 0])
+            entry[0] += diff.size_diff
+            entry[1] += diff.count_diff
+
+    def close(self):
+        """Stop tracing and write the profile dumps and the report; returns the report path"""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        for stats in self.stages.values():
+            if stats.profiled_calls:
+                stats.profile.dump_stats(os.path.join(self.output_dir, f"{_safe_name(stats.name)}.prof"))
+
+        path = os.path.join(self.output_dir, "report.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.report())
+        return path
+
+    def report(self):
+        """Text report of every stage, slowest first"""
+        lines = [f"Stage profile, {time.time() - self.started:.1f} s of profiling",
+                 "Times include nested stages; function tables show each stage's own work.", ""]
+        for stats in sorted(self.stages.values(), key=lambda stats: -stats.seconds):
+            lines.append("=" * 80)
+            lines.append(f"{stats.name}: {stats.calls} calls ({stats.profiled_calls} profiled), "
+                         f"{stats.seconds:.3f} s total, {stats.seconds / max(stats.calls, 1) * 1000:.2f} ms per call")
+            if stats.memory_calls:
+                lines.append(f"Peak memory above the start of a call: {stats.peak_bytes / 1024:.1f} KiB")
+            lines.append("=" * 80)
+
+            if stats.profiled_calls:
+                out = io.StringIO()
+                pstats.Stats(stats.profile, stream=out).sort_stats('cumulative').print_stats(self.top)
+                # Drop pstats' header lines, keep the table
+                table = out.getvalue()
+                lines.append(table[table.find("   ncalls"):].rstrip() if "   ncalls" in table else table.rstrip())
+
+            if stats.allocations:
+                lines.append("")
+                lines.append(f"Top allocations retained by {stats.name}:")
+                top = sorted(stats.allocations.items(), key=lambda item: -abs(item[1][0]))[:self.top]
+                for (filename, lineno), (size, count) in top:
+                    lines.append(f"  {size / 1024:10.1f} KiB {count:8d} blocks  {_short_path(filename)}:{lineno}")
+            lines.append("")
+        return "\n".join(lines)
+
+class _Stage:
+    """Context manager timing one call of a stage and profiling it when the profiler is free"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.stats = profiler._stats(name)
+        self.profiling = False
+        self.snapshot = None
+
+    def __enter__(self):
+        self.profiling = self.profiler._push(self)
+        if self.profiling:
+            # Snapshots are only taken around outermost stages; they are too slow for
+            # stages that run per document or per request
+            if self.profiler.memory and tracemalloc.is_tracing() and len(self.profiler._stack) == 1:
+                self.snapshot = tracemalloc.take_snapshot()
+                tracemalloc.reset_peak()
+                self.memory_start = tracemalloc.get_traced_memory()[0]
+            self.stats.profile.enable()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        if self.profiling:
+            self.stats.profile.disable()
+            if self.snapshot is not None and tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1] - self.memory_start
+                self.profiler._record_allocations(self.stats, self.snapshot, tracemalloc.take_snapshot())
+                self.stats.peak_bytes = max(self.stats.peak_bytes, peak)
+                self.stats.memory_calls += 1
+                self.snapshot = None
+            self.stats.profiled_calls += 1
+            self.profiler._pop()
+
+        with self.profiler._lock:
+            self.stats.calls += 1
+            self.stats.seconds += elapsed
+        return False
+
+def _safe_name(name):
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in name)
+
+def _short_path(filename):
+    """Paths inside the project relative to it, others as they are"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    return os.path.relpath(filename, root) if filename.startswith(root) else filename
+
+def enable(output_dir="profiles", memory=True, top=25):
+    """Start profiling stages into output_dir (closing any profiler already running)"""
+    global _profiler
+    disable()
+    _profiler = StageProfiler(output_dir, memory=memory, top=top)
+    return _profiler
+
+def disable():
+    """Stop profiling and write the report; returns its path, or None if profiling was off"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return None
+    return profiler.close()
+
+def is_enabled():
+    return _profiler is not None
+
+def stage(name):
+    """Context manager around one call of a pipeline stage"""
+    profiler = _profiler
+    if profiler is None:
+        return _NULL_STAGE
+    return profiler.stage(name)
+
+def profiled(name):
+    """Decorator making every call of a function a stage"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return function(*args, **kwargs)
+            with profiler.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Post and comment records
+Compact slotted types for the posts and comment trees the scraper produces and the
+database hands back. Strings that repeat across a corpus (authors, communities,
+sources) are interned, so every comment by the same author shares one string. Records
+behave as read/write mappings over their fields, so code written for the plain dicts
+(result['title'], comment.get('replies'), dict(result, search_term=...)) keeps working;
+json.dumps needs default=json_default to serialize them.
+"""
+
+import sys
+import json
+from collections.abc import Mapping
+
+class Record(Mapping):
+    """Base of the slotted records: a mapping over the names in FIELDS"""
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(f"{type(self).__name__} has no field {key!r}")
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def to_dict(self):
+        """The record as a plain dict, nested records included"""
+        return {field: _plain(getattr(self, field)) for field in self.FIELDS}
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, field) for field in self.FIELDS))
+
+class Comment(Record):
+    """One comment and its replies (a list of Comments)"""
+
+    __slots__ = ('author', 'score', 'body', 'replies')
+    FIELDS = __slots__
+
+    def __init__(self, author="Anonymous", score=0, body="", replies=None):
+        self.author = _intern(author)
+        self.score = score
+        self.body = body
+        self.replies = replies if replies is not None else []
+
+    @classmethod
+    def from_dict(cls, data):
+        """Comment tree from scraper-format dicts (or records)"""
+        replies = [cls.from_dict(reply) for reply in (data.get('replies') or []) if isinstance(reply, Mapping)]
+        return cls(data.get('author', 'Anonymous'), data.get('score', 0), data.get('body', ''), replies)
+
+class Post(Record):
+    """A scraped post and its comment tree; author and score are None when unknown"""
+
+    __slots__ = ('title', 'url', 'source', 'community', 'date', 'content', 'comments', 'author', 'score')
+    FIELDS = __slots__
+
+    def __init__(self, title="", url="", source="", community="", date=None, content="", comments=None,
+                 author=None, score=None):
+        self.title = title
+        self.url = url
+        self.source = _intern(source)
+        self.community = _intern(community)
+        self.date = date
+        self.content = content
+        self.comments = comments if comments is not None else []
+        self.author = _intern(author)
+        self.score = score
+
+    @classmethod
+    def from_dict(cls, data):
+        """Post from a scraper result dict; keys other than the fields are dropped"""
+        comments = [Comment.from_dict(comment) for comment in (data.get('comments') or []) if isinstance(comment, Mapping)]
+        return cls(data.get('title', ''), data.get('url', ''), data.get('source', ''), data.get('community', ''),
+                   data.get('date'), data.get('content', ''), comments, data.get('author'), data.get('score'))
+
+COMMENT_KEYS = frozenset(Comment.FIELDS)
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+def _plain(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+def json_default(value):
+    """default= for json.dump(s): records as dicts, anything else as its string"""
+    if isinstance(value, Record):
+        return {field: getattr(value, field) for field in value.FIELDS}
+    return str(value)
+
+def _comment_hook(data):
+    # Objects are decoded innermost first, so replies are already Comments here
+    if data.keys() == COMMENT_KEYS:
+        return Comment(data['author'], data['score'], data['body'], data['replies'])
+    return data
+
+def load_comments(text):
+    """Decode a stored comment tree (JSON) into Comments; objects of other shapes stay dicts"""
+    return json.loads(text, object_hook=_comment_hook)
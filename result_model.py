@@ -0,0 +1,82 @@
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+
+class ResultListModel(QAbstractListModel):
+    """
+    List model over stored results.
+    Rows hold only light metadata (id, title, source, community, date, url) and are
+    fetched from the Database a page at a time as the view scrolls; full content
+    and comments are loaded separately when a row is selected.
+    """
+
+    ResultRole = Qt.ItemDataRole.UserRole
+
+    def __init__(self, db, page_size=200, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.page_size = page_size
+        self.rows = []
+        self.search_term = None
+        self._exhausted = True
+
+    def load_search_term(self, search_term):
+        """Show the stored results of a search term, fetched lazily in pages"""
+        self.beginResetModel()
+        self.rows = []
+        self.search_term = search_term
+        self._exhausted = False
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        """Show an explicit list of light result rows instead of a stored search"""
+        self.beginResetModel()
+        self.rows = list(rows)
+        self.search_term = None
+        self._exhausted = True
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        """Append light result rows, e.g. while a search is still running"""
+        if not rows:
+            return
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def clear(self):
+        self.set_rows([])
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+
+        row = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{row.get('title', 'Untitled')} ({row.get('source', 'Unknown')})"
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            return row.get('community', '')
+        elif role == self.ResultRole:
+            return row
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+
+        page = self.db.get_result_page(
+            search_term=self.search_term, offset=len(self.rows), limit=self.page_size
+        )
+        if len(page) < self.page_size:
+            self._exhausted = True
+
+        self.append_rows(page)
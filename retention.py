@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Data retention and background compaction
+Keeps a long-running database bounded. Comment trees older than the policy's
+comment_days are dropped while their posts stay; posts older than post_days are
+deleted after their days are rolled up into per-term daily statistics, which trends
+keep showing. Space freed by each run is given back with an incremental vacuum, so
+the file shrinks without the long lock of a full VACUUM.
+
+The policy is stored in the database:
+    python retention.py --comment-days 30 --post-days 365 --save
+    python retention.py --show
+    python retention.py --once                 # apply the stored policy now
+    python retention.py --interval 3600        # keep compacting, once an hour
+"""
+
+import sys
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from logs import get_logger, configure_logging, add_logging_arguments
+from metrics import registry as metrics
+
+log = get_logger("retention")
+
+POSTS_EXPIRED = metrics.counter("retention_posts_expired_total", "Posts deleted by retention")
+COMMENTS_STRIPPED = metrics.counter("retention_comment_trees_stripped_total", "Comment trees dropped by retention")
+PAGES_VACUUMED = metrics.counter("retention_pages_vacuumed_total", "Database pages given back by incremental vacuums")
+RUN_SECONDS = metrics.histogram("retention_run_seconds", "Duration of retention runs")
+
+class RetentionManager:
+    """
+    Applies a retention policy ({"comment_days": days, "post_days": days}, None meaning
+    forever) to a Database. Without a policy the one stored in the database is read on
+    every run, so changes take effect without a restart. vacuum_pages caps the pages
+    given back per run (None for all free pages).
+    """
+
+    def __init__(self, db, processor, policy=None, vacuum_pages=2000):
+        from trends import TrendAnalyzer
+
+        self.db = db
+        self.trends = TrendAnalyzer(db, processor)
+        self.policy = policy
+        self.vacuum_pages = vacuum_pages
+        self.stop_event = threading.Event()
+
+    def cutoff(self, days, now=None):
+        """First day (YYYY-MM-DD) still kept by a retention period of `days`"""
+        now = now or datetime.now()
+        return (now - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    @RUN_SECONDS.timed()
+    def run_once(self, now=None):
+        """Apply the policy once; returns what was removed"""
+        policy = self.policy or self.db.get_retention_policy()
+        report = {"posts_expired": 0, "days_rolled_up": 0, "comments_stripped": 0, "pages_vacuumed": 0}
+
+        if policy.get("post_days"):
+            before = self.cutoff(policy["post_days"], now)
+            for search_term, (days, max_id) in self.db.get_expired_days(before).items():
+                if self.stop_event.is_set():
+                    break
+                # Roll the days up first; rows stored after max_id wait for the next run
+                if days:
+                    self.db.save_daily_rollups(search_term, self.trends.rollup_days(search_term, days, max_id))
+                report["days_rolled_up"] += len(days)
+                report["posts_expired"] += self.db.expire_results(search_term, before, max_id)
+
+        if policy.get("comment_days") and not self.stop_event.is_set():
+            report["comments_stripped"] = self.db.strip_comments(self.cutoff(policy["comment_days"], now))
+
+        report["pages_vacuumed"] = self.db.incremental_vacuum(self.vacuum_pages)
+
+        POSTS_EXPIRED.inc(report["posts_expired"])
+        COMMENTS_STRIPPED.inc(report["comments_stripped"])
+        PAGES_VACUUMED.inc(report["pages_vacuumed"])
+        log.info("retention run", **report)
+        return report
+
+    def run_forever(self, interval=3600):
+        """Run every `interval` seconds until stop() is called"""
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                log.error("retention run failed", error=e)
+            self.stop_event.wait(interval)
+
+    def start(self, interval=3600):
+        """Compact in a background thread; returns the thread"""
+        thread = threading.Thread(target=self.run_forever, args=(interval,), name="retention", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.stop_event.set()
+
+def format_policy(policy):
+    def period(days):
+        return f"{days} days" if days else "forever"
+    return f"Comments kept {period(policy['comment_days'])}, posts kept {period(policy['post_days'])}"
+
+def get_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Apply the retention policy and compact the database')
+    parser.add_argument('--comment-days', type=int, metavar='DAYS',
+                        help='Drop comment trees of posts older than DAYS (0 keeps them forever)')
+    parser.add_argument('--post-days', type=int, metavar='DAYS',
+                        help='Roll up and delete posts older than DAYS (0 keeps them forever)')
+    parser.add_argument('--save', action='store_true', help='Store the given periods as the database policy')
+    parser.add_argument('--show', action='store_true', help='Show the stored policy and database size')
+    parser.add_argument('--once', action='store_true', help='Apply the policy once, then exit')
+    parser.add_argument('--interval', type=int, default=3600,
+                        help='Seconds between runs when running continuously (default: 3600)')
+    parser.add_argument('--vacuum-pages', type=int, default=2000,
+                        help='Most pages given back per run, 0 for all (default: 2000)')
+    parser.add_argument('--full-vacuum', action='store_true',
+                        help='Rebuild the file once; also switches older databases to incremental vacuuming')
+    parser.add_argument('--db', type=str, default='scraper_data.db', help='Database file (default: scraper_data.db)')
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = get_args()
+    configure_logging(args.log_level, args.log_format)
+
+    from database import Database
+    from processor import Processor
+    db = Database(args.db)
+
+    # Periods given on the command line override the stored ones
+    policy = db.get_retention_policy()
+    if args.comment_days is not None:
+        policy["comment_days"] = args.comment_days or None
+    if args.post_days is not None:
+        policy["post_days"] = args.post_days or None
+
+    if args.save:
+        db.set_retention_policy(policy["comment_days"], policy["post_days"])
+        print(f"Saved: {format_policy(policy)}")
+    if args.show:
+        stats = db.storage_stats()
+        print(format_policy(policy))
+        print(f"{args.db}: {stats['rows']} rows, {stats['file_bytes'] / 1e6:.1f} MB file, "
+              f"{stats['free_bytes'] / 1e6:.1f} MB free")
+    if args.full_vacuum:
+        db.vacuum()
+        print("Vacuumed")
+    if (args.save or args.show or args.full_vacuum) and not args.once:
+        return 0
+
+    # Without overrides the stored policy is reread on every run
+    overridden = args.comment_days is not None or args.post_days is not None
+    manager = RetentionManager(db, Processor(), policy if overridden else None, vacuum_pages=args.vacuum_pages or None)
+    if args.once:
+        report = manager.run_once()
+        print(f"Expired {report['posts_expired']} posts ({report['days_rolled_up']} days rolled up), "
+              f"stripped {report['comments_stripped']} comment trees, gave back {report['pages_vacuumed']} pages")
+        return 0
+
+    print(f"{format_policy(policy)}; compacting every {timedelta(seconds=args.interval)}")
+    try:
+        manager.run_forever(args.interval)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,11 +6,28 @@ This script checks for necessary dependencies and launches the application.
 
 import sys
 import subprocess
-import importlib
-import pkg_resources
+import importlib.util
 import os
 from pathlib import Path
 
+# Import names of requirements whose package name differs; None means the
+# package is installed as part of another one and has nothing to check
+MODULE_NAMES = {
+    "python-dateutil": "dateutil",
+    "PyQt6-Qt6": None,
+    "PyQt6-sip": None,
+}
+
+def is_installed(package_name):
+    """Check that a package can be imported without actually importing it"""
+    module_name = MODULE_NAMES.get(package_name, package_name)
+    if module_name is None:
+        return True
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
 def check_dependencies():
     """Check if all required packages are installed"""
     required_packages = []
@@ -26,9 +43,7 @@ def check_dependencies():
     
     for package in required_packages:
         package_name = package.split('==')[0]
-        try:
-            importlib.import_module(package_name)
-        except ImportError:
+        if not is_installed(package_name):
             missing_packages.append(package)
     
     if missing_packages:
@@ -65,14 +80,8 @@ def main():
     if not check_dependencies():
         return
     
-    # Download NLTK data
-    try:
-        import nltk
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
-    except Exception as e:
-        print(f"Warning: Could not download NLTK data: {str(e)}")
-        print("Some analysis features may not work correctly.")
+    # NLTK data is resolved from the local bundle (see nltk_resources.py) by the
+    # Processor on first use, in the background after the window is shown
     
     # Start the application
     print("Launching application...")
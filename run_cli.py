@@ -7,7 +7,7 @@ Use this if you encounter issues with PyQt.
 
 import sys
 import subprocess
-import importlib
+import importlib.util
 import os
 import time
 import json
@@ -17,12 +17,9 @@ def check_dependencies(gui_required=False):
     """Check if required packages are installed"""
     # Core dependencies that don't include PyQt
     core_packages = [
-        "beautifulsoup4",
         "requests",
-        "selenium",
         "python-dateutil",
         "lxml",
-        "webdriver-manager",
         "nltk"
     ]
     
@@ -32,10 +29,18 @@ def check_dependencies(gui_required=False):
     
     missing_packages = []
     
+    # Import names of packages whose package name differs
+    module_names = {
+        "python-dateutil": "dateutil"
+    }
+    
     for package in core_packages:
+        # find_spec checks for the package without paying for importing it
         try:
-            importlib.import_module(package)
-        except ImportError:
+            found = importlib.util.find_spec(module_names.get(package, package)) is not None
+        except (ImportError, ValueError):
+            found = False
+        if not found:
             missing_packages.append(package)
     
     if missing_packages:
@@ -65,9 +70,10 @@ def run_cli_scraper():
     from scraper import RedditScraper
     from database import Database
     from processor import Processor
+    from doc_cache import DocumentCache
     
     db = Database()
-    processor = Processor()
+    processor = Processor(cache=DocumentCache())
     
     print("========================================")
     print("Reddit Content Scraper - CLI Mode")
@@ -127,7 +133,7 @@ def run_cli_scraper():
         analyze = input("\nGenerate analysis? (y/n): ").lower() == 'y'
         if analyze:
             print("\nGenerating analysis...")
-            analysis = processor.analyze_results(results)
+            analysis = processor.update_analysis_state(db, keyword)
             report = processor.generate_text_report(analysis, keyword)
             print("\n" + report)
         
@@ -155,14 +161,7 @@ def main():
     if not check_dependencies(gui_required=False):
         return
     
-    # Download NLTK data
-    try:
-        import nltk
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
-    except Exception as e:
-        print(f"Warning: Could not download NLTK data: {str(e)}")
-        print("Some analysis features may not work correctly.")
+    # NLTK data is resolved from the local bundle by the Processor on first use
     
     # Run CLI scraper
     run_cli_scraper()
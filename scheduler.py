@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Keyword monitoring scheduler
+Polls the keywords watched in the Database. Each keyword's interval adapts to its
+observed post velocity (hot topics are polled more often, dormant ones less), due
+keywords are run in order of the new posts expected to be waiting, overlapping runs
+of a keyword are coalesced into one, and all polling stays within a request budget.
+Budget left over is spent polling the busiest keywords ahead of schedule.
+
+    python scheduler.py --add "python" --min-interval 600 --max-interval 43200
+    python scheduler.py --list
+    python scheduler.py --budget 600          # run, at most 600 requests per hour
+"""
+
+import sys
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from logs import get_logger, configure_logging, add_logging_arguments
+from metrics import registry as metrics
+
+log = get_logger("scheduler")
+
+POLLS = metrics.counter("scheduler_polls_total", "Keyword polls run by the scheduler")
+NEW_POSTS = metrics.counter("scheduler_new_posts_total", "New posts stored by keyword polls")
+POLL_SECONDS = metrics.histogram("scheduler_poll_seconds", "Duration of keyword polls")
+
+class KeywordScheduler:
+    """
+    Runs watched keyword searches as they become due.
+    The requests left after fetching every new post's comments are shared out as
+    searches in proportion to the square root of each keyword's post velocity, which
+    minimizes the mean delay before a post is found for a given number of searches;
+    intervals are clamped to the keyword's min/max interval. Requests are drawn from a token
+    bucket holding request_budget requests refilled over budget_period seconds;
+    while the bucket is fuller than spare_threshold, keywords expected to have at
+    least one new post are also run early (but never before their min interval).
+    """
+
+    def __init__(self, db, scraper, request_budget=600, budget_period=3600, max_concurrent=2,
+                 velocity_smoothing=0.3, max_posts=25, spare_threshold=0.5,
+                 skip_duplicate_comments=True, clock=time.time):
+        self.db = db
+        self.scraper = scraper
+        self.request_budget = request_budget
+        self.budget_period = budget_period
+        self.max_concurrent = max_concurrent
+        self.velocity_smoothing = velocity_smoothing
+        self.max_posts = max_posts
+        self.spare_threshold = spare_threshold
+        # Near duplicates of stored posts are saved without spending a comment request
+        self.skip_duplicate_comments = skip_duplicate_comments
+        self.clock = clock
+
+        self.tokens = float(request_budget)
+        self._refilled = clock()
+        self.running = set()
+        # {keyword: (consecutive failed polls, time before which it is not planned)}
+        self.backoff = {}
+        self._lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def estimate_cost(self, keyword):
+        """Expected requests of one poll: the observed average, or a full search if never run"""
+        if keyword['runs']:
+            return max(keyword['cost'], 1.0)
+        # One search page plus a comment request per post
+        return 1.0 + self.max_posts
+
+    def priority(self, keyword, now):
+        """
+        New posts expected to be waiting if the keyword were polled now
+        Each new post costs one comment request whenever it is fetched, so the
+        posts a search page finds are what a poll buys for its fixed cost.
+        """
+        if keyword['last_run'] is None:
+            # Never polled: run before anything else
+            return float('inf')
+        elapsed_hours = max(now - keyword['last_run'], 0) / 3600
+        return min(keyword['velocity'] * elapsed_hours, self.max_posts)
+
+    def next_interval(self, keyword, velocity, velocities):
+        """
+        Seconds until a keyword should be polled again
+        velocity is the keyword's posts per hour and velocities those of every watched keyword
+        """
+        if velocity <= 0:
+            return keyword['max_interval']
+
+        # Every new post costs a comment request; what is left pays for searches
+        budget_per_hour = self.request_budget * 3600 / self.budget_period
+        search_budget = max(budget_per_hour - sum(velocities), 0.1 * budget_per_hour)
+
+        weight_sum = sum(v ** 0.5 for v in velocities if v > 0) or velocity ** 0.5
+        searches_per_hour = search_budget * velocity ** 0.5 / weight_sum
+        interval = 3600 / searches_per_hour
+        return int(min(max(interval, keyword['min_interval']), keyword['max_interval']))
+
+    def plan(self, now=None, slots=None):
+        """
+        Pick the due keywords to run now, highest priority first, reserving their
+        estimated cost from the budget. Keywords that are already running are skipped,
+        so overlapping runs coalesce into the one in progress.
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            self._refill(now)
+
+            keywords = [keyword for keyword in self.db.get_watched_keywords()
+                        if keyword['keyword'] not in self.running
+                        and self.backoff.get(keyword['keyword'], (0, 0))[1] <= now]
+            due = [keyword for keyword in keywords if keyword['next_run'] <= now]
+            due.sort(key=lambda keyword: -self.priority(keyword, now))
+
+            # Spare budget goes to the keywords with the most posts waiting
+            if self.tokens > self.spare_threshold * self.request_budget:
+                early = [keyword for keyword in keywords
+                         if keyword['next_run'] > now and keyword['last_run'] is not None
+                         and now - keyword['last_run'] >= keyword['min_interval']
+                         and self.priority(keyword, now) >= 1]
+                early.sort(key=lambda keyword: -self.priority(keyword, now))
+                due.extend(early)
+
+            selected = []
+            for keyword in due:
+                if slots is not None and len(selected) >= slots:
+                    break
+                estimate = self.estimate_cost(keyword)
+                if estimate > self.tokens:
+                    # A cheaper keyword further down may still fit
+                    continue
+                if keyword['next_run'] > now and self.tokens - estimate < self.spare_threshold * self.request_budget:
+                    # Early runs never eat into the reserve kept for due keywords
+                    continue
+                self.tokens -= estimate
+                self.running.add(keyword['keyword'])
+                selected.append((keyword, estimate))
+            return selected
+
+    def run_pending(self, now=None):
+        """Run every keyword that is due and fits the budget, one after another"""
+        return [self._run(keyword, estimate) for keyword, estimate in self.plan(now)]
+
+    def run_forever(self, poll_seconds=5):
+        """Keep polling due keywords, up to max_concurrent at a time, until stop() is called"""
+        with ThreadPoolExecutor(max_workers=self.max_concurrent) as executor:
+            try:
+                while not self.stop_event.is_set():
+                    slots = self.max_concurrent - len(self.running)
+                    if slots > 0:
+                        for keyword, estimate in self.plan(slots=slots):
+                            future = executor.submit(self._run, keyword, estimate)
+                            future.add_done_callback(
+                                lambda future, name=keyword['keyword']: self._log_failure(name, future))
+                    self.stop_event.wait(poll_seconds)
+            finally:
+                # Running searches stop between posts once this is set
+                self.stop_event.set()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def trigger(self, keyword):
+        """Make a keyword due now; a run already in progress is not repeated"""
+        with self._lock:
+            if keyword in self.running:
+                return False
+        return self.db.reschedule_watched_keyword(keyword, self.clock())
+
+    def _run(self, keyword, estimate):
+        """Poll a planned keyword; it can be planned again once it has been rescheduled"""
+        name = keyword['keyword']
+        try:
+            run = self._poll(keyword, estimate)
+            with self._lock:
+                self.backoff.pop(name, None)
+            return run
+        except Exception:
+            self._back_off(keyword)
+            raise
+        finally:
+            with self._lock:
+                self.running.discard(name)
+
+    def _back_off(self, keyword):
+        """
+        Hold back a keyword whose poll raised before it was rescheduled, for its min
+        interval doubled with every consecutive failure (up to its max interval)
+        """
+        name = keyword['keyword']
+        now = self.clock()
+        with self._lock:
+            failures = self.backoff.get(name, (0, 0))[0] + 1
+            delay = min(keyword['min_interval'] * 2 ** (failures - 1), keyword['max_interval'])
+            self.backoff[name] = (failures, now + delay)
+        try:
+            self.db.reschedule_watched_keyword(name, now + delay)
+        except Exception as e:
+            log.error("poll reschedule failed", keyword=name, error=e)
+
+    def _log_failure(self, name, future):
+        """Done callback of a background poll, so its exception is not lost with the future"""
+        if not future.cancelled() and future.exception() is not None:
+            log.error("poll crashed", keyword=name, error=future.exception())
+
+    def _poll(self, keyword, estimate):
+        """Poll one keyword, store its new posts and reschedule it"""
+        name = keyword['keyword']
+        started = self.clock()
+        stats = None
+        new_posts = 0
+        try:
+            def track(current):
+                nonlocal stats
+                stats = current
+
+            def is_duplicate(post):
+                return self.db.find_near_duplicate(name, post) is not None
+
+            known_urls = self.db.get_known_urls(name)
+            results = self.scraper.search(
+                name, keyword['timeframe'], on_progress=track, should_stop=self.stop_event.is_set,
+                max_posts=self.max_posts, skip_urls=known_urls,
+                is_duplicate=is_duplicate if self.skip_duplicate_comments else None
+            )
+            results = [result for result in results if result.get('url') not in known_urls]
+            if results:
+                self.db.save_results(results, name)
+            new_posts = len(results)
+        except Exception as e:
+            log.error("poll failed", keyword=name, error=e)
+
+        finished = self.clock()
+        requests = stats.requests if stats is not None else 1
+        POLLS.inc()
+        NEW_POSTS.inc(new_posts)
+        POLL_SECONDS.observe(max(finished - started, 0))
+
+        # Return the unused part of the reservation, or take the overrun
+        with self._lock:
+            self.tokens += estimate - requests
+
+        velocity = self._update_velocity(keyword, finished)
+        cost = requests if not keyword['runs'] else (
+            self.velocity_smoothing * requests + (1 - self.velocity_smoothing) * keyword['cost'])
+        velocities = [velocity] + [other['velocity'] for other in self.db.get_watched_keywords()
+                                   if other['keyword'] != name]
+        interval = self.next_interval(keyword, velocity, velocities)
+        # Rescheduling from now means missed polls collapse into this one
+        next_run = finished + interval
+
+        self.db.record_keyword_run(name, started, new_posts, requests, velocity, cost, interval, next_run)
+        return {
+            "keyword": name,
+            "new_posts": new_posts,
+            "requests": requests,
+            "velocity": velocity,
+            "interval": interval,
+            "next_run": next_run
+        }
+
+    def _update_velocity(self, keyword, now):
+        """Smoothed posts per hour, from the stored posts dated since the previous poll"""
+        if keyword['last_run'] is None:
+            # First poll: estimate from the posts of the last day
+            window_start = now - 86400
+        else:
+            window_start = keyword['last_run']
+        window_hours = max(now - window_start, 60) / 3600
+
+        # Counting stored posts also covers posts found by earlier manual searches
+        recent = self.db.count_recent_results(keyword['keyword'], datetime.fromtimestamp(window_start))
+        observed = recent / window_hours
+        if keyword['last_run'] is None:
+            return observed
+        return self.velocity_smoothing * observed + (1 - self.velocity_smoothing) * keyword['velocity']
+
+    def _refill(self, now):
+        """Add the requests earned since the last refill (caller holds the lock)"""
+        elapsed = max(now - self._refilled, 0)
+        self.tokens = min(self.request_budget, self.tokens + elapsed * self.request_budget / self.budget_period)
+        self._refilled = now
+
+def format_keywords(keywords, now=None):
+    """Text table of watched keywords and their polling state"""
+    now = now or time.time()
+    lines = [f"{'Keyword':<24} {'Posts/h':>8} {'Interval':>9} {'Next run':>9} {'Runs':>5} {'Requests':>8}"]
+    for keyword in keywords:
+        due = max(keyword['next_run'] - now, 0)
+        lines.append(
+            f"{keyword['keyword'][:24]:<24} {keyword['velocity']:>8.2f} "
+            f"{str(timedelta(seconds=keyword['interval'])):>9} {str(timedelta(seconds=int(due))):>9} "
+            f"{keyword['runs']:>5} {keyword['requests']:>8}"
+        )
+    return "\n".join(lines)
+
+def get_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Poll watched keywords on an adaptive schedule')
+    parser.add_argument('--add', type=str, metavar='KEYWORD', help='Watch a keyword')
+    parser.add_argument('--remove', type=str, metavar='KEYWORD', help='Stop watching a keyword')
+    parser.add_argument('--list', action='store_true', help='List watched keywords')
+    parser.add_argument('--timeframe', '-t', type=str, choices=['week', 'month', 'year', 'all'], default='week',
+                        help='Search timeframe for --add (default: week)')
+    parser.add_argument('--min-interval', type=int, default=900, help='Shortest polling interval in seconds (default: 900)')
+    parser.add_argument('--max-interval', type=int, default=86400, help='Longest polling interval in seconds (default: 86400)')
+    parser.add_argument('--budget', type=int, default=600, help='Requests allowed per hour (default: 600)')
+    parser.add_argument('--concurrency', type=int, default=2, help='Keywords polled at once (default: 2)')
+    parser.add_argument('--once', action='store_true', help='Run the keywords that are due now, then exit')
+    parser.add_argument('--compact-every', type=int, metavar='SECONDS',
+                        help='Also apply the stored retention policy (see retention.py) every SECONDS')
+    parser.add_argument('--db', type=str, default='scraper_data.db', help='Database file (default: scraper_data.db)')
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = get_args()
+    configure_logging(args.log_level, args.log_format)
+
+    from database import Database
+    db = Database(args.db)
+
+    if args.add or args.remove or args.list:
+        if args.add:
+            db.add_watched_keyword(args.add, args.timeframe, args.min_interval, args.max_interval)
+            print(f"Watching '{args.add}'")
+        if args.remove:
+            if db.remove_watched_keyword(args.remove):
+                print(f"Stopped watching '{args.remove}'")
+            else:
+                print(f"'{args.remove}' was not being watched")
+        if args.list:
+            print(format_keywords(db.get_watched_keywords(enabled_only=False)))
+        return 0
+
+    from scraper import RedditScraper
+    scheduler = KeywordScheduler(db, RedditScraper(), request_budget=args.budget, max_concurrent=args.concurrency)
+
+    if args.once:
+        for run in scheduler.run_pending():
+            print(f"{run['keyword']}: {run['new_posts']} new posts, {run['requests']} requests, "
+                  f"next in {timedelta(seconds=run['interval'])}")
+        return 0
+
+    retention = None
+    if args.compact_every:
+        from processor import Processor
+        from retention import RetentionManager
+        retention = RetentionManager(db, Processor())
+        retention.start(args.compact_every)
+
+    print(f"Monitoring {len(db.get_watched_keywords())} keywords within {args.budget} requests/hour")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        if retention is not None:
+            retention.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
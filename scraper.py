@@ -2,16 +2,38 @@ import requests
 import time
 import random
 from abc import ABC, abstractmethod
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.safari.service import Service as SafariService
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from datetime import datetime, timedelta
 import re
 import urllib.parse
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+from logs import get_logger
+from records import Post, Comment
+from metrics import registry as metrics
+
+log = get_logger("scraper")
+
+HTTP_REQUESTS = metrics.counter("scraper_http_requests_total", "Reddit HTTP requests by endpoint and status code",
+                                ["endpoint", "status"])
+HTTP_BYTES = metrics.counter("scraper_http_bytes_total", "Bytes received from Reddit", ["endpoint"])
+HTTP_RETRIES = metrics.counter("scraper_http_retries_total", "Requests retried after a rate limit (HTTP 429)",
+                               ["endpoint"])
+HTTP_SECONDS = metrics.histogram("scraper_http_request_seconds", "Latency of Reddit HTTP requests", ["endpoint"])
+POSTS_SCRAPED = metrics.counter("scraper_posts_total", "Posts returned by searches")
+COMMENTS_PARSED = metrics.counter("scraper_comments_total", "Comments and replies parsed from threads")
+SEARCH_SECONDS = metrics.histogram("scraper_search_seconds", "Duration of whole searches, comments included")
+CRAWL_SECONDS = metrics.histogram("scraper_crawl_seconds", "Duration of subreddit listing crawls, comments included")
+DUPLICATE_COMMENTS_SKIPPED = metrics.counter("scraper_duplicate_comments_skipped_total",
+                                             "Comment fetches skipped for near duplicates of stored posts")
+
+# Subreddit listings the crawler can follow
+LISTING_SORTS = ("new", "top")
+
+# Where comment trees come from: the JSON API, or the thread's old.reddit HTML page
+COMMENT_SOURCES = ("api", "html")
 
 class Scraper(ABC):
     def __init__(self):
@@ -34,13 +56,86 @@ class Scraper(ABC):
         else:  # Default to all time
             return datetime(2000, 1, 1)
 
-class RedditScraper(Scraper):
+class ScrapeStats:
+    """Counters describing the progress and throughput of one scrape"""
+    
     def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.bytes_received = 0
+        self.pages_fetched = 0
+        self.posts_expected = 0
+        self.posts_processed = 0
+        self.threads_fetched = 0
+        self.comments_parsed = 0
+        self.rate_limited = 0
+        self.results = 0
+    
+    def elapsed(self):
+        return time.monotonic() - self.started
+    
+    def requests_per_second(self):
+        elapsed = self.elapsed()
+        return self.requests / elapsed if elapsed > 0 else 0.0
+    
+    def progress_percent(self):
+        """Share of the listed posts processed so far"""
+        if not self.posts_expected:
+            return 0
+        return min(100, int(self.posts_processed / self.posts_expected * 100))
+    
+    def add(self, other):
+        """Add the counters of another scrape (e.g. one subreddit of a crawl) to these"""
+        for name in ('requests', 'bytes_received', 'pages_fetched', 'posts_expected', 'posts_processed',
+                     'threads_fetched', 'comments_parsed', 'rate_limited', 'results'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+    
+    def describe(self):
+        return (f"{self.pages_fetched} pages, {self.posts_processed}/{self.posts_expected} posts, "
+                f"{self.threads_fetched} threads, "
+                f"{self.comments_parsed} comments, {self.requests_per_second():.1f} req/s")
+
+class RedditScraper(Scraper):
+    def __init__(self, base_url="https://www.reddit.com", max_retries=2, max_retry_wait=10.0,
+                 html_base_url="https://old.reddit.com", html_fallback=True):
         super().__init__()
+        # Where API requests go; stored post URLs always point at reddit.com
+        self.base_url = base_url.rstrip('/')
+        # Thread pages parsed when comments come from HTML, or when the API fails and
+        # html_fallback is set
+        self.html_base_url = html_base_url.rstrip('/')
+        self.html_fallback = html_fallback
+        # Rate-limited (HTTP 429) requests are retried after the server's Retry-After
+        self.max_retries = max_retries
+        self.max_retry_wait = max_retry_wait
         
-    def search(self, keyword, timeframe):
-        print(f"Searching Reddit for '{keyword}' within timeframe: {timeframe}")
+    def search(self, keyword, timeframe, on_result=None, on_progress=None, should_stop=None, max_posts=25,
+               skip_urls=None, comment_source="api", is_duplicate=None):
+        """
+        Search Reddit and return a list of Post records.
+        on_result(result) is called as soon as each post and its comments are ready,
+        on_progress(stats) after every request, and should_stop() is checked between posts.
+        Posts whose URL is in skip_urls are left out without fetching their comments.
+        comment_source is one of COMMENT_SOURCES. is_duplicate(post) is asked before a
+        post's comments are fetched (e.g. Database.find_near_duplicate); posts it holds to
+        be duplicates are returned without comments.
+        """
+        self._check_comment_source(comment_source)
+        log.info("search started", keyword=keyword, timeframe=timeframe, max_posts=max_posts)
+        with SEARCH_SECONDS.time(), profiling.stage("scrape.search"):
+            return self._search(keyword, timeframe, on_result, on_progress, should_stop, max_posts, skip_urls,
+                                comment_source, is_duplicate)
+    
+    def _check_comment_source(self, comment_source):
+        if comment_source not in COMMENT_SOURCES:
+            raise ValueError(f"Unsupported comment source: {comment_source} "
+                             f"(expected one of {', '.join(COMMENT_SOURCES)})")
+    
+    def _search(self, keyword, timeframe, on_result, on_progress, should_stop, max_posts, skip_urls, comment_source,
+                is_duplicate=None):
         date_limit = self.get_date_limit(timeframe)
+        stats = ScrapeStats()
         
         # Use Reddit's JSON API directly (more reliable than scraping)
         try:
@@ -57,21 +152,17 @@ class RedditScraper(Scraper):
                 time_filter = "year"
             
             # Reddit search URL with JSON extension - increased limit to 100 (maximum allowed)
-            search_url = f"https://www.reddit.com/search.json?q={search_query}&sort=relevance&t={time_filter}&limit=100"
+            search_url = f"{self.base_url}/search.json?q={search_query}&sort=relevance&t={time_filter}&limit=100"
             
-            response = requests.get(
-                search_url,
-                headers={
-                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Safari/605.1.15'
-                }
-            )
+            response = self._get(search_url, stats, endpoint="search")
             
             if response.status_code != 200:
-                print(f"Error: Reddit API request failed with status code {response.status_code}")
+                log.warning("search request failed", keyword=keyword, status=response.status_code)
                 return []
             
             # Parse JSON response
-            data = response.json()
+            data = self._parse_json(response)
+            stats.pages_fetched += 1
             
             # Extract posts from response
             posts = []
@@ -79,91 +170,268 @@ class RedditScraper(Scraper):
                 posts = data['data']['children']
             
             if not posts:
-                print("No Reddit posts found")
+                log.info("no posts found", keyword=keyword)
                 return []
             
-            print(f"Found {len(posts)} potential Reddit posts")
+            log.debug("search page fetched", keyword=keyword, posts=len(posts))
             
             # Check if there's another page of results
             after = data['data'].get('after')
             
-            # Get second page if available
-            if after:
-                second_page_url = f"https://www.reddit.com/search.json?q={search_query}&sort=relevance&t={time_filter}&limit=100&after={after}"
+            # Only get the second page if the first one does not fill max_posts
+            if after and len(posts) < max_posts:
+                second_page_url = f"{self.base_url}/search.json?q={search_query}&sort=relevance&t={time_filter}&limit=100&after={after}"
                 try:
-                    response = requests.get(
-                        second_page_url,
-                        headers={
-                            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Safari/605.1.15'
-                        }
-                    )
+                    response = self._get(second_page_url, stats, endpoint="search")
                     
                     if response.status_code == 200:
-                        second_page_data = response.json()
+                        second_page_data = self._parse_json(response)
+                        stats.pages_fetched += 1
                         if 'data' in second_page_data and 'children' in second_page_data['data']:
                             posts.extend(second_page_data['data']['children'])
-                            print(f"Added {len(second_page_data['data']['children'])} more posts from second page")
+                            log.debug("search page fetched", keyword=keyword, page=2,
+                                      posts=len(second_page_data['data']['children']))
                 except Exception as e:
-                    print(f"Error fetching second page: {e}")
+                    log.error("second page failed", keyword=keyword, error=e)
+            
+            posts = posts[:max_posts]
+            stats.posts_expected = len(posts)
+            if on_progress:
+                on_progress(stats)
             
-            # Process each post - increased from 10 to 25 posts
+            # Process each post, handing each one out as soon as it is complete
             results = []
-            for post in posts[:25]:  # Limit to 25 posts
+            for post in posts:
+                if should_stop and should_stop():
+                    break
+                
+                if skip_urls and f"https://www.reddit.com{post['data'].get('permalink')}" in skip_urls:
+                    stats.posts_processed += 1
+                    continue
+                
                 try:
-                    post_data = post['data']
-                    
-                    # Extract basic information
-                    title = post_data.get('title', 'Untitled Post')
-                    url = f"https://www.reddit.com{post_data.get('permalink')}"
-                    subreddit = post_data.get('subreddit_name_prefixed', 'Unknown')
-                    created_utc = post_data.get('created_utc', 0)
-                    
-                    # Convert UTC timestamp to datetime
-                    post_date = datetime.fromtimestamp(created_utc)
-                    
-                    # Skip if the post is too old
-                    if post_date < date_limit:
-                        continue
-                    
-                    # Get post content
-                    selftext = post_data.get('selftext', '')
+                    result = self._build_result(post['data'], date_limit, stats, comment_source, is_duplicate)
+                except Exception as e:
+                    log.error("post failed", keyword=keyword, permalink=post['data'].get('permalink'), error=e)
+                    result = None
+                
+                if result is not None:
+                    results.append(result)
+                    stats.results += 1
+                    POSTS_SCRAPED.inc()
+                    if on_result:
+                        on_result(result)
+                
+                stats.posts_processed += 1
+                if on_progress:
+                    on_progress(stats)
+            
+            log.info("search finished", keyword=keyword, results=len(results), requests=stats.requests,
+                     seconds=round(stats.elapsed(), 3))
+            return results
+            
+        except Exception as e:
+            log.error("search failed", keyword=keyword, error=e)
+            return []
+    
+    def crawl_subreddits(self, subreddits, timeframe, sort="new", on_result=None, on_progress=None,
+                         should_stop=None, max_posts=100, max_workers=4, skip_urls=None, comment_source="api",
+                         is_duplicate=None):
+        """
+        Fetch the posts of several subreddits from their /new or /top listings,
+        up to max_workers subreddits at a time, and return Post records like search().
+        /new is paged through until posts are older than the timeframe; /top uses
+        Reddit's time filter. max_posts applies to each subreddit. on_result and
+        on_progress are called from one thread at a time, with progress summed over
+        all subreddits. is_duplicate is called from the crawling threads.
+        """
+        if sort not in LISTING_SORTS:
+            raise ValueError(f"Unsupported listing: {sort} (expected one of {', '.join(LISTING_SORTS)})")
+        self._check_comment_source(comment_source)
+        
+        names = [name.strip().strip('/').removeprefix('r/') for name in subreddits if name.strip()]
+        log.info("crawl started", subreddits=",".join(names), sort=sort, timeframe=timeframe, max_posts=max_posts)
+        
+        date_limit = self.get_date_limit(timeframe)
+        time_filter = timeframe if timeframe in ("week", "month", "year") else "all"
+        started = time.monotonic()
+        parts = {name: ScrapeStats() for name in names}
+        results = []
+        lock = threading.Lock()
+        
+        def progress():
+            if on_progress:
+                with lock:
+                    total = ScrapeStats()
+                    total.started = started
+                    for part in parts.values():
+                        total.add(part)
+                    on_progress(total)
+        
+        def deliver(result):
+            with lock:
+                results.append(result)
+                if on_result:
+                    on_result(result)
+        
+        with CRAWL_SECONDS.time(), ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [
+                executor.submit(self._crawl_subreddit, name, sort, time_filter, date_limit, max_posts,
+                                skip_urls, should_stop, deliver, progress, parts[name], comment_source, is_duplicate)
+                for name in names
+            ]
+            for future in futures:
+                future.result()
+        
+        log.info("crawl finished", subreddits=len(names), results=len(results),
+                 requests=sum(part.requests for part in parts.values()), seconds=round(time.monotonic() - started, 3))
+        return results
+    
+    def _crawl_subreddit(self, name, sort, time_filter, date_limit, max_posts, skip_urls, should_stop,
+                         deliver, progress, stats, comment_source="api", is_duplicate=None):
+        """Follow one subreddit listing page by page until the date limit or max_posts is reached"""
+        with profiling.stage("scrape.listing"):
+            try:
+                after = None
+                count = 0
+                while count < max_posts:
+                    if should_stop and should_stop():
+                        return
                     
-                    # If post has a link instead of text, add it
-                    post_content = selftext
-                    if not selftext and 'url' in post_data:
-                        post_content = f"Link: {post_data['url']}"
+                    url = f"{self.base_url}/r/{urllib.parse.quote(name)}/{sort}.json?limit=100"
+                    if sort == "top":
+                        url += f"&t={time_filter}"
+                    if after:
+                        url += f"&after={after}"
                     
-                    # Get comments separately
-                    comments = []
-                    try:
-                        permalink = post_data.get('permalink')
-                        if permalink:
-                            comments = self._get_post_comments(permalink)
-                    except Exception as e:
-                        print(f"Error getting comments: {e}")
+                    response = self._get(url, stats, endpoint="listing")
+                    if response.status_code != 200:
+                        log.warning("listing request failed", subreddit=name, status=response.status_code)
+                        return
+                    data = self._parse_json(response).get('data', {})
+                    stats.pages_fetched += 1
                     
-                    # Create result with all data including comments
-                    result = {
-                        "title": title,
-                        "url": url,
-                        "source": "Reddit",
-                        "community": subreddit,
-                        "date": post_date.isoformat(),
-                        "content": post_content,
-                        "comments": comments  # Store comments separately
-                    }
+                    posts = data.get('children', [])
+                    log.debug("listing page fetched", subreddit=name, page=stats.pages_fetched, posts=len(posts))
                     
-                    results.append(result)
+                    reached_limit = False
+                    for post in posts:
+                        if count >= max_posts or (should_stop and should_stop()):
+                            break
+                        post_data = post.get('data', {})
+                        if datetime.fromtimestamp(post_data.get('created_utc', 0)) < date_limit:
+                            # /new is newest first, so the rest are older too; pinned posts are the exception
+                            if sort == "new" and not post_data.get('stickied'):
+                                reached_limit = True
+                                break
+                            continue
+                        
+                        stats.posts_expected += 1
+                        if skip_urls and f"https://www.reddit.com{post_data.get('permalink')}" in skip_urls:
+                            stats.posts_processed += 1
+                            continue
+                        
+                        try:
+                            result = self._build_result(post_data, date_limit, stats, comment_source, is_duplicate)
+                        except Exception as e:
+                            log.error("post failed", subreddit=name, permalink=post_data.get('permalink'), error=e)
+                            result = None
+                        
+                        stats.posts_processed += 1
+                        if result is not None:
+                            count += 1
+                            stats.results += 1
+                            POSTS_SCRAPED.inc()
+                            deliver(result)
+                        progress()
                     
-                except Exception as e:
-                    print(f"Error processing Reddit post: {e}")
-                    continue
+                    after = data.get('after')
+                    if reached_limit or not after or not posts:
+                        return
+            except Exception as e:
+                log.error("crawl failed", subreddit=name, error=e)
+            finally:
+                progress()
+    
+    def _build_result(self, post_data, date_limit, stats=None, comment_source="api", is_duplicate=None):
+        """Build a Post, with its comments, from API post data; None if the post is too old"""
+        # Extract basic information
+        title = post_data.get('title', 'Untitled Post')
+        url = f"https://www.reddit.com{post_data.get('permalink')}"
+        subreddit = post_data.get('subreddit_name_prefixed', 'Unknown')
+        created_utc = post_data.get('created_utc', 0)
+        author = post_data.get('author')
+        
+        # Convert UTC timestamp to datetime
+        post_date = datetime.fromtimestamp(created_utc)
+        
+        # Skip if the post is too old
+        if post_date < date_limit:
+            return None
+        
+        # Get post content
+        selftext = post_data.get('selftext', '')
+        
+        # If post has a link instead of text, add it
+        post_content = selftext
+        if not selftext and 'url' in post_data:
+            post_content = f"Link: {post_data['url']}"
+        
+        post = Post(
+            title=title,
+            url=url,
+            source="Reddit",
+            community=subreddit,
+            date=post_date.isoformat(),
+            content=post_content,
+            author=f"u/{author}" if author else None,
+            score=post_data.get('score')
+        )
+        
+        # Near duplicates of stored posts are not worth their comment request
+        if is_duplicate and is_duplicate(post):
+            DUPLICATE_COMMENTS_SKIPPED.inc()
+            log.debug("comments skipped for duplicate", permalink=post_data.get('permalink'))
+            return post
+        
+        # Get comments separately
+        try:
+            permalink = post_data.get('permalink')
+            if permalink and comment_source == "html":
+                post.comments = self._get_post_content(permalink, stats)["comments"]
+            elif permalink:
+                post.comments = self._get_post_comments(permalink, stats)
+        except Exception as e:
+            log.error("comments failed", permalink=post_data.get('permalink'), error=e)
+        
+        return post
+    
+    def _get(self, url, stats=None, endpoint="other"):
+        """GET a Reddit URL with the scraper's headers, counting it in stats and the metrics"""
+        attempt = 0
+        while True:
+            with HTTP_SECONDS.time(endpoint=endpoint), profiling.stage("scrape.fetch"):
+                response = requests.get(url, headers=self.headers)
+            HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+            HTTP_BYTES.inc(len(response.content), endpoint=endpoint)
+            if stats is not None:
+                stats.requests += 1
+                stats.bytes_received += len(response.content)
             
-            return results
+            if response.status_code != 429 or attempt >= self.max_retries:
+                return response
             
-        except Exception as e:
-            print(f"Error searching Reddit: {e}")
-            return []
+            # Rate limited: wait as long as Reddit asks (or back off), then retry
+            if stats is not None:
+                stats.rate_limited += 1
+            HTTP_RETRIES.inc(endpoint=endpoint)
+            attempt += 1
+            try:
+                wait = float(response.headers.get('Retry-After', 0))
+            except (TypeError, ValueError):
+                wait = 0
+            log.warning("rate limited", url=url, attempt=attempt, retry_after=wait)
+            time.sleep(min(wait or 2 ** attempt, self.max_retry_wait))
     
     def _get_post_content_api(self, post_data):
         """Extract content from Reddit API post data"""
@@ -183,24 +451,28 @@ class RedditScraper(Scraper):
         
         return full_content
     
-    def _get_post_comments(self, permalink):
+    @profiling.profiled("scrape.parse_json")
+    def _parse_json(self, response):
+        return response.json()
+    
+    @profiling.profiled("scrape.comments")
+    def _get_post_comments(self, permalink, stats=None):
         """Get ALL comments for a post using Reddit's JSON API"""
         try:
             # Request JSON data for the post and comments
-            comments_url = f"https://www.reddit.com{permalink}.json?limit=500"  # Increased limit to get more comments
+            comments_url = f"{self.base_url}{permalink}.json?limit=500"  # Increased limit to get more comments
             
-            response = requests.get(
-                comments_url,
-                headers={
-                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Safari/605.1.15'
-                }
-            )
+            response = self._get(comments_url, stats, endpoint="comments")
             
             if response.status_code != 200:
+                if self.html_fallback:
+                    log.warning("comments request failed, using thread page", permalink=permalink,
+                                status=response.status_code)
+                    return self._get_post_content(permalink, stats)["comments"]
                 return []
             
             # Parse JSON
-            data = response.json()
+            data = self._parse_json(response)
             
             # Comments are in the second element of the array
             if len(data) < 2 or 'data' not in data[1] or 'children' not in data[1]['data']:
@@ -218,30 +490,43 @@ class RedditScraper(Scraper):
                     
                     if comment_body and comment_body != "[deleted]" and comment_body != "[removed]":
                         # Create structured comment object
-                        comment = {
-                            "author": f"u/{author}",
-                            "score": score,
-                            "body": comment_body,
-                            "replies": []
-                        }
+                        comment = Comment(f"u/{author}", score, comment_body)
                         
                         # Also get ALL replies to this comment - removed the 3 reply limit
                         if 'replies' in comment_obj['data'] and comment_obj['data']['replies']:
                             try:
                                 # Process all reply levels
-                                self._process_comment_replies(comment_obj['data']['replies'], comment["replies"])
+                                self._process_comment_replies(comment_obj['data']['replies'], comment.replies)
                             except Exception as e:
-                                print(f"Error fetching replies: {e}")
+                                log.error("replies failed", permalink=permalink, error=e)
                         
                         comments.append(comment)
             
-            print(f"Retrieved {len(comments)} comments for post")
+            count = self._count_comments(comments)
+            COMMENTS_PARSED.inc(count)
+            if stats is not None:
+                stats.threads_fetched += 1
+                stats.comments_parsed += count
+            
+            log.debug("comments retrieved", permalink=permalink, top_level=len(comments), total=count)
             return comments
             
         except Exception as e:
-            print(f"Error fetching comments: {e}")
+            log.error("comments failed", permalink=permalink, error=e)
+            if self.html_fallback:
+                return self._get_post_content(permalink, stats)["comments"]
             return []
     
+    def _count_comments(self, comments):
+        """Count comments and replies at every depth"""
+        count = 0
+        stack = list(comments)
+        while stack:
+            comment = stack.pop()
+            count += 1
+            stack.extend(comment.get('replies') or [])
+        return count
+    
     def _process_comment_replies(self, replies_obj, target_list):
         """Process nested comment replies recursively"""
         if not replies_obj or not isinstance(replies_obj, dict):
@@ -259,16 +544,11 @@ class RedditScraper(Scraper):
                 reply_score = reply_obj['data'].get('score', 0)
                 
                 if reply_body and reply_body != "[deleted]" and reply_body != "[removed]":
-                    reply = {
-                        "author": f"u/{reply_author}",
-                        "score": reply_score,
-                        "body": reply_body,
-                        "replies": []
-                    }
+                    reply = Comment(f"u/{reply_author}", reply_score, reply_body)
                     
                     # Process nested replies recursively
                     if 'replies' in reply_obj['data'] and reply_obj['data']['replies']:
-                        self._process_comment_replies(reply_obj['data']['replies'], reply["replies"])
+                        self._process_comment_replies(reply_obj['data']['replies'], reply.replies)
                         
                     target_list.append(reply)
     
@@ -317,78 +597,149 @@ class RedditScraper(Scraper):
         else:
             return now
     
-    def _get_post_content(self, url):
-        """Fallback method to get content using Safari if API fails"""
+    def _get_post_content(self, url, stats=None):
+        """
+        Fallback that gets a post's content and comment tree from the old.reddit HTML
+        page of the thread, for when the JSON API fails; url is a Reddit URL or permalink
+        """
+        path = urllib.parse.urlparse(url).path if '://' in url else url
+        html_url = f"{self.html_base_url}{path}?limit=500"
         try:
-            # Use Safari WebDriver
-            driver = webdriver.Safari()
+            response = self._get(html_url, stats, endpoint="html")
+            if response.status_code != 200:
+                log.warning("thread page request failed", url=html_url, status=response.status_code)
+                return {"content": "Content could not be retrieved", "comments": []}
             
-            driver.get(url)
+            thread = parse_thread_html(response.content)
             
-            # Wait for content to load
-            try:
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.Post, div[data-test-id='post-content']"))
-                )
-                
-                # Get post content (try different selectors)
-                post_content = ""
-                selectors = [
-                    "div[data-test-id='post-content']", 
-                    "div.Post div[data-click-id='text']",
-                    "div.Post div.md"
-                ]
-                
-                for selector in selectors:
-                    post_elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    if post_elements:
-                        post_content = post_elements[0].text
-                        break
-                
-                if not post_content:
-                    post_content = "Content could not be extracted"
-                
-                # Get ALL comments - removed the limit
-                comments = []
-                comment_elements = driver.find_elements(By.CSS_SELECTOR, "div[data-testid='comment'], div.Comment")
-                
-                print(f"Found {len(comment_elements)} comments via Safari WebDriver")
-                
-                for comment_element in comment_elements:
-                    try:
-                        author_element = comment_element.find_element(By.CSS_SELECTOR, "a[data-testid='comment_author']")
-                        author = author_element.text if author_element else "Anonymous"
-                        
-                        # Try to find score
-                        score_element = comment_element.find_element(By.CSS_SELECTOR, "div[data-testid='comment-score']")
-                        score_text = score_element.text if score_element else "0 points"
-                        score = int(re.search(r'\d+', score_text).group()) if re.search(r'\d+', score_text) else 0
-                        
-                        # Find comment text
-                        body_element = comment_element.find_element(By.CSS_SELECTOR, "div[data-testid='comment-content']")
-                        body = body_element.text if body_element else ""
-                        
-                        if body:
-                            comments.append({
-                                "author": author,
-                                "score": score,
-                                "body": body,
-                                "replies": []
-                            })
-                    except Exception as e:
-                        print(f"Error processing comment: {e}")
-                        continue
-                
-                return {
-                    "content": post_content,
-                    "comments": comments
-                }
-            except Exception as e:
-                print(f"Error finding Reddit content elements: {e}")
-                return {"content": "Content could not be retrieved", "comments": []}
+            count = self._count_comments(thread["comments"])
+            COMMENTS_PARSED.inc(count)
+            if stats is not None:
+                stats.threads_fetched += 1
+                stats.comments_parsed += count
+            
+            log.debug("thread page parsed", url=html_url, top_level=len(thread["comments"]), total=count)
+            return thread
             
         except Exception as e:
-            print(f"Error fetching Reddit post content: {e}")
+            log.error("thread page failed", url=html_url, error=e)
             return {"content": "Content could not be retrieved", "comments": []}
-        finally:
-            driver.quit() 
\ No newline at end of file
+
+class _ThreadPage:
+    """Parser and compiled queries for old.reddit thread pages"""
+    
+    def __init__(self):
+        from lxml import etree
+        
+        def has_class(name):
+            return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+        
+        self.parser = etree.HTMLParser(remove_comments=True)
+        self.fromstring = etree.fromstring
+        # Searches of the whole page, for when the listings are not where Reddit puts them
+        self.post = etree.XPath(f"//div[{has_class('linklisting')}]/div[{has_class('thing')}]")
+        self.comment_listing = etree.XPath(f"//div[{has_class('commentarea')}]/div[{has_class('sitetable')}]")
+
+# Built on first use, so lxml is only imported when a thread page is parsed
+_thread_page = None
+
+@profiling.profiled("scrape.parse_html")
+def parse_thread_html(document):
+    """
+    Parse an old.reddit thread page (bytes or str) into {"content", "comments"},
+    with comments in the same nested format the JSON API path produces
+    """
+    global _thread_page
+    if _thread_page is None:
+        _thread_page = _ThreadPage()
+    page = _thread_page
+    if isinstance(document, str):
+        document = document.encode('utf-8')
+    root = page.fromstring(document, page.parser)
+    if root is None:
+        return {"content": "", "comments": []}
+    
+    # body > div.content holds the post listing and the comment area
+    main = _path(root, ("body", None), ("div", "content"))
+    post_listing = _child(main, 'div', 'linklisting') if main is not None else None
+    comment_area = _child(main, 'div', 'commentarea') if main is not None else None
+    
+    content = ""
+    post = _child(post_listing, 'div', 'thing') if post_listing is not None else None
+    if post is None:
+        posts = page.post(root)
+        post = posts[0] if posts else None
+    if post is not None:
+        body = _path(post, ("div", "entry"), ("div", "expando"), ("form", None), ("div", "usertext-body"), ("div", "md"))
+        if body is not None:
+            content = _markdown_text(body)
+        elif post.get('data-url'):
+            # Link posts have no body; self posts without one link to themselves
+            link = post.get('data-url')
+            content = f"Link: {'https://www.reddit.com' + link if link.startswith('/') else link}"
+    
+    comments = []
+    listing = _child(comment_area, 'div', 'sitetable') if comment_area is not None else None
+    listings = [listing] if listing is not None else page.comment_listing(root)
+    # Walk the nested listings without recursion: (listing element, list to fill)
+    stack = [(listings[0], comments)] if listings else []
+    while stack:
+        listing, target = stack.pop()
+        for element in listing:
+            if element.tag != 'div':
+                continue
+            classes = element.get('class', '').split()
+            if 'comment' not in classes or 'thing' not in classes:
+                continue
+            
+            entry = _child(element, 'div', 'entry')
+            if entry is None:
+                continue
+            body = _path(entry, ("form", None), ("div", "usertext-body"), ("div", "md"))
+            text = _markdown_text(body) if body is not None else ""
+            # Like the API path, deleted and removed comments are left out with their replies
+            if not text or text in ("[deleted]", "[removed]"):
+                continue
+            
+            author = element.get('data-author')
+            score = 0
+            tagline = _child(entry, 'p', 'tagline')
+            if tagline is not None:
+                for part in tagline:
+                    part_classes = part.get('class', '').split()
+                    if not author and part.tag == 'a' and 'author' in part_classes:
+                        author = part.text
+                    elif part.tag == 'span' and 'score' in part_classes and 'unvoted' in part_classes:
+                        try:
+                            score = int(part.get('title', 0))
+                        except ValueError:
+                            pass
+            
+            comment = Comment(f"u/{author or 'Anonymous'}", score, text)
+            target.append(comment)
+            replies = _path(element, ("div", "child"), ("div", "sitetable"))
+            if replies is not None:
+                stack.append((replies, comment.replies))
+    
+    return {"content": content, "comments": comments}
+
+def _child(element, tag, cls=None):
+    """First child element with the tag and, if given, the class"""
+    for child in element:
+        if child.tag == tag and (cls is None or cls in child.get('class', '').split()):
+            return child
+    return None
+
+def _path(element, *steps):
+    """Follow (tag, class) steps down through first matching children; None if one is missing"""
+    for tag, cls in steps:
+        element = _child(element, tag, cls)
+        if element is None:
+            return None
+    return element
+
+def _markdown_text(element):
+    """Text of a rendered markdown block, with its paragraphs separated by blank lines"""
+    blocks = ["".join(child.itertext()).strip() for child in element if isinstance(child.tag, str)]
+    blocks = [block for block in blocks if block]
+    return "\n\n".join(blocks) if blocks else "".join(element.itertext()).strip()
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Reddit Scraper - Service Mode
+Keeps a RedditScraper, Processor and Database loaded in one long-running process
+and accepts search, analyze and export jobs over a local HTTP API, so scheduled
+runs only pay for the work itself.
+
+    python service.py --port 8765 --workers 4
+
+    POST   /jobs        {"type": "search", "keyword": "...", "timeframe": "month", "max_posts": 25}
+                        {"type": "analyze", "keyword": "..."}
+                        {"type": "export", "keyword": "...", "format": "json"}
+    GET    /jobs        list recent jobs
+    GET    /jobs/<id>   job status and result; ?wait=<seconds> blocks until it is done
+    DELETE /jobs/<id>   cancel a queued or running job
+    GET    /health      service status
+    GET    /metrics     counters and latency histograms in the Prometheus text format;
+                        ?format=json returns a JSON snapshot
+"""
+
+import json
+import time
+import uuid
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from logs import get_logger, configure_logging, add_logging_arguments
+from records import json_default
+from metrics import registry as metrics
+
+log = get_logger("service")
+
+JOBS_FINISHED = metrics.counter("service_jobs_total", "Finished jobs by type and status", ["type", "status"])
+JOB_SECONDS = metrics.histogram("service_job_seconds", "Time jobs spent running, by type", ["type"])
+QUEUE_WAIT_SECONDS = metrics.histogram("service_queue_wait_seconds", "Time jobs waited in the queue, by type", ["type"])
+
+JOB_TYPES = ("search", "analyze", "export")
+
+# Default number of jobs of each type allowed to run at once; analysis updates
+# the persisted per-term state, so it runs one job at a time
+DEFAULT_TYPE_LIMITS = {"search": 2, "analyze": 1, "export": 2}
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its limit"""
+    pass
+
+class Job:
+    """One queued unit of work and its outcome"""
+
+    def __init__(self, job_type, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.type = job_type
+        self.params = params
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+        self.cancel_event = threading.Event()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def to_dict(self, include_result=True):
+        data = {
+            "id": self.id,
+            "type": self.type,
+            "params": self.params,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "queue_seconds": (self.started or time.time()) - self.created,
+            "run_seconds": ((self.finished or time.time()) - self.started) if self.started else None,
+            "error": self.error
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+class JobQueue:
+    """
+    Bounded job queue served by a fixed number of worker threads.
+    At most `workers` jobs run at once and at most type_limits[type] of each type;
+    a job whose type is at its limit waits while later jobs of other types run.
+    """
+
+    def __init__(self, handler, workers=4, max_queued=100, type_limits=None, keep_finished=500):
+        self.handler = handler
+        self.max_queued = max_queued
+        self.type_limits = dict(DEFAULT_TYPE_LIMITS, **(type_limits or {}))
+        self.keep_finished = keep_finished
+
+        self.jobs = {}
+        self.pending = deque()
+        self.finished = deque()
+        self.running = {job_type: 0 for job_type in JOB_TYPES}
+        self.condition = threading.Condition()
+        self.stopping = False
+
+        self.threads = [threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, job_type, params):
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        with self.condition:
+            if len(self.pending) >= self.max_queued:
+                raise QueueFull(f"Job queue is full ({self.max_queued} jobs waiting)")
+            job = Job(job_type, params)
+            self.jobs[job.id] = job
+            self.pending.append(job)
+            self.condition.notify_all()
+        return job
+
+    def get(self, job_id):
+        with self.condition:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.condition:
+            return sorted(self.jobs.values(), key=lambda job: job.created)
+
+    def cancel(self, job_id):
+        """Cancel a job; queued jobs are dropped, running jobs stop at their next check"""
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            job.cancel_event.set()
+            if job.status == "queued":
+                self.pending.remove(job)
+                self._finish(job, "cancelled")
+            return job
+
+    def counts(self):
+        with self.condition:
+            counts = {"queued": len(self.pending), "running": sum(self.running.values())}
+            counts["running_by_type"] = dict(self.running)
+            return counts
+
+    def shutdown(self, timeout=5.0):
+        with self.condition:
+            self.stopping = True
+            for job in list(self.pending):
+                job.cancel_event.set()
+                self._finish(job, "cancelled")
+            self.pending.clear()
+            for job in self.jobs.values():
+                job.cancel_event.set()
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def _next_job(self):
+        """First pending job whose type is below its limit (caller holds the lock)"""
+        for job in self.pending:
+            if self.running[job.type] < self.type_limits.get(job.type, 1):
+                self.pending.remove(job)
+                return job
+        return None
+
+    def _work(self):
+        while True:
+            with self.condition:
+                job = None
+                while not self.stopping:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self.condition.wait()
+                if job is None:
+                    return
+                self.running[job.type] += 1
+                job.status = "running"
+                job.started = time.time()
+                QUEUE_WAIT_SECONDS.observe(job.started - job.created, type=job.type)
+
+            status = "done"
+            try:
+                job.result = self.handler(job)
+                if job.is_cancelled():
+                    status = "cancelled"
+            except Exception as e:
+                job.error = str(e)
+                status = "cancelled" if job.is_cancelled() else "failed"
+                if status == "failed":
+                    log.error("job failed", job=job.id, type=job.type, error=e)
+
+            with self.condition:
+                self.running[job.type] -= 1
+                self._finish(job, status)
+                self.condition.notify_all()
+
+    def _finish(self, job, status):
+        """Record a job outcome and forget the oldest finished jobs (caller holds the lock)"""
+        job.status = status
+        job.finished = time.time()
+        job.done.set()
+        JOBS_FINISHED.inc(type=job.type, status=status)
+        if job.started is not None:
+            JOB_SECONDS.observe(job.finished - job.started, type=job.type)
+
+        self.finished.append(job.id)
+        while len(self.finished) > self.keep_finished:
+            self.jobs.pop(self.finished.popleft(), None)
+
+class ScraperService:
+    """Warm scraper, processor and database shared by every job"""
+
+    def __init__(self, db_path="scraper_data.db", cache_path="analysis_cache.db",
+                 workers=4, max_queued=100, type_limits=None, monitor_budget=None, compact_interval=None):
+        from scraper import RedditScraper
+        from database import Database
+        from processor import Processor
+        from doc_cache import DocumentCache
+
+        self.db = Database(db_path)
+        self.processor = Processor(cache=DocumentCache(cache_path))
+        self.scraper = RedditScraper()
+        self.started = time.time()
+        self.warm = threading.Event()
+
+        self.queue = JobQueue(self.run_job, workers=workers, max_queued=max_queued, type_limits=type_limits)
+
+        # Models load in the background; jobs that arrive first load them on demand
+        threading.Thread(target=self._warm_up, name="warm-up", daemon=True).start()
+        
+        # Optionally poll the watched keywords with the same warm components
+        self.scheduler = None
+        if monitor_budget:
+            from scheduler import KeywordScheduler
+            self.scheduler = KeywordScheduler(self.db, self.scraper, request_budget=monitor_budget)
+            threading.Thread(target=self.scheduler.run_forever, name="monitor", daemon=True).start()
+
+        # Optionally apply the stored retention policy in the background (see retention.py)
+        self.retention = None
+        if compact_interval:
+            from retention import RetentionManager
+            self.retention = RetentionManager(self.db, self.processor)
+            self.retention.start(compact_interval)
+
+    def _warm_up(self):
+        try:
+            self.processor.warm_up()
+        finally:
+            self.warm.set()
+
+    def run_job(self, job):
+        """Dispatch a job to its handler and return a JSON-serializable result"""
+        params = job.params
+        keyword = (params.get("keyword") or "").strip()
+        if not keyword:
+            raise ValueError("A keyword is required")
+
+        if job.type == "search":
+            return self.search(job, keyword, params.get("timeframe", "month"), int(params.get("max_posts", 25)))
+        elif job.type == "analyze":
+            return self.analyze(keyword, bool(params.get("report", True)))
+        return self.export(keyword, params.get("format", "json"))
+
+    def search(self, job, keyword, timeframe, max_posts):
+        results = self.scraper.search(keyword, timeframe, should_stop=job.is_cancelled, max_posts=max_posts)
+        if results:
+            self.db.save_results(results, keyword)
+        self.db.save_search(keyword, timeframe)
+
+        return {
+            "count": len(results),
+            "results": [{
+                "title": result.get("title", "Untitled"),
+                "url": result.get("url", ""),
+                "community": result.get("community", ""),
+                "date": result.get("date", "")
+            } for result in results]
+        }
+
+    def analyze(self, keyword, include_report=True):
+        analysis = self.processor.update_analysis_state(self.db, keyword)
+        result = {"analysis": analysis}
+        if include_report:
+            result["report"] = self.processor.generate_text_report(analysis, keyword)
+        return result
+
+    def export(self, keyword, export_format):
+        if export_format == "json":
+            output_path = self.db.export_results_to_json(keyword)
+        elif export_format == "csv":
+            output_path = self.db.export_results_to_csv(keyword)
+        else:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        return {"path": output_path}
+
+    def health(self):
+        return {
+            "status": "ok",
+            "uptime_seconds": time.time() - self.started,
+            "warm": self.warm.is_set(),
+            "monitoring": self.scheduler is not None,
+            "compacting": self.retention is not None,
+            "jobs": self.queue.counts()
+        }
+
+    def shutdown(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        if self.retention is not None:
+            self.retention.stop()
+        self.queue.shutdown()
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over the ScraperService attached to the server"""
+
+    # Upper bound for ?wait= long polling
+    MAX_WAIT_SECONDS = 300
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+
+        if parts == ["health"]:
+            return self._send(200, self.service.health())
+        if parts == ["metrics"]:
+            if parse_qs(url.query).get("format", [""])[0] == "json":
+                return self._send(200, metrics.snapshot())
+            return self._send_text(200, metrics.to_prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+        if parts == ["jobs"]:
+            return self._send(200, {"jobs": [job.to_dict(include_result=False) for job in self.service.queue.list()]})
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.service.queue.get(parts[1])
+            if job is None:
+                return self._send(404, {"error": "Job not found"})
+
+            query = parse_qs(url.query)
+            try:
+                wait = min(float(query.get("wait", ["0"])[0]), self.MAX_WAIT_SECONDS)
+            except ValueError:
+                return self._send(400, {"error": "wait must be a number of seconds"})
+            if wait > 0:
+                job.done.wait(wait)
+            return self._send(200, job.to_dict())
+
+        self._send(404, {"error": "Not found"})
+
+    def do_POST(self):
+        parts = [part for part in urlparse(self.path).path.split("/") if part]
+        if parts != ["jobs"]:
+            return self._send(404, {"error": "Not found"})
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("Request body must be a JSON object")
+            job_type = body.pop("type", None)
+            job = self.service.queue.submit(job_type, body)
+        except QueueFull as e:
+            return self._send(429, {"error": str(e)})
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+
+        self._send(202, job.to_dict(include_result=False))
+
+    def do_DELETE(self):
+        parts = [part for part in urlparse(self.path).path.split("/") if part]
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._send(404, {"error": "Not found"})
+
+        job = self.service.queue.cancel(parts[1])
+        if job is None:
+            return self._send(404, {"error": "Job not found"})
+        self._send(200, job.to_dict(include_result=False))
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=json_default)
+        self._send_text(status, body, "application/json; charset=utf-8")
+
+    def _send_text(self, status, text, content_type):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+def create_server(service, host="127.0.0.1", port=8765, quiet=False):
+    """HTTP server for a service; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
+
+def get_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Run the scraper as a local job service')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', '-p', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--workers', '-w', type=int, default=4, help='Jobs running at once (default: 4)')
+    parser.add_argument('--max-queued', type=int, default=100, help='Jobs allowed to wait in the queue (default: 100)')
+    parser.add_argument('--max-searches', type=int, default=DEFAULT_TYPE_LIMITS["search"],
+                        help=f'Searches running at once (default: {DEFAULT_TYPE_LIMITS["search"]})')
+    parser.add_argument('--db', type=str, default='scraper_data.db', help='Database file (default: scraper_data.db)')
+    parser.add_argument('--monitor', type=int, metavar='BUDGET',
+                        help='Also poll the watched keywords (see scheduler.py), within BUDGET requests per hour')
+    parser.add_argument('--compact-every', type=int, metavar='SECONDS',
+                        help='Also apply the stored retention policy (see retention.py) every SECONDS')
+    parser.add_argument('--quiet', '-q', action='store_true', help='Do not log every request')
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = get_args()
+    configure_logging(args.log_level, args.log_format)
+
+    service = ScraperService(
+        db_path=args.db, workers=args.workers, max_queued=args.max_queued,
+        type_limits={"search": args.max_searches}, monitor_budget=args.monitor,
+        compact_interval=args.compact_every
+    )
+    server = create_server(service, args.host, args.port, quiet=args.quiet)
+    print(f"Scraper service listening on http://{args.host}:{server.server_address[1]}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+        service.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import time
+import numpy as np
+
+class Summarizer:
+    """
+    Extractive summarizer over pre-tokenized sentences.
+    Every sentence is encoded once into integer token IDs and scored with array
+    operations, so large result sets can be summarized within a time budget.
+    """
+
+    METHODS = ("frequency", "tfidf", "textrank")
+
+    def __init__(self, method="frequency", time_budget=2.0, dedupe=True,
+                 similarity_threshold=0.8, max_candidates=2000, max_term_sentences=50):
+        if method not in self.METHODS:
+            raise ValueError(f"Unsupported summary method: {method}")
+
+        self.method = method
+        self.time_budget = time_budget
+        self.dedupe = dedupe
+        # Sentences sharing at least this fraction of their terms count as near-identical
+        self.similarity_threshold = similarity_threshold
+        # TextRank only ranks the best TF-IDF candidates to keep the graph bounded
+        self.max_candidates = max_candidates
+        # Terms shared by more candidate sentences than this add no edges to the graph
+        self.max_term_sentences = max_term_sentences
+
+    def summarize(self, sentences, max_sentences=10, word_frequencies=None):
+        """
+        Summarize a list of (text, tokens) pairs
+        word_frequencies optionally supplies precomputed term counts for frequency scoring
+        """
+        deadline = time.monotonic() + self.time_budget
+
+        # If there are very few sentences, return them directly
+        if len(sentences) <= max_sentences:
+            return " ".join(text for text, tokens in sentences)
+
+        texts, token_ids, sentence_index, vocab = self._encode(sentences)
+        if not texts:
+            return ""
+
+        # Score sentences, falling back to cheaper methods when the budget runs out
+        if self.method == "frequency":
+            scores = self._frequency_scores(token_ids, sentence_index, vocab, len(texts), word_frequencies)
+        else:
+            scores = self._tfidf_scores(token_ids, sentence_index, len(vocab), len(texts))
+            if self.method == "textrank" and time.monotonic() < deadline:
+                scores = self._textrank_scores(scores, token_ids, sentence_index, deadline)
+
+        selected = self._select(scores, token_ids, sentence_index, max_sentences)
+        return " ".join(texts[i] for i in selected)
+
+    def _encode(self, sentences):
+        """
+        Map tokens to integer IDs once and flatten them into parallel arrays
+        Empty and (optionally) duplicate sentences are dropped here
+        """
+        vocab = {}
+        texts = []
+        flat_ids = []
+        flat_sentences = []
+        seen = set()
+
+        for text, tokens in sentences:
+            if not text.strip() or not tokens:
+                continue
+
+            ids = [vocab.setdefault(token, len(vocab)) for token in tokens]
+
+            if self.dedupe:
+                # Sentences with the same terms differ only in stopwords, punctuation or order
+                key = frozenset(ids)
+                if key in seen:
+                    continue
+                seen.add(key)
+
+            flat_ids.extend(ids)
+            flat_sentences.extend([len(texts)] * len(ids))
+            texts.append(text)
+
+        token_ids = np.array(flat_ids, dtype=np.int64)
+        sentence_index = np.array(flat_sentences, dtype=np.int64)
+        return texts, token_ids, sentence_index, vocab
+
+    def _frequency_scores(self, token_ids, sentence_index, vocab, sentence_count, word_frequencies):
+        """Score each sentence by the summed corpus frequency of its tokens"""
+        if word_frequencies is not None:
+            weights = np.zeros(len(vocab), dtype=np.float64)
+            for token, token_id in vocab.items():
+                weights[token_id] = word_frequencies.get(token, 0)
+        else:
+            weights = np.bincount(token_ids, minlength=len(vocab)).astype(np.float64)
+
+        return np.bincount(sentence_index, weights=weights[token_ids], minlength=sentence_count)
+
+    def _tfidf_scores(self, token_ids, sentence_index, vocab_size, sentence_count):
+        """Score each sentence by its TF-IDF mass, normalized for sentence length"""
+        # Unique (sentence, term) pairs with their in-sentence counts
+        pairs, term_counts = np.unique(sentence_index * vocab_size + token_ids, return_counts=True)
+        pair_sentences = pairs // vocab_size
+        pair_terms = pairs % vocab_size
+
+        document_frequency = np.bincount(pair_terms, minlength=vocab_size)
+        idf = np.log(sentence_count / document_frequency) + 1.0
+
+        weights = np.log1p(term_counts) * idf[pair_terms]
+        lengths = np.bincount(sentence_index, minlength=sentence_count)
+        scores = np.bincount(pair_sentences, weights=weights, minlength=sentence_count)
+        return scores / np.sqrt(np.maximum(lengths, 1))
+
+    def _textrank_scores(self, tfidf_scores, token_ids, sentence_index, deadline,
+                         damping=0.85, tolerance=1e-6, max_iterations=100):
+        """
+        Rank the best TF-IDF candidates with TextRank over a sparse term-overlap graph
+        Sentences outside the candidate set keep a score below every candidate
+        """
+        candidate_count = min(self.max_candidates, len(tfidf_scores))
+        candidates = np.argsort(-tfidf_scores, kind="stable")[:candidate_count]
+
+        # Re-index candidate sentences to 0..candidate_count-1
+        position = np.full(len(tfidf_scores), -1, dtype=np.int64)
+        position[candidates] = np.arange(candidate_count)
+        mask = position[sentence_index] >= 0
+        nodes = position[sentence_index[mask]]
+        terms = token_ids[mask]
+
+        lengths = np.bincount(nodes, minlength=candidate_count)
+
+        # Group the unique (term, node) pairs by term to find sentences sharing a term
+        term_nodes = np.unique(np.stack([terms, nodes], axis=1), axis=0)
+        boundaries = np.flatnonzero(np.diff(term_nodes[:, 0])) + 1
+        sources = []
+        targets = []
+        for group in np.split(term_nodes[:, 1], boundaries):
+            if len(group) < 2 or len(group) > self.max_term_sentences:
+                continue
+            i, j = np.triu_indices(len(group), k=1)
+            sources.append(group[i])
+            targets.append(group[j])
+
+            if time.monotonic() > deadline:
+                return tfidf_scores
+
+        if not sources:
+            return tfidf_scores
+
+        # Overlap counts per sentence pair, then the TextRank similarity
+        edge_keys, overlaps = np.unique(
+            np.concatenate(sources) * candidate_count + np.concatenate(targets),
+            return_counts=True
+        )
+        edge_sources = edge_keys // candidate_count
+        edge_targets = edge_keys % candidate_count
+        similarity = overlaps / (np.log1p(lengths[edge_sources]) + np.log1p(lengths[edge_targets]))
+
+        # Make the graph symmetric
+        edge_sources, edge_targets = (np.concatenate([edge_sources, edge_targets]),
+                                      np.concatenate([edge_targets, edge_sources]))
+        similarity = np.concatenate([similarity, similarity])
+        out_weight = np.bincount(edge_sources, weights=similarity, minlength=candidate_count)
+        transition = similarity / out_weight[edge_sources]
+
+        # Power iteration until convergence or the time budget is spent
+        rank = np.full(candidate_count, 1.0 / candidate_count)
+        for _ in range(max_iterations):
+            new_rank = (1 - damping) / candidate_count + damping * np.bincount(
+                edge_targets, weights=transition * rank[edge_sources], minlength=candidate_count
+            )
+            converged = np.abs(new_rank - rank).sum() < tolerance
+            rank = new_rank
+            if converged or time.monotonic() > deadline:
+                break
+
+        # Candidates are ordered by rank; the rest follow in TF-IDF order, scaled to
+        # at most half the lowest rank so they are only picked once candidates run out
+        scores = tfidf_scores.astype(np.float64)
+        rest = position < 0
+        if rest.any():
+            top = scores[rest].max()
+            if top > 0:
+                scores[rest] *= 0.5 * rank.min() / top
+        scores[candidates] = rank
+        return scores
+
+    def _select(self, scores, token_ids, sentence_index, max_sentences):
+        """Pick the highest scoring sentences, skipping near-duplicates of earlier picks"""
+        order = np.argsort(-scores, kind="stable")
+
+        # Token sets are only materialized for sentences that are actually considered
+        offsets = np.searchsorted(sentence_index, np.arange(len(scores) + 1))
+
+        selected = []
+        selected_terms = []
+        for i in order:
+            if len(selected) >= max_sentences or scores[i] <= 0:
+                break
+
+            terms = set(token_ids[offsets[i]:offsets[i + 1]].tolist())
+            if self.dedupe and any(
+                len(terms & other) / len(terms | other) >= self.similarity_threshold
+                for other in selected_terms
+            ):
+                continue
+
+            selected.append(i)
+            selected_terms.append(terms)
+
+        return selected
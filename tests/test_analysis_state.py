@@ -0,0 +1,68 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from database import Database
+from processor import Processor
+
+WORDS = ("great product bad battery slow screen awesome camera terrible support love design "
+         "price update broken fast").split()
+
+
+def make_post(i, rng, days_ago=0):
+    return {
+        'title': f'Post {i} about phones',
+        'url': f'https://www.reddit.com/r/phones/comments/{i}/',
+        'source': 'Reddit',
+        'community': f'r/community{i % 3}',
+        'date': (datetime.now() - timedelta(days=days_ago)).isoformat(),
+        'content': '. '.join(' '.join(rng.choice(WORDS) for _ in range(8)) + f' topic{i}' for _ in range(3)),
+        'author': f'u/p{i}',
+        'score': i,
+        'comments': [],
+    }
+
+
+class AnalysisStateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.directory, 'test.db'))
+        self.processor = Processor()
+        self.rng = random.Random(1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertMatchesFullAnalysis(self, state):
+        full = self.processor.analyze_results(list(self.db.iter_results(search_term='phones')))
+        for field in ('total_results', 'sources', 'sentiment', 'common_words', 'communities'):
+            self.assertEqual(state[field], full[field], field)
+
+    def test_incremental_state_matches_full_analysis(self):
+        self.db.save_results([make_post(i, self.rng, days_ago=i) for i in range(30)], 'phones')
+        self.assertMatchesFullAnalysis(self.processor.update_analysis_state(self.db, 'phones'))
+
+        # Posts added since the last update are folded in
+        self.db.save_results([make_post(i, self.rng) for i in range(30, 45)], 'phones')
+        state = self.processor.update_analysis_state(self.db, 'phones')
+        self.assertEqual(state['total_results'], 45)
+        self.assertMatchesFullAnalysis(state)
+
+        # Posts removed from the database are subtracted
+        cutoff = (datetime.now() - timedelta(days=19)).strftime('%Y-%m-%d')
+        self.assertEqual(self.db.expire_results('phones', cutoff), 10)
+        state = self.processor.update_analysis_state(self.db, 'phones')
+        self.assertEqual(state['total_results'], 35)
+        self.assertMatchesFullAnalysis(state)
+
+    def test_repeated_update_changes_nothing(self):
+        self.db.save_results([make_post(i, self.rng) for i in range(10)], 'phones')
+        first = self.processor.update_analysis_state(self.db, 'phones')
+        self.assertEqual(self.processor.update_analysis_state(self.db, 'phones'), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from database import Database
+
+
+def make_post(i, url=None):
+    return {
+        'title': f'Post {i}',
+        'url': url or f'https://www.reddit.com/r/test/comments/{i}/',
+        'source': 'Reddit',
+        'community': 'r/test',
+        'date': '2024-01-01T00:00:00',
+        'content': ' '.join(f'word{i}x{j}' for j in range(40)),
+        'author': f'u/p{i % 2}',
+        'score': 5,
+        'comments': [{'author': 'u/b', 'score': 1, 'body': f'reply {i}', 'replies': []}],
+    }
+
+
+class AuthorIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.directory, 'test.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def top_authors(self):
+        return {row['author']: (row['posts'], row['comments'], row['duplicate_posts'])
+                for row in self.db.get_top_authors(search_term='test')}
+
+    def test_saving_the_same_batch_twice_leaves_authors_unchanged(self):
+        batch = [make_post(i) for i in range(20)]
+        self.db.save_results(batch, 'test')
+        before = self.top_authors()
+        self.assertEqual(before, {'u/b': (0, 20, 0), 'u/p0': (10, 0, 0), 'u/p1': (10, 0, 0)})
+
+        self.db.save_results(batch, 'test')
+        self.assertEqual(self.top_authors(), before)
+
+        self.db.rebuild_author_index()
+        self.assertEqual(self.top_authors(), before)
+
+    def test_cross_posts_under_another_url_still_count(self):
+        self.db.save_results([make_post(0)], 'test')
+        self.db.save_results([make_post(0, url='https://www.reddit.com/r/other/comments/0/')], 'test')
+        expected = {'u/b': (0, 2, 0), 'u/p0': (2, 0, 1)}
+        self.assertEqual(self.top_authors(), expected)
+
+        self.db.rebuild_author_index()
+        self.assertEqual(self.top_authors(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from compression import StorageCodec
+from database import Database
+
+try:
+    import zstandard  # noqa: F401
+    CODECS = ("none", "zlib", "zstd")
+except ImportError:
+    CODECS = ("none", "zlib")
+
+
+def make_post(i):
+    body = f"comment {i} " + "this thread keeps repeating the same opinion about batteries " * 4
+    return {
+        'title': f'Post {i}',
+        'url': f'https://www.reddit.com/r/test/comments/{i}/',
+        'source': 'Reddit',
+        'community': 'r/test',
+        'date': '2024-01-01T00:00:00',
+        'content': f"post {i} " + "a long self text that compresses well, over and over again. " * 10,
+        'comments': [{'author': 'u/a', 'score': 1, 'body': body, 'replies': [
+            {'author': 'u/b', 'score': 2, 'body': 'short', 'replies': []}]}],
+    }
+
+
+class StorageCodecTest(unittest.TestCase):
+    def test_round_trip(self):
+        text = "some text that is long enough to be compressed by the codec " * 5
+        for name in CODECS:
+            codec = StorageCodec(name)
+            for value in (text, "short", "", None):
+                self.assertEqual(codec.decode(codec.encode(value)), value, name)
+
+    def test_short_values_stay_text(self):
+        self.assertEqual(StorageCodec("zlib").encode("short"), "short")
+
+
+class CompressedDatabaseTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.directory, 'test.db'), compression="none")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertStoredPosts(self, posts):
+        stored = {result['url']: result for result in self.db.get_results('test', limit=1000)}
+        self.assertEqual(len(stored), len(posts))
+        for post in posts:
+            result = stored[post['url']]
+            self.assertEqual(result['content'], post['content'])
+            self.assertEqual(result['comments'], post['comments'])
+            top = self.db.get_comment_children(result['id'])
+            self.assertEqual([comment['body'] for comment in top], [post['comments'][0]['body']])
+            replies = self.db.get_comment_children(result['id'], top[0]['id'])
+            self.assertEqual([comment['body'] for comment in replies], ['short'])
+
+    def test_rows_of_every_codec_read_side_by_side(self):
+        posts = []
+        for index, name in enumerate(CODECS):
+            self.db.set_storage_codec(name)
+            batch = [make_post(index * 10 + i) for i in range(5)]
+            self.db.save_results(batch, 'test')
+            posts.extend(batch)
+        self.assertStoredPosts(posts)
+
+        stats = self.db.storage_stats()
+        self.assertEqual(stats['compressed_rows'], 5 * (len(CODECS) - 1))
+        self.assertEqual(stats['compressed_comment_rows'], 5 * (len(CODECS) - 1))
+
+        # Migrating every row to one codec and back keeps the text
+        for name in reversed(CODECS):
+            self.db.set_storage_codec(name)
+            self.db.recompress_results()
+            self.assertStoredPosts(posts)
+        self.assertEqual(self.db.storage_stats()['compressed_rows'], 0)
+        self.assertEqual(self.db.storage_stats()['compressed_comment_rows'], 0)
+
+    @unittest.skipUnless("zstd" in CODECS, "zstandard is not installed")
+    def test_trained_dictionary(self):
+        posts = [make_post(i) for i in range(60)]
+        self.db.save_results(posts, 'test')
+        self.assertIsNotNone(self.db.train_compression_dictionary(size=4096))
+        self.db.set_storage_codec("zstd")
+        self.db.recompress_results()
+        self.assertStoredPosts(posts)
+
+        # A fresh Database on the same file finds the dictionary
+        self.db = Database(self.db.db_path)
+        self.assertStoredPosts(posts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from database import Database
+from dedup import MinHasher
+
+TEXT = ("the new firmware update finally fixed the battery drain on my phone and the camera "
+        "app opens twice as fast as before, really happy with this release")
+OTHER = ("looking for a budget mechanical keyboard with hot swappable switches and a "
+         "compact layout that still has arrow keys for programming work")
+
+
+def make_post(i, content=TEXT):
+    return {
+        'title': 'Firmware update',
+        'url': f'https://www.reddit.com/r/test/comments/{i}/',
+        'source': 'Reddit',
+        'community': 'r/test',
+        'date': '2024-01-01T00:00:00',
+        'content': content,
+        'comments': [],
+    }
+
+
+class MinHasherTest(unittest.TestCase):
+    def test_similarity(self):
+        hasher = MinHasher()
+        signature = hasher.signature(TEXT)
+        self.assertEqual(hasher.similarity(signature, hasher.signature(TEXT)), 1.0)
+        self.assertGreater(hasher.similarity(signature, hasher.signature(TEXT + " edit: typo")), 0.7)
+        self.assertLess(hasher.similarity(signature, hasher.signature(OTHER)), 0.3)
+        self.assertEqual(hasher.band_keys(signature), hasher.band_keys(hasher.signature(TEXT)))
+
+    def test_short_texts_have_no_signature(self):
+        self.assertIsNone(MinHasher().signature("too short"))
+
+
+class NearDuplicateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def database(self, dedup):
+        return Database(os.path.join(self.directory, f'{dedup}.db'), dedup=dedup)
+
+    def duplicate_of(self, db):
+        with sqlite3.connect(db.db_path) as conn:
+            return dict(conn.execute("SELECT id, duplicate_of FROM results"))
+
+    def test_flag(self):
+        db = self.database("flag")
+        first, = db.save_results([make_post(1)], 'test')
+        second, third, unrelated = db.save_results(
+            [make_post(2), make_post(3, TEXT + " edit: typo"), make_post(4, OTHER)], 'test')
+
+        self.assertEqual(self.duplicate_of(db),
+                         {first: None, second: first, third: first, unrelated: None})
+        # Flagged posts are stored but left out of the analysis
+        self.assertEqual(db.count_results('test'), 4)
+        self.assertEqual(sorted(result['id'] for result in db.get_unanalyzed_results('test')),
+                         [first, unrelated])
+        # Another search term has its own posts
+        other, = db.save_results([make_post(5)], 'other')
+        self.assertIsNone(self.duplicate_of(db)[other])
+
+    def test_collapse(self):
+        db = self.database("collapse")
+        first, = db.save_results([make_post(1)], 'test')
+        ids = db.save_results([make_post(2), make_post(3, OTHER)], 'test')
+
+        self.assertEqual(ids[0], first)
+        self.assertNotEqual(ids[1], first)
+        self.assertEqual(db.count_results('test'), 2)
+
+    def test_off(self):
+        db = self.database("off")
+        db.save_results([make_post(1), make_post(2)], 'test')
+        self.assertEqual(list(self.duplicate_of(db).values()), [None, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from database import Database
+from processor import Processor
+from retention import RetentionManager
+from trends import TrendAnalyzer
+
+
+def make_post(i, days_ago):
+    return {
+        'title': f'Post {i}',
+        'url': f'https://www.reddit.com/r/test/comments/{i}/',
+        'source': 'Reddit',
+        'community': 'r/test',
+        'date': (datetime.now() - timedelta(days=days_ago)).isoformat(),
+        'content': f'great phone number{i} ' + ' '.join(f'word{i}x{j}' for j in range(20)),
+        'comments': [{'author': 'u/a', 'score': 1, 'body': 'nice', 'replies': []}],
+    }
+
+
+class RetentionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.directory, 'test.db'))
+        self.db.set_retention_policy(comment_days=7, post_days=30)
+        self.processor = Processor()
+        self.retention = RetentionManager(self.db, self.processor)
+        self.trends = TrendAnalyzer(self.db, self.processor)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def daily_counts(self):
+        return {day: data['post_count'] for day, data in self.db.get_daily_rollups('test').items()}
+
+    def monthly_counts(self):
+        return {entry['bucket']: entry['post_count'] for entry in self.trends.trends('test', 'month')}
+
+    def test_rollups_survive_repeated_runs(self):
+        self.db.save_results([make_post(i, days_ago=40 + i % 3) for i in range(9)]
+                             + [make_post(i, days_ago=i) for i in range(9, 14)], 'test')
+        before = self.monthly_counts()
+
+        report = self.retention.run_once()
+        self.assertEqual(report['posts_expired'], 9)
+        self.assertEqual(report['days_rolled_up'], 3)
+        rollups = self.daily_counts()
+        self.assertEqual(sorted(rollups.values()), [3, 3, 3])
+
+        # Nothing left to expire: the rollups and the history stay as they are
+        report = self.retention.run_once()
+        self.assertEqual(report['posts_expired'], 0)
+        self.assertEqual(self.daily_counts(), rollups)
+        self.assertEqual(self.monthly_counts(), before)
+        self.assertEqual(self.db.count_results('test'), 5)
+
+        # Expiring more posts of an already rolled-up day adds to its rollup
+        self.db.save_results([make_post(20, days_ago=40)], 'test')
+        self.retention.run_once()
+        self.assertEqual(sum(self.daily_counts().values()), 10)
+
+    def test_rows_saved_during_a_run_are_counted_once(self):
+        self.db.save_results([make_post(i, days_ago=40) for i in range(4)], 'test')
+
+        expired_days = self.db.get_expired_days
+
+        def save_while_planning(before_day):
+            # The scheduler stores another old post after the run has picked its rows
+            expired = expired_days(before_day)
+            self.db.get_expired_days = expired_days
+            self.db.save_results([make_post(10, days_ago=40)], 'test')
+            return expired
+
+        self.db.get_expired_days = save_while_planning
+        self.assertEqual(self.retention.run_once()['posts_expired'], 4)
+        self.assertEqual(self.retention.run_once()['posts_expired'], 1)
+        self.assertEqual(list(self.daily_counts().values()), [5])
+
+    def test_old_comment_trees_are_stripped(self):
+        self.db.save_results([make_post(1, days_ago=10), make_post(2, days_ago=1)], 'test')
+        self.assertEqual(self.retention.run_once()['comments_stripped'], 1)
+        comments = {result['url']: result['comments'] for result in self.db.get_results('test')}
+        self.assertEqual(sorted(len(tree) for tree in comments.values()), [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
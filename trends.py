@@ -0,0 +1,147 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from database import TREND_BUCKETS
+
+class TrendAnalyzer:
+    """
+    Sentiment and term trends over the stored archive, bucketed by day, week or month.
+    Buckets are grouped in SQL; finished buckets are cached in the database and only
+    recomputed when their posts change, so the open bucket is normally the only work.
+    Days whose posts were removed by retention are kept as daily rollups and folded
+    into the buckets they fall in.
+    """
+
+    def __init__(self, db, processor, cached_terms=50):
+        self.db = db
+        self.processor = processor
+        # Number of top terms kept in each cached bucket
+        self.cached_terms = cached_terms
+
+    def trends(self, search_term, granularity="week", top_n=10):
+        """Return per-bucket statistics for a search term, oldest bucket first"""
+        if granularity not in TREND_BUCKETS:
+            raise ValueError(f"Unsupported trend granularity: {granularity}")
+
+        fingerprints = self.db.get_trend_fingerprints(search_term, granularity)
+        cached = self.db.get_trend_buckets(search_term, granularity)
+        open_bucket = self.current_bucket(granularity)
+
+        # Rolled-up days, grouped by the bucket they fall in
+        rolled_up = {}
+        for day, data in self.db.get_daily_rollups(search_term).items():
+            bucket = self.current_bucket(granularity, datetime.strptime(day, "%Y-%m-%d"))
+            rolled_up.setdefault(bucket, []).append(data)
+
+        trend = []
+        finished = {}
+        for bucket in sorted(set(fingerprints) | set(rolled_up)):
+            parts = rolled_up.get(bucket, [])
+            if bucket in fingerprints:
+                fingerprint = fingerprints[bucket]
+                entry = cached.get(bucket)
+
+                if entry and entry[0] == fingerprint and bucket < open_bucket:
+                    data = entry[1]
+                else:
+                    data = self._compute_bucket(search_term, granularity, bucket)
+                    if bucket < open_bucket:
+                        finished[bucket] = (fingerprint, data)
+                parts = parts + [data]
+
+            trend.append(self._format_bucket(bucket, self._merge_buckets(parts), top_n))
+
+        # Cache newly finished buckets and forget buckets whose posts are gone
+        if finished:
+            self.db.save_trend_buckets(search_term, granularity, finished)
+        stale = [bucket for bucket in cached if bucket not in fingerprints]
+        if stale:
+            self.db.delete_trend_buckets(search_term, granularity, stale)
+
+        return trend
+
+    def current_bucket(self, granularity, now=None):
+        """Label of the bucket that is still open, matching the SQL bucket labels"""
+        now = now or datetime.now()
+        if granularity == "day":
+            return now.strftime("%Y-%m-%d")
+        elif granularity == "week":
+            return (now - timedelta(days=now.weekday())).strftime("%Y-%m-%d")
+        return now.strftime("%Y-%m")
+
+    def rollup_days(self, search_term, days, max_id=None):
+        """
+        Statistics of the stored posts of each day, as {day: data}, merged with any
+        earlier rollup of that day so posts expired by separate runs all count; with
+        max_id only rows up to it count, the rows an expiry up to max_id deletes
+        """
+        earlier = self.db.get_daily_rollups(search_term)
+        return {
+            day: self._merge_buckets([earlier[day], self._compute_bucket(search_term, "day", day, max_id)])
+            if day in earlier else self._compute_bucket(search_term, "day", day, max_id)
+            for day in days
+        }
+
+    def _compute_bucket(self, search_term, granularity, bucket, max_id=None):
+        """Analyze the posts of one bucket (optionally only rows up to max_id)"""
+        results = self.db.get_trend_bucket_results(search_term, granularity, bucket, max_id)
+        documents = self.processor.analyze_documents(results)
+
+        sentiment = {"positive": 0, "neutral": 0, "negative": 0}
+        words = Counter()
+        for document in documents:
+            sentiment[document['sentiment']] += 1
+            words.update(document['words'])
+
+        return {
+            "post_count": len(documents),
+            "sentiment": sentiment,
+            "top_terms": sorted(words.items(), key=lambda x: (-x[1], x[0]))[:self.cached_terms]
+        }
+
+    def _merge_buckets(self, parts):
+        """Statistics of several parts of a bucket as one"""
+        if len(parts) == 1:
+            return parts[0]
+
+        sentiment = Counter({"positive": 0, "neutral": 0, "negative": 0})
+        words = Counter()
+        for data in parts:
+            sentiment.update(data['sentiment'])
+            words.update(dict(data['top_terms']))
+
+        # Terms outside the top cached_terms of their part are not counted
+        return {
+            "post_count": sum(data['post_count'] for data in parts),
+            "sentiment": dict(sentiment),
+            "top_terms": sorted(words.items(), key=lambda x: (-x[1], x[0]))[:self.cached_terms]
+        }
+
+    def _format_bucket(self, bucket, data, top_n):
+        total = data['post_count']
+        return {
+            "bucket": bucket,
+            "post_count": total,
+            "sentiment": data['sentiment'],
+            "sentiment_share": {
+                category: (count / total if total else 0.0)
+                for category, count in data['sentiment'].items()
+            },
+            "top_terms": [tuple(term) for term in data['top_terms'][:top_n]]
+        }
+
+    def generate_trend_report(self, trend, search_term, granularity):
+        """Format trend buckets as a text table"""
+        report = f"=== {granularity.capitalize()} Trends for '{search_term}' ===\n\n"
+        if not trend:
+            return report + "No dated results to analyze.\n"
+
+        for entry in trend:
+            share = entry['sentiment_share']
+            terms = ", ".join(term for term, count in entry['top_terms'][:5])
+            report += (
+                f"{entry['bucket']:<10}  {entry['post_count']:>5} posts  "
+                f"+{share['positive']*100:5.1f}%  ={share['neutral']*100:5.1f}%  -{share['negative']*100:5.1f}%  "
+                f"{terms}\n"
+            )
+        return report
@@ -0,0 +1,134 @@
+import threading
+import traceback
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+class JobCancelled(Exception):
+    """Raised inside a job function to stop it after cancellation was requested"""
+    pass
+
+class WorkerSignals(QObject):
+    """Signals to communicate between a worker thread and the UI thread"""
+    progress = pyqtSignal(int)
+    message = pyqtSignal(str)
+    partial = pyqtSignal(object)
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    finished = pyqtSignal()
+
+class Worker(QRunnable):
+    """
+    Runs fn(job, *args, **kwargs) on a thread pool thread.
+    The function receives the worker itself as `job` to report progress and
+    check for cancellation; its return value is delivered through signals.result.
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancel_event = threading.Event()
+
+    def run(self):
+        try:
+            result = self.fn(self, *self.args, **self.kwargs)
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.error.emit(str(e))
+        else:
+            # A cancelled job's result is stale, so it is never delivered
+            if self.is_cancelled():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+    def cancel(self):
+        """Ask the job to stop; it stops at its next cancellation check"""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation was requested"""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def progress(self, value):
+        self.signals.progress.emit(int(value))
+
+    def message(self, text):
+        self.signals.message.emit(text)
+
+    def partial(self, value):
+        """Deliver an intermediate result while the job keeps running"""
+        self.signals.partial.emit(value)
+
+class JobRunner(QObject):
+    """
+    Starts named jobs on a QThreadPool.
+    Starting a job under a name that is still running cancels the older one,
+    so only the latest request of each kind delivers its result.
+    """
+
+    def __init__(self, parent=None, max_threads=None):
+        super().__init__(parent)
+        self.pool = QThreadPool()
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self.jobs = {}
+
+    def start(self, name, fn, *args, on_result=None, on_error=None, on_progress=None,
+              on_message=None, on_partial=None, on_cancelled=None, on_finished=None, **kwargs):
+        """Run fn in the background and connect the given callbacks"""
+        self.cancel(name)
+
+        worker = Worker(fn, *args, **kwargs)
+        # Workers are deleted by Python, not by the pool, once their signals are done
+        worker.setAutoDelete(False)
+
+        # Forget the job first so finished callbacks see it as no longer running
+        worker.signals.finished.connect(lambda: self._forget(name, worker))
+
+        callbacks = (
+            (worker.signals.result, on_result),
+            (worker.signals.error, on_error),
+            (worker.signals.progress, on_progress),
+            (worker.signals.message, on_message),
+            (worker.signals.partial, on_partial),
+            (worker.signals.cancelled, on_cancelled),
+            (worker.signals.finished, on_finished),
+        )
+        for signal, callback in callbacks:
+            if callback is not None:
+                signal.connect(callback)
+
+        self.jobs[name] = worker
+        self.pool.start(worker)
+        return worker
+
+    def cancel(self, name=None):
+        """Cancel one named job, or every running job when no name is given"""
+        names = [name] if name else list(self.jobs)
+        for job_name in names:
+            worker = self.jobs.get(job_name)
+            if worker is not None:
+                worker.cancel()
+
+    def is_running(self, name):
+        return name in self.jobs
+
+    def shutdown(self, timeout_ms=2000):
+        """Cancel all jobs and wait briefly for the pool to drain"""
+        self.cancel()
+        return self.pool.waitForDone(timeout_ms)
+
+    def _forget(self, name, worker):
+        if self.jobs.get(name) is worker:
+            del self.jobs[name]